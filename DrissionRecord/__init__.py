@@ -1,7 +1,10 @@
 from .byte_recorder import ByteRecorder
 from .db_recorder import DBRecorder
+from .db_writer import DBWriter
+from .sharded_db_recorder import ShardedDBRecorder
 from .recorder import Recorder
 from .cell_style import CellStyle
+from .filters import Filter
 from .tools import Col
 
 __version__ = '1.1.0'
@@ -4,6 +4,7 @@ from pathlib import Path
 from threading import Lock
 from time import sleep
 
+from .dedupe import remove_seen
 from .setter import OriginalSetter, BaseSetter
 from .tools import get_usable_path, make_valid_name, get_tables, make_final_data_simplify
 
@@ -113,10 +114,19 @@ class OriginalRecorder(object):
         self._data_count = 0
 
     def backup(self, folder=None, name=None, overwrite=None):
+        path = self._get_backup_path(folder, name, overwrite)
+        if path is None:
+            return ''
+        from shutil import copy
+        copy(self._path, path)
+        self._backup_times = 0
+        return str(path.absolute())
+
+    def _get_backup_path(self, folder, name, overwrite):
         src_path = Path(self._path)
         if not self._file_exists:
             if not src_path.exists():
-                return ''
+                return None
             self._file_exists = True
 
         if overwrite is None:
@@ -132,11 +142,7 @@ class OriginalRecorder(object):
             from datetime import datetime
             name = f'{path.stem}_{datetime.now().strftime("%Y%m%d%H%M%S")}{path.suffix}'
             path = get_usable_path(folder / name)
-
-        from shutil import copy
-        copy(self._path, path)
-        self._backup_times = 0
-        return str(path.absolute())
+        return path
 
     def delete(self):
         if self._path:
@@ -155,6 +161,7 @@ class OriginalRecorder(object):
 
 class BaseRecorder(OriginalRecorder):
     def __init__(self, path=None, cache_size=None):
+        self._deduper = None  # set.path()时会用到，要在父类初始化前设置
         super().__init__(path, cache_size)
         self._before = []
         self._after = []
@@ -193,6 +200,13 @@ class BaseRecorder(OriginalRecorder):
     def encoding(self):
         return self._encoding
 
+    def delete(self):
+        super().delete()
+        if self._path:  # 去重记录属于被删除的文件，不能用于之后在同一路径新建的文件
+            remove_seen(self._path)
+        if self._deduper is not None:
+            self._deduper.reset()
+
     @abstractmethod
     def add_data(self, data, table=None):
         pass
@@ -4,6 +4,7 @@ from pathlib import Path
 from threading import Lock
 from typing import Union, Optional, Callable
 
+from .dedupe import Deduper
 from .setter import OriginalSetter, BaseSetter
 
 
@@ -82,6 +83,16 @@ class OriginalRecorder(object):
         """
         ...
 
+    def _get_backup_path(self, folder: Union[str, Path, None], name: Optional[str],
+                         overwrite: Optional[bool]) -> Optional[Path]:
+        """获取备份文件路径，并创建所在文件夹
+        :param folder: 文件夹路径，为None使用内置路径
+        :param name: 保存的文件名，为None使用内置路径文件名
+        :param overwrite: 是否覆盖同名文件，为None使用内置设置
+        :return: 备份文件路径，源文件不存在时返回None
+        """
+        ...
+
     def delete(self) -> None:
         """删除所指向的文件"""
         ...
@@ -104,6 +115,7 @@ class BaseRecorder(OriginalRecorder):
     _setter: BaseSetter = ...
     _make_final_data: Callable = ...
     _auto_new_header: bool = ...
+    _deduper: Optional[Deduper] = ...
 
     def __init__(self, path: Union[None, str, Path] = None, cache_size: int = None) -> None:
         """
@@ -142,6 +154,10 @@ class BaseRecorder(OriginalRecorder):
         """返回csv文件使用的编码格式"""
         ...
 
+    def delete(self) -> None:
+        """删除所指向的文件和它的去重记录"""
+        ...
+
     @abstractmethod
     def _record(self):
         ...
@@ -1,18 +1,35 @@
 # -*- coding:utf-8 -*-
+from functools import partial
 from pathlib import Path
-from sqlite3 import connect
+from sqlite3 import connect, OperationalError
+from threading import RLock
 from time import sleep
 
 from .base import BaseRecorder
 from .setter import DBSetter
-from .tools import ok_list_db, is_single_data, is_1D_data
+from .dedupe import key_positions
+from .filters import Filter, sign_filter, sql_regex, to_number
+from .sidecar import load_sidecar, save_sidecar
+from .tools import (ok_list_db, process_content_db, db_type, is_single_data, is_1D_data, is_frame, is_array,
+                    frame2rows, get_key_cols, Header, RowData)
 
 
 class DBRecorder(BaseRecorder):
     def __init__(self, path=None, cache_size=1000, table=None):
         self._conn = None
         self._cur = None
+        self._keep_conn = False  # 是否保持连接，不在每次操作后关闭
+        self._pragmas = {}  # 每次连接后执行的PRAGMA设置
+        self._schema = None  # {表名: 列名列表}，列名为None表示未读取
+        self._conflict = (None, None)  # (冲突处理方式, 唯一键列名)
+        self._unique_indexes = set()  # 已确认存在的唯一索引 {(表名, 列名元组), ...}
+        self._indexes = {}  # {索引名: (表名, 列名元组, 是否延迟创建)}
+        self._indexes_done = set()  # 本次运行中已处理过的索引名
+        self._indexes_dropped = set()  # 本次运行中删除后还没重建的延迟索引名
+        self._col_types = {}  # {表名: {列名: 类型}}，新建表和列时使用
+        self._infer_types = False  # 新建表和列时是否按数据推断类型
         super().__init__(None, cache_size)
+        self._lock = RLock()  # record()中自动备份时会再次获取
         if path:
             self.set.path(path, table)
         self._type = 'db'
@@ -25,11 +42,86 @@ class DBRecorder(BaseRecorder):
 
     @property
     def tables(self):
-        self._connect()
-        self._cur.execute("select name from sqlite_master where type='table'")
-        tables = self._cur.fetchall()
-        self._close_connection()
-        return [i[0] for i in tables]
+        with self._lock:  # 保持连接时与写入共用连接
+            self._connect()
+            try:
+                return list(self._load_schema(()))
+            finally:
+                self._close_connection()
+
+    def __del__(self):
+        super().__del__()
+        try:  # 批量写入后没有调用close()时，对象销毁前重建删除了的延迟索引
+            self._rebuild_dropped()
+        except Exception:
+            pass
+        self._close_connection(True)
+
+    def record(self, final=False):
+        path = super().record()
+        if final:
+            self.build_indexes()
+        return path
+
+    def build_indexes(self):
+        if not self._indexes or not self._path:
+            return
+        with self._lock:
+            self._connect()
+            try:
+                tables = self._load_schema({i[0] for i in self._indexes.values()})
+                for name, (table, cols, deferred) in self._indexes.items():
+                    if tables.get(table, None) and all(c in tables[table] for c in cols):
+                        self._cur.execute(f"CREATE INDEX IF NOT EXISTS `{name}` ON `{table}` (`{'`,`'.join(cols)}`)")
+                        self._indexes_done.add(name)  # 已建好的延迟索引在之后的写入中不再删除
+                        self._indexes_dropped.discard(name)
+                self._conn.commit()
+            finally:
+                self._close_connection()
+
+    def _rebuild_dropped(self):
+        # 释放连接前重建本次运行中删除后还没重建的延迟索引
+        if self._indexes_dropped and self._path and Path(self._path).exists():
+            self.record(final=True)
+
+    def backup(self, folder=None, name=None, overwrite=None, pages=-1, progress=None, vacuum=False):
+        path = self._get_backup_path(folder, name, overwrite)
+        if path is None:
+            return ''
+        # 保持连接时用同一连接作为源，备份期间占用锁，写入等备份结束后进行
+        with self._lock:
+            kept = self._keep_conn and self._conn is not None
+            src = self._conn if kept else connect(self._path)
+            try:
+                if vacuum:  # 生成整理过的数据库，不包含空闲页
+                    path.unlink(missing_ok=True)
+                    src.execute('VACUUM INTO ?', (str(path),))
+                else:
+                    dst = connect(path)
+                    try:
+                        src.backup(dst, pages=pages, progress=progress)
+                    finally:
+                        dst.close()
+            finally:
+                if not kept:
+                    src.close()
+        self._backup_times = 0
+        return str(path.absolute())
+
+    def close(self):
+        self.record(final=True)
+        with self._lock:
+            self._close_connection(True)
+            if self._deduper is not None:  # 关闭连接时WAL并入数据库文件，重新记录文件状态
+                self._deduper.save(self.path)
+
+    def delete(self):
+        with self._lock:
+            self._close_connection(True)
+        super().delete()
+        if self._path:  # WAL模式的附属文件
+            for suffix in ('-wal', '-shm'):
+                Path(f'{self._path}{suffix}').unlink(missing_ok=True)
 
     def add_data(self, data, table=None):
         while self._pause_add:  # 等待其它线程写入结束
@@ -40,107 +132,278 @@ class DBRecorder(BaseRecorder):
             raise RuntimeError('未指定数据库表名。')
 
         data = self._handle_data(data)
-        self._data.setdefault(table, []).extend(data)
+        if self._deduper is not None:
+            if not self._deduper.is_warmed(table):
+                warm_db_seen(self, table)
+            kept = self._deduper.filter(table, data)
+            self._data_count -= len(data) - len(kept)
+            data = kept
+        if data:
+            self._data.setdefault(table, []).extend(data)
 
         if 0 < self.cache_size <= self._data_count:
             self.record()
 
+    def _load_indexes(self):
+        self._indexes = {i[0]: (i[1], tuple(i[2]), i[3])
+                         for i in load_sidecar(self._path, 'indexes').get('indexes', [])}
+        self._indexes_done.clear()
+
+    def _save_indexes(self):
+        save_sidecar(self._path, 'indexes',
+                     {'indexes': [[k, t, list(c), d] for k, (t, c, d) in self._indexes.items()]})
+
+    def refresh_schema(self):
+        self._schema = None
+        self._unique_indexes.clear()
+        return self
+
+    def rows(self, table=None, cols=True, sign_col=True, signs=None, deny_sign=False, count=None, where=None):
+        return list(self.iter_rows(table=table, cols=cols, sign_col=sign_col, signs=signs, deny_sign=deny_sign,
+                                   count=count, where=where))
+
+    def iter_rows(self, table=None, cols=True, sign_col=True, signs=None, deny_sign=False, count=None, where=None,
+                  batch=1000):
+        table = table or self.table
+        if not self._path or not Path(self._path).exists():
+            raise RuntimeError('未指定文件路径或文件不存在。')
+        if not isinstance(table, str) or '`' in table:
+            raise RuntimeError('未指定数据库表名。')
+        if where is not None and not isinstance(where, Filter):
+            raise TypeError('where参数只能是Filter对象。')
+        if sign_col is not True:  # 与Recorder.rows()相同，转为Filter在sqlite中筛选
+            sign = sign_filter(sign_col, signs, deny_sign)
+            where = sign if where is None else sign & where
+        return iter_db_rows(self, table, cols, count, where, batch)
+
     def run_sql(self, sql, single=True, commit=False):
-        self._connect()
-        self._cur.execute(sql)
-        r = self._cur.fetchone() if single else self._cur.fetchall()
-        if commit:
-            self._conn.commit()
-        self._close_connection()
+        with self._lock:  # 保持连接时与写入共用连接，不能在写入到一半时执行或提交
+            if sql.lstrip()[:6].lower() != 'select':  # 可能修改了表结构
+                self.refresh_schema()
+            self._connect()
+            try:
+                cur = self._conn.execute(sql)
+                r = cur.fetchone() if single else cur.fetchall()
+                cur.close()
+                if commit:
+                    self._conn.commit()
+            finally:
+                self._close_connection()
         return r
 
     def _connect(self):
+        if self._conn is not None and self._keep_conn:
+            return
         Path(self.path).parent.mkdir(parents=True, exist_ok=True)
-        self._conn = connect(self.path)
+        self._conn = connect(self.path, check_same_thread=not self._keep_conn)
         self._cur = self._conn.cursor()
+        self._set_pragmas()
 
-    def _close_connection(self):
-        if self._conn is not None:
-            try:
-                self._cur.close()
-                self._conn.close()
-            except:
-                pass
-
-    def _to_database(self, data_list, table, tables):
-        if isinstance(data_list[0], dict):  # 检查是否要新增列
-            keys = data_list[0].keys()
-            for key in keys:
-                if str(key) not in tables[table]:
-                    if self._auto_new_header:
-                        sql = f'ALTER TABLE `{table}` ADD COLUMN `{key}`'
-                        self._cur.execute(sql)
-                        tables[table].append(key)
-                    else:
-                        data_list[0].pop(key)
-
-            question_masks = ','.join('?' * len(data_list[0]))
-            keys_txt = '`' + '`,`'.join(data_list[0]) + '`'
-            values = [ok_list_db(i.values()) for i in data_list]
-            sql = f'INSERT INTO `{table}` ({keys_txt}) values ({question_masks})'
+    def _set_pragmas(self):
+        for k, v in self._pragmas.items():
+            self._cur.execute(f'PRAGMA {k}={v}')
 
-        else:
-            question_masks = ','.join('?' * len(tables[table]))
-            values = data_list
-            sql = f'INSERT INTO `{table}` values ({question_masks})'
+    def _close_connection(self, force=False):
+        if self._conn is None or (self._keep_conn and not force):
+            return
+        try:
+            self._cur.close()
+            self._conn.close()
+        except:
+            pass
+        self._conn = None
+        self._cur = None
 
-        self._cur.executemany(sql, values)
+    def _to_database(self, data_list, table, tables, keys=None, retry=True):
+        try:
+            cols = tables[table]
+            if keys is None:  # 非dict数据按列顺序写入，不足的列补None
+                long = len(cols)
+                values = []
+                for d in data_list:
+                    d = ok_list_db(d)
+                    if len(d) > long:
+                        raise RuntimeError('数据个数大于列数（注意before和after属性）。')
+                    d.extend([None] * (long - len(d)))
+                    values.append(d)
+                names = cols
+
+            else:
+                for key in keys:  # 检查是否要新增列
+                    if str(key) not in cols and self._auto_new_header:
+                        types = self._get_types(table, (key,), data_list)
+                        self._cur.execute(f'ALTER TABLE `{table}` ADD COLUMN {col_defs((key,), types)}')
+                        cols.append(str(key))
+                cols = set(cols)
+                used = [k for k in keys if str(k) in cols]
+                values = [[process_content_db(d[k]) for k in used] for d in data_list]
+                names = [str(k) for k in used]
+
+            self._cur.executemany(self._insert_sql(table, names, tables[table]), values)
+        except OperationalError as e:
+            if not retry or 'locked' in str(e):
+                raise
+            # 列名缓存可能已过期（如其它连接新增了列），重新读取后重试一次
+            tables[table] = None
+            self._load_schema((table,))
+            self._to_database(data_list, table, tables, keys, False)
+
+    def _insert_sql(self, table, names, cols):
+        mode, keys = self._conflict
+        if keys and not all(k in cols for k in keys):  # 表中没有唯一键列时只按已有约束处理
+            keys = None
+            if mode == 'UPDATE':
+                mode = None
+        if keys:  # 冲突判断依赖唯一索引
+            self._create_unique_index(table, keys)
+        if not names:
+            return f'INSERT{" OR " + mode if mode in ("IGNORE", "REPLACE") else ""} INTO `{table}` DEFAULT VALUES'
+
+        sql = (f'INSERT{" OR " + mode if mode in ("IGNORE", "REPLACE") else ""} INTO `{table}` '
+               f'(`{"`,`".join(names)}`) values ({",".join("?" * len(names))})')
+        if mode == 'UPDATE':
+            sets = [f'`{n}`=excluded.`{n}`' for n in names if n not in keys]
+            sql += f" ON CONFLICT (`{'`,`'.join(keys)}`) DO {'UPDATE SET ' + ','.join(sets) if sets else 'NOTHING'}"
+        return sql
+
+    def _create_unique_index(self, table, keys):
+        if (table, keys) in self._unique_indexes:
+            return
+        cols = '`,`'.join(keys)
+        not_null = ' AND '.join(f'`{k}` IS NOT NULL' for k in keys)  # 唯一索引允许多个NULL
+        self._cur.execute(f'SELECT 1 FROM `{table}` WHERE {not_null} GROUP BY `{cols}` HAVING COUNT(*)>1 LIMIT 1')
+        if self._cur.fetchone():
+            raise ValueError(f'表{table}中{keys}列已有重复数据，无法创建唯一索引，请先去除重复数据。')
+        self._cur.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS `{table}_{'_'.join(keys)}_unique` ON `{table}` (`{cols}`)")
+        self._unique_indexes.add((table, keys))
+
+    def _make_unique_indexes(self, keys, table):
+        # 设置冲突处理方式时为要写入的表创建唯一索引，有重复数据时在此报错，而不是每次写入时失败；其它表在首次写入时创建
+        if not isinstance(table, str) or not self._path or not Path(self._path).exists():
+            return
+        with self._lock:
+            self._connect()
+            try:
+                cols = self._load_schema((table,)).get(table, None)
+                if cols and all(k in cols for k in keys):
+                    self._create_unique_index(table, keys)
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                self._unique_indexes.clear()
+                raise
+            finally:
+                self._close_connection()
 
     def _record(self):
-        self._connect()  # 获取所有表名和列名
-        self._cur.execute("select name from sqlite_master where type='table'")
-        tables = {}
-        for table in self._cur.fetchall():
-            self._cur.execute(f"PRAGMA table_info(`{table[0]}`)")
-            tables[table[0]] = [i[1] for i in self._cur.fetchall()]
+        self._connect()
+        try:
+            self._write_data()
+            self._conn.commit()
+        except BaseException as e:
+            self._conn.rollback()  # 保持连接时不能留下未完成的事务
+            self._schema = None  # 回滚后缓存中新建的表、列和索引已不存在
+            self._unique_indexes.clear()
+            self._indexes_done.clear()
+            self._indexes_dropped.clear()  # 删除索引的操作也被回滚
+            self._close_connection()
+            if isinstance(e, OperationalError) and 'locked' in str(e):  # 其它进程正在写入，交给record()重试
+                raise PermissionError(str(e)) from e
+            raise
+        self._close_connection()
+        if self._deduper is not None:
+            self._deduper.save(self.path)
 
-        for table, data in self._data.items():
-            data_list = []
-            if isinstance(data[0], dict):
-                curr_keys = data[0].keys()
-            else:
-                curr_keys = len(data[0])
+    def _load_schema(self, tables):
+        if self._schema is None:  # 只在首次使用或刷新后读取表名
+            self._cur.execute("select name from sqlite_master where type='table'")
+            self._schema = {i[0]: None for i in self._cur.fetchall()}
+        for table in tables:  # 只读取要写入的表的列名
+            if table in self._schema and self._schema[table] is None:
+                self._cur.execute(f"PRAGMA table_info(`{table}`)")
+                self._schema[table] = [i[1] for i in self._cur.fetchall()]
+        return self._schema
+
+    def _write_data(self):
+        tables = self._load_schema(self._data)  # 新建表和列时同步更新缓存
 
+        for table, data in self._data.items():
+            self._prepare_indexes(table, tables, True, len(data))
+            buckets = {}  # {列名集合: (列名, 行列表)}，列相同的行用一次executemany写入，按首次出现的顺序
+            sigs = {}  # {键元组: 桶}，键顺序不同但列相同的dict归入同一个桶
+            # 有冲突处理方式时同一键的后写入须覆盖先写入，只合并连续的同列行，按原顺序分段写入
+            ordered = self._conflict[0] is not None
+            runs = []  # [(列名, 行列表), ...]
+            last = None
             for d in data:
                 if isinstance(d, dict):
-                    tmp_keys = d.keys()
                     if table not in tables:
-                        keys = list(d.keys())
-                        self._cur.execute(f"CREATE TABLE `{table}` (`{'`,`'.join(keys)}`)")
-                        tables[table] = keys
+                        keys = list(d.keys()) or ['']  # 缓存可能过期，表已被其它连接创建时沿用已有的列
+                        types = self._get_types(table, keys, data)
+                        self._cur.execute(f"CREATE TABLE IF NOT EXISTS `{table}` ({col_defs(keys, types)})")
+                        tables[table] = None
+                        self._load_schema((table,))
+                    keys = tuple(d)
+                    bucket = sigs.get(keys, None)
+                    if bucket is None:
+                        bucket = sigs[keys] = buckets.setdefault(frozenset(keys), (keys, []))
 
                 else:
                     if table not in tables:
-                        self._close_connection()
                         raise TypeError('新建表格首次须接收数据需为dict格式。')
-                    tmp_keys = len(d)
-                    long = len(tables[table])
-                    if long > tmp_keys:
-                        d = ok_list_db(d)
-                        d.extend([None] * (long - tmp_keys))
-                    elif long < tmp_keys:
-                        self._close_connection()
-                        raise RuntimeError('数据个数大于列数（注意before和after属性）。')
+                    bucket = buckets.setdefault(None, (None, []))
+                if not ordered:
+                    bucket[1].append(d)
+                    continue
+                if bucket is not last:
+                    runs.append((bucket[0], []))
+                    last = bucket
+                runs[-1][1].append(d)
 
-                if tmp_keys != curr_keys:
-                    self._to_database(data_list, table, tables)
-                    curr_keys = tmp_keys
-                    data_list = []
+            for keys, data_list in (runs if ordered else buckets.values()):
+                self._to_database(data_list, table, tables, keys)
+            self._prepare_indexes(table, tables, False)
 
-                data_list.append(d)
+    def _get_types(self, table, keys, rows):
+        types = self._col_types.get(table, {})
+        res = {k: types[str(k)] for k in keys if str(k) in types}
+        if self._infer_types:  # 按这批数据中第一个不为None的值推断
+            res.update(infer_types([k for k in keys if k not in res], rows))
+        return res
 
-            if data_list:
-                self._to_database(data_list, table, tables)
+    def _prepare_indexes(self, table, tables, deferred, rows=0):
+        # 延迟索引只在批量写入时删除，写入时不维护，record(final=True)时重建；其它索引在写入后创建
+        bulk = None
+        for name, (t, cols, d) in self._indexes.items():
+            if t != table or d != deferred or name in self._indexes_done:
+                continue
+            if deferred:
+                if bulk is None:  # 新表、空表或写入的行数多于已有行数时才值得重建
+                    bulk = table not in tables or self._count_rows(table, rows) < rows
+                if bulk:
+                    self._cur.execute(f'DROP INDEX IF EXISTS `{name}`')
+                    self._indexes_dropped.add(name)
+                    self._indexes_done.add(name)
+                    continue
+            # 少量追加时保留延迟索引，之前的批量写入结束后没有重建的在此补建
+            if tables.get(table, None) and all(c in tables[table] for c in cols):
+                self._cur.execute(f"CREATE INDEX IF NOT EXISTS `{name}` ON `{table}` (`{'`,`'.join(cols)}`)")
+                self._indexes_done.add(name)
 
-        self._conn.commit()
-        self._close_connection()
+    def _count_rows(self, table, limit):
+        # 最多数到limit行，不需要扫描整个表
+        self._cur.execute(f'SELECT count(*) FROM (SELECT 1 FROM `{table}` LIMIT ?)', (limit,))
+        return self._cur.fetchone()[0]
 
     def _handle_data(self, data):
+        if is_frame(data):
+            cols, rows = frame2rows(data, 'db')  # 与其它数据相同，bytes以BLOB保存
+            if not rows:
+                return []
+            data = [dict(zip(cols, r)) for r in rows]
+        elif is_array(data):
+            data = data.tolist()
+
         if is_single_data(data):
             data = (self._make_final_data(self, (data,)),)
             self._data_count += 1
@@ -155,3 +418,78 @@ class DBRecorder(BaseRecorder):
                     else self._make_final_data(self, d) for d in data]
             self._data_count += len(data)
         return data
+
+
+def iter_db_rows(recorder, table, cols, count, where, batch):
+    # 用独立的只读连接逐批读取，不影响写入，WAL模式下可与写入同时进行
+    conn = connect(f'{Path(recorder.path).absolute().as_uri()}?mode=ro', uri=True)
+    try:
+        header = Header([i[1] for i in conn.execute(f'PRAGMA table_info(`{table}`)')])
+        if not header:
+            raise RuntimeError(f'数据库中没有表：{table}')
+        key_cols = get_key_cols(cols, header)
+        if key_cols is True:
+            names = header.values()
+            index = header.get_index(len(header))
+        else:
+            names = [header[c] for c in key_cols]
+            index = header.get_index(tuple(key_cols))
+
+        sql = f"SELECT rowid, `{'`,`'.join(names)}` FROM `{table}`" if names else f'SELECT rowid FROM `{table}`'
+        params = []
+        if where is not None:
+            funcs = []
+            cond, params = where.to_sql(header, funcs)
+            sql += f' WHERE {cond}'
+            params = [process_content_db(i) for i in params]
+            conn.create_function('DR_REGEX', 2, partial(sql_regex, funcs), deterministic=True)
+            conn.create_function('DR_NUMBER', 1, to_number, deterministic=True)
+        sql += ' ORDER BY rowid'
+        if count:
+            sql += f' LIMIT {int(count)}'
+        cur = conn.execute(sql, params)
+        while True:
+            rows = cur.fetchmany(batch)
+            if not rows:
+                break
+            for r in rows:
+                yield RowData(r[0], header, None, index, r[1:])
+    finally:
+        conn.close()
+
+
+def infer_types(keys, rows):
+    res = {}
+    keys = set(keys)
+    for d in rows:
+        if not keys:
+            break
+        if not isinstance(d, dict):
+            continue
+        for k in [k for k in keys if d.get(k, None) is not None]:
+            res[k] = db_type(d[k])
+            keys.discard(k)
+    return res
+
+
+def col_defs(keys, types):
+    return ','.join(f'`{k}` {types[k]}' if k in types else f'`{k}`' for k in keys)
+
+
+def warm_db_seen(recorder, table):
+    deduper = recorder._deduper
+    cols = []
+    conn = connect(recorder.path) if recorder.path and Path(recorder.path).exists() else None
+    try:
+        if conn is not None:
+            cols = [i[1] for i in conn.execute(f'PRAGMA table_info(`{table}`)')]
+        header = Header(cols) if cols else None
+        positions = key_positions(deduper.key_cols, header)
+        rows = None
+        if (cols and positions is not None and max(positions) < len(cols)
+                and not deduper.saved(recorder.path, table)):
+            rows = conn.execute(f"SELECT `{'`,`'.join(cols[p] for p in positions)}` FROM `{table}`")
+        deduper.warm(recorder.path, table, rows, positions)
+    finally:
+        if conn is not None:
+            conn.close()
@@ -1,15 +1,29 @@
 # -*- coding:utf-8 -*-
 from pathlib import Path
 from sqlite3 import Connection, Cursor
-from typing import Union, Any, Optional
+from threading import RLock
+from typing import Union, Any, Optional, Dict, List, Iterable, Tuple, Set, Generator, Callable
 
 from .base import BaseRecorder
+from .filters import Filter
 from .setter import DBSetter
+from .tools import RowData
 
 
 class DBRecorder(BaseRecorder):
     _conn: Optional[Connection] = ...
     _cur: Optional[Cursor] = ...
+    _keep_conn: bool = ...
+    _pragmas: Dict[str, Union[str, int]] = ...
+    _schema: Optional[Dict[str, Optional[List[str]]]] = ...
+    _conflict: Tuple[Optional[str], Optional[Tuple[str, ...]]] = ...
+    _unique_indexes: Set[Tuple[str, Tuple[str, ...]]] = ...
+    _indexes: Dict[str, Tuple[str, Tuple[str, ...], bool]] = ...
+    _indexes_done: Set[str] = ...
+    _indexes_dropped: Set[str] = ...
+    _col_types: Dict[str, Dict[str, str]] = ...
+    _infer_types: bool = ...
+    _lock: RLock = ...
     _setter: Optional[DBSetter] = ...
     _data: dict = ...
     data: dict = ...
@@ -43,6 +57,112 @@ class DBRecorder(BaseRecorder):
         """
         ...
 
+    def record(self, final: bool = False) -> str:
+        """记录数据
+        :param final: 是否批量写入已结束，为True时写入后建立所有设置的索引
+        :return: 文件路径
+        """
+        ...
+
+    def build_indexes(self) -> None:
+        """建立所有用set.indexes()设置的索引，表或列不存在的跳过，已建立的延迟索引在之后的写入中不再删除
+        :return: None
+        """
+        ...
+
+    def _rebuild_dropped(self) -> None:
+        """释放连接前（更换文件、切换连接方式、对象销毁时）重建本次运行中删除后还没重建的延迟索引"""
+        ...
+
+    def backup(self,
+               folder: Union[str, Path, None] = None,
+               name: str = None,
+               overwrite: bool = None,
+               pages: int = -1,
+               progress: Optional[Callable[[int, int, int], Any]] = None,
+               vacuum: bool = False) -> str:
+        """用sqlite在线备份把数据库备份到指定路径，不会复制到写入一半的数据。
+        保持连接时以该连接为源，分步备份时其它连接写入会使备份重新开始
+        :param folder: 文件夹路径，为None使用内置路径（初始 'backup'）
+        :param name: 保存的文件名，可不含后缀，为None使用内置路径文件名
+        :param overwrite: 是否覆盖同名文件，为False时每次备份文件名添加当前时间，为None使用内置设置
+        :param pages: 每步复制的页数，步与步之间让出数据库，-1为一次复制全部
+        :param progress: 每步后调用的函数，接收(状态, 剩余页数, 总页数)
+        :param vacuum: 是否用VACUUM INTO生成整理过的副本，为True时pages和progress无效
+        :return: 备份文件路径，源文件不存在时返回''
+        """
+        ...
+
+    def close(self) -> None:
+        """写入缓存数据、建立设置的索引并关闭保持的数据库连接
+        :return: None
+        """
+        ...
+
+    def delete(self) -> None:
+        """关闭连接并删除数据库文件、WAL附属文件和去重记录
+        :return: None
+        """
+        ...
+
+    def _load_indexes(self) -> None:
+        """从'文件路径.indexes'文件读取索引设置"""
+        ...
+
+    def _save_indexes(self) -> None:
+        """把索引设置保存到'文件路径.indexes'文件"""
+        ...
+
+    def refresh_schema(self) -> DBRecorder:
+        """清空缓存的表结构和唯一索引记录，下次写入时重新读取，其它程序修改了表结构时使用。
+        run_sql()执行非SELECT语句时自动清空
+        :return: 对象自己
+        """
+        ...
+
+    def rows(self,
+             table: Optional[str] = None,
+             cols: Union[str, int, list, tuple, True] = True,
+             sign_col: Union[str, int, True] = True,
+             signs: Any = None,
+             deny_sign: bool = False,
+             count: Optional[int] = None,
+             where: Optional[Filter] = None) -> List[RowData]:
+        """返回表中符合条件的行数据，参数与iter_rows()相同
+        :param table: 数据表名称，为None使用默认表
+        :param cols: 要获取的列，可以是多列，传入列名或列序号，为True获取所有列
+        :param sign_col: 用于筛选数据的列，传入列名或列序号，为True获取所有行
+        :param signs: 按这个值筛选目标行，可用list, tuple, set设置多个，与csv相同按文本比较，None和空字符串都表示未标记
+        :param deny_sign: 是否反向匹配sign，即筛选值不是sign的行
+        :param count: 获取多少条数据，为None获取所有
+        :param where: 多列组合筛选条件，Filter对象，与sign_col同时设置时要两者都满足
+        :return: RowData对象组成的列表，行号为rowid
+        """
+        ...
+
+    def iter_rows(self,
+                  table: Optional[str] = None,
+                  cols: Union[str, int, list, tuple, True] = True,
+                  sign_col: Union[str, int, True] = True,
+                  signs: Any = None,
+                  deny_sign: bool = False,
+                  count: Optional[int] = None,
+                  where: Optional[Filter] = None,
+                  batch: int = 1000) -> Generator[RowData, None, None]:
+        """按rowid顺序逐条返回表中符合条件的行数据，筛选转为sql在sqlite中执行，用独立的只读连接分批读取。
+        只读取已写入数据库的数据，不包含缓存中的数据。遍历结束或调用生成器的close()时关闭连接
+        :param table: 数据表名称，为None使用默认表
+        :param cols: 要获取的列，可以是多列，传入列名或列序号，为True获取所有列
+        :param sign_col: 用于筛选数据的列，传入列名或列序号，为True获取所有行
+        :param signs: 按这个值筛选目标行，可用list, tuple, set设置多个，与csv相同按文本比较，None和空字符串都表示未标记
+        :param deny_sign: 是否反向匹配sign，即筛选值不是sign的行
+        :param count: 获取多少条数据，为None获取所有
+        :param where: 多列组合筛选条件，Filter对象，与sign_col同时设置时要两者都满足
+        :param batch: 每次从数据库获取的行数
+        :return: 逐条返回RowData对象的生成器，行号为rowid
+        """
+        ...
+
     def run_sql(self, sql: str, single: bool = True, commit: bool = False) -> Union[None, list, tuple]:
         """执行sql语句并返回结果
         :param sql: sql语句
@@ -56,26 +176,145 @@ class DBRecorder(BaseRecorder):
         """连接数据库"""
         ...
 
-    def _close_connection(self) -> None:
-        """关闭数据库 """
+    def _set_pragmas(self) -> None:
+        """在当前连接上执行已设置的PRAGMA"""
+        ...
+
+    def _close_connection(self, force: bool = False) -> None:
+        """关闭数据库，保持连接时只有force为True才关闭
+        :param force: 是否强制关闭
+        :return: None
+        """
         ...
 
     def _record(self) -> None:
         """保存数据到sqlite"""
         ...
 
+    def _load_schema(self, tables: Iterable[str]) -> Dict[str, Optional[List[str]]]:
+        """获取缓存的表结构，没有缓存时读取所有表名，并读取指定表中未读取的列名
+        :param tables: 要读取列名的表名
+        :return: {表名: 列名列表}，未读取的表列名为None
+        """
+        ...
+
+    def _write_data(self) -> None:
+        """把缓存数据写入当前连接，不提交。每个表的数据按列分组，每组写入一次，组内保持原有顺序"""
+        ...
+
     def _to_database(self,
                      data_list: list,
                      table: str,
-                     tables: dict) -> None:
-        """把数据批量写入指定数据表
+                     tables: dict,
+                     keys: Optional[tuple] = None,
+                     retry: bool = True) -> None:
+        """把列相同的一批数据用一次executemany写入指定数据表，列名缓存过期导致出错时重新读取列名并重试一次
         :param data_list: 要写入的数据组成的列表
         :param table: 要写入数据的数据表名称
         :param tables: 数据库中数据表和列信息
+        :param keys: dict数据的键，为None时数据为list，按列顺序写入
+        :param retry: 出错时是否重新读取列名后重试
+        :return: None
+        """
+        ...
+
+    def _insert_sql(self, table: str, names: List[str], cols: List[str]) -> str:
+        """按冲突处理设置生成插入语句，设置了唯一键且表中有这些列时先确保唯一索引存在
+        :param table: 数据表名称
+        :param names: 要写入的列名
+        :param cols: 数据表所有列名
+        :return: sql语句
+        """
+        ...
+
+    def _create_unique_index(self, table: str, keys: Tuple[str, ...]) -> None:
+        """为数据表创建唯一索引，已创建过的不重复执行
+        :param table: 数据表名称
+        :param keys: 唯一键列名
+        :return: None
+        """
+        ...
+
+    def _make_unique_indexes(self, keys: Tuple[str, ...], table: Optional[str]) -> None:
+        """为要写入的数据表创建唯一索引，表不存在或没有唯一键列时不处理，有重复数据时抛出ValueError
+        :param keys: 唯一键列名
+        :param table: 数据表名称，为None时不处理
+        :return: None
+        """
+        ...
+
+    def _get_types(self, table: str, keys: Iterable[Any], rows: list) -> Dict[Any, str]:
+        """获取新建列的类型，优先使用set.col_types()设置的，开启推断时其余列按数据推断
+        :param table: 数据表名称
+        :param keys: 要新建的列名
+        :param rows: 用于推断类型的数据
+        :return: {列名: 类型}，不指定类型的列不包含在内
+        """
+        ...
+
+    def _prepare_indexes(self,
+                         table: str,
+                         tables: Dict[str, Optional[List[str]]],
+                         deferred: bool,
+                         rows: int = 0) -> None:
+        """批量写入数据前删除延迟索引，少量追加时补建缺少的延迟索引，写入后创建非延迟索引，每个索引每次运行只处理一次
+        :param table: 数据表名称
+        :param tables: 数据库中数据表和列信息
+        :param deferred: 为True时处理延迟索引，否则处理非延迟索引
+        :param rows: 本次要写入该表的行数，表中已有行数不少于此数时不删除延迟索引
         :return: None
         """
         ...
 
+    def _count_rows(self, table: str, limit: int) -> int:
+        """返回表中的行数，最多数到limit
+        :param table: 数据表名称
+        :param limit: 最大行数
+        :return: 行数
+        """
+        ...
+
     def _handle_data(self, data: Any) -> list:
         """接收数据后的格式化"""
         ...
+
+
+def warm_db_seen(recorder: DBRecorder, table: str) -> None:
+    """读取数据表中已有数据，初始化该表的去重记录
+    :param recorder: DBRecorder对象
+    :param table: 表名
+    :return: None
+    """
+    ...
+
+
+def iter_db_rows(recorder: DBRecorder, table: str, cols: Union[str, int, list, tuple, True],
+                 count: Optional[int], where: Optional[Filter], batch: int) -> Generator[RowData, None, None]:
+    """用只读连接按条件分批读取数据表
+    :param recorder: DBRecorder对象
+    :param table: 数据表名称
+    :param cols: 要获取的列
+    :param count: 获取多少条数据，为None获取所有
+    :param where: 筛选条件
+    :param batch: 每次获取的行数
+    :return: 逐条返回RowData对象的生成器
+    """
+    ...
+
+
+def infer_types(keys: Iterable[Any], rows: list) -> Dict[Any, str]:
+    """按每列第一个不为None的值推断列类型，只看dict格式数据
+    :param keys: 要推断的列名
+    :param rows: 数据
+    :return: {列名: 类型}，全为None的列不包含在内
+    """
+    ...
+
+
+def col_defs(keys: Iterable[Any], types: Dict[Any, str]) -> str:
+    """生成建表或新增列语句中的列定义
+    :param keys: 列名
+    :param types: {列名: 类型}
+    :return: 列定义文本
+    """
+    ...
@@ -0,0 +1,191 @@
+# -*- coding:utf-8 -*-
+from multiprocessing import get_context
+from queue import Empty, Full
+from time import perf_counter
+
+
+class DBWriter(object):
+    def __init__(self, path, table=None, cache_size=1000, interval=1, setup=None, keep_connection=True,
+                 max_batches=1000, mp_context=None):
+        self._path = path
+        self._table = table
+        self._cache_size = cache_size
+        self._interval = interval
+        self._setup = setup
+        self._keep_conn = keep_connection
+        self._ctx = get_context(mp_context)
+        self._queue = self._ctx.Queue(max_batches)  # 有上限，写入跟不上时客户端等待
+        self._stopped = self._ctx.Event()  # 写入进程结束时设置，客户端据此不再等待
+        self._process = None
+
+    @property
+    def path(self):
+        return self._path
+
+    @property
+    def is_alive(self):
+        return self._process is not None and self._process.is_alive()
+
+    def start(self):
+        if self.is_alive:
+            return self
+        self._stopped.clear()
+        self._process = self._ctx.Process(target=run_writer, daemon=True,
+                                          args=(self._queue, self._path, self._table, self._cache_size,
+                                                self._interval, self._setup, self._keep_conn, self._stopped))
+        self._process.start()
+        return self
+
+    def client(self, cache_size=100, table=None, timeout=None):
+        return DBClient(self._queue, cache_size, table or self._table, self._stopped, timeout)
+
+    def record(self):
+        put_message(self._queue, self._stopped, ('record', None, None))
+
+    def stop(self, timeout=None):
+        if self._process is None:
+            return
+        process, self._process = self._process, None
+        try:
+            put_message(self._queue, self._stopped, None, timeout)
+        except RuntimeError:  # 写入进程已结束，下面报告退出码
+            pass
+        process.join(timeout)
+        if process.is_alive():  # 超时仍未结束时强制结束
+            process.terminate()
+            process.join()
+            raise RuntimeError('写入进程未在限定时间内结束，已强制结束，队列中未写入的数据已丢失。')
+        if process.exitcode:
+            raise RuntimeError(f'写入进程异常结束，退出码：{process.exitcode}，队列中未写入的数据已丢失。')
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+class DBClient(object):
+    def __init__(self, queue, cache_size=100, table=None, stopped=None, timeout=None):
+        self._queue = queue
+        self._cache_size = cache_size
+        self._table = table
+        self._stopped = stopped
+        self._timeout = timeout
+        self._data = {}  # {表名: [数据, ...]}
+        self._data_count = 0
+
+    def __del__(self):
+        try:
+            self.record()
+        except:
+            pass
+
+    def __getstate__(self):  # 传给子进程时不带未发送的数据
+        return {'_queue': self._queue, '_cache_size': self._cache_size, '_table': self._table,
+                '_stopped': self._stopped, '_timeout': self._timeout}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._data = {}
+        self._data_count = 0
+
+    @property
+    def table(self):
+        return self._table
+
+    def add_data(self, data, table=None):
+        self._data.setdefault(table or self._table, []).append(data)
+        self._data_count += 1
+        if 0 < self._cache_size <= self._data_count:
+            self.record()
+
+    def record(self):
+        if not self._data_count:
+            return
+        data, self._data, self._data_count = self._data, {}, 0
+        batches = list(data.items())
+        for i, (table, batch) in enumerate(batches):  # 一个表的数据作为一条消息发送
+            try:
+                put_message(self._queue, self._stopped, ('data', table, batch), self._timeout)
+            except BaseException:
+                for t, b in batches[i:]:  # 未发送的数据放回缓存
+                    self._data.setdefault(t, []).extend(b)
+                    self._data_count += len(b)
+                raise
+
+
+def put_message(queue, stopped, msg, timeout=None):
+    # 队列满时定时检查写入进程是否已结束，避免在进程退出后一直等待
+    end = None if timeout is None else perf_counter() + timeout
+    while True:
+        if stopped is not None and stopped.is_set():
+            raise RuntimeError('写入进程已结束，数据无法发送。')
+        wait = 1 if end is None else min(1, end - perf_counter())
+        if wait <= 0:
+            raise TimeoutError('等待写入进程接收数据超时。')
+        try:
+            queue.put(msg, timeout=wait)
+            return
+        except Full:
+            continue
+
+
+def run_writer(queue, path, table, cache_size, interval, setup, keep_connection, stopped=None):
+    from .db_recorder import DBRecorder
+    recorder = None
+    try:
+        recorder = DBRecorder(path, cache_size=cache_size, table=table)
+        recorder.show_msg = False
+        if keep_connection:
+            recorder.set.keep_connection()
+        if setup is not None:
+            setup(recorder)
+        while True:
+            try:
+                msg = queue.get(timeout=interval)
+            except Empty:  # 空闲时写入已收到的数据
+                recorder.record()
+                drop_failed(recorder)
+                continue
+            if msg is None:
+                break
+            try:
+                handle_message(recorder, msg)
+            except Exception:  # 与record()相同，一条消息出错时报告并保存数据，不影响其它消息
+                report_failed(msg)
+                drop_failed(recorder)
+    finally:
+        if stopped is not None:
+            stopped.set()
+        if recorder is not None:
+            recorder.close()
+
+
+def handle_message(recorder, msg):
+    cmd, table, data = msg
+    if cmd == 'data':
+        for d in data:
+            recorder.add_data(d, table)
+            drop_failed(recorder)  # 缓存满时add_data()会写入
+    elif cmd == 'record':
+        recorder.record()
+        drop_failed(recorder)
+
+
+def drop_failed(recorder):
+    # record()出错时已把数据保存到failed_data.txt，但不清空缓存也不恢复接收数据，在此丢弃这批数据，后续数据才能继续写入
+    if recorder._pause_add:
+        recorder.clear()
+        recorder._pause_add = False
+
+
+def report_failed(msg):
+    from traceback import print_exc
+    print_exc()
+    try:
+        with open('failed_data.txt', 'a+', encoding='utf-8') as f:
+            f.write(str(msg[2]) + '\n')
+        print('保存失败的数据已保存到failed_data.txt。')
+    except:
+        print('未保存数据：', msg[2])
@@ -0,0 +1,191 @@
+# -*- coding:utf-8 -*-
+from multiprocessing import Queue
+from multiprocessing.context import BaseContext
+from multiprocessing.synchronize import Event
+from multiprocessing.process import BaseProcess
+from pathlib import Path
+from typing import Union, Any, Optional, Callable, Dict, List
+
+from .db_recorder import DBRecorder
+
+
+class DBWriter(object):
+    """在单独的进程中持有数据库连接，多个进程通过DBClient把数据发送给它写入，避免多个进程争抢写锁"""
+    _path: Union[str, Path] = ...
+    _table: Optional[str] = ...
+    _cache_size: int = ...
+    _interval: float = ...
+    _setup: Optional[Callable[[DBRecorder], Any]] = ...
+    _keep_conn: bool = ...
+    _ctx: BaseContext = ...
+    _queue: Queue = ...
+    _stopped: Event = ...
+    _process: Optional[BaseProcess] = ...
+
+    def __init__(self,
+                 path: Union[str, Path],
+                 table: Optional[str] = None,
+                 cache_size: int = 1000,
+                 interval: float = 1,
+                 setup: Optional[Callable[[DBRecorder], Any]] = None,
+                 keep_connection: bool = True,
+                 max_batches: int = 1000,
+                 mp_context: Optional[str] = None):
+        """
+        :param path: 数据库文件路径
+        :param table: 默认表名
+        :param cache_size: 写入进程中DBRecorder的缓存大小
+        :param interval: 没有收到数据超过这个秒数时写入已收到的数据
+        :param setup: 在写入进程中设置DBRecorder的函数，接收DBRecorder对象，须可被pickle
+        :param keep_connection: 写入进程是否保持数据库连接
+        :param max_batches: 队列中最多积压的批次数，写入跟不上时客户端等待
+        :param mp_context: multiprocessing启动方式，'fork'、'spawn'或'forkserver'，为None使用默认
+        """
+        ...
+
+    @property
+    def path(self) -> Union[str, Path]:
+        """返回数据库文件路径"""
+        ...
+
+    @property
+    def is_alive(self) -> bool:
+        """返回写入进程是否在运行"""
+        ...
+
+    def start(self) -> DBWriter:
+        """启动写入进程，已启动时不重复启动
+        :return: 对象自己
+        """
+        ...
+
+    def client(self, cache_size: int = 100, table: Optional[str] = None, timeout: Optional[float] = None) -> DBClient:
+        """返回用于发送数据的客户端，可作为参数传给子进程
+        :param cache_size: 客户端每积累多少条数据发送一次，0为只在调用record()时发送
+        :param table: 客户端的默认表名，为None使用DBWriter的设置
+        :param timeout: 队列满时客户端最多等待的秒数，为None时一直等待到写入进程结束
+        :return: DBClient对象
+        """
+        ...
+
+    def record(self) -> None:
+        """通知写入进程立即写入已收到的数据
+        :return: None
+        """
+        ...
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """写入队列中剩余数据后结束写入进程，客户端须已调用record()发送数据，写入进程异常结束时抛出RuntimeError，
+        超时仍未结束时强制结束进程并抛出RuntimeError
+        :param timeout: 等待进程结束的秒数，为None一直等待
+        :return: None
+        """
+        ...
+
+    def __enter__(self) -> DBWriter: ...
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None: ...
+
+
+class DBClient(object):
+    """向DBWriter发送数据的客户端，在本地积累数据后按表成批发送"""
+    _queue: Queue = ...
+    _cache_size: int = ...
+    _table: Optional[str] = ...
+    _stopped: Optional[Event] = ...
+    _timeout: Optional[float] = ...
+    _data: Dict[Optional[str], List[Any]] = ...
+    _data_count: int = ...
+
+    def __init__(self,
+                 queue: Queue,
+                 cache_size: int = 100,
+                 table: Optional[str] = None,
+                 stopped: Optional[Event] = None,
+                 timeout: Optional[float] = None):
+        """
+        :param queue: 与写入进程通信的队列
+        :param cache_size: 每积累多少条数据发送一次
+        :param table: 默认表名
+        :param stopped: 写入进程结束时设置的Event
+        :param timeout: 队列满时最多等待的秒数，为None时一直等待到写入进程结束
+        """
+        ...
+
+    @property
+    def table(self) -> Optional[str]:
+        """返回默认表名"""
+        ...
+
+    def add_data(self, data: Any, table: Optional[str] = None) -> None:
+        """添加数据，格式与DBRecorder.add_data()相同，在写入进程中处理
+        :param data: 可以是一维或二维数据
+        :param table: 数据要插入的表名称，为None使用默认表
+        :return: None
+        """
+        ...
+
+    def record(self) -> None:
+        """把积累的数据发送给写入进程，进程结束前须调用。
+        写入进程已结束时抛出RuntimeError，超时抛出TimeoutError，未发送的数据留在缓存中
+        :return: None
+        """
+        ...
+
+
+def put_message(queue: Queue, stopped: Optional[Event], msg: Any, timeout: Optional[float] = None) -> None:
+    """向写入进程发送消息，队列满时等待，期间写入进程结束则抛出RuntimeError
+    :param queue: 与写入进程通信的队列
+    :param stopped: 写入进程结束时设置的Event
+    :param msg: 消息
+    :param timeout: 最多等待的秒数，超时抛出TimeoutError，为None一直等待
+    :return: None
+    """
+    ...
+
+
+def run_writer(queue: Queue,
+               path: Union[str, Path],
+               table: Optional[str],
+               cache_size: int,
+               interval: float,
+               setup: Optional[Callable[[DBRecorder], Any]],
+               keep_connection: bool,
+               stopped: Optional[Event] = None) -> None:
+    """写入进程的主循环，收到None时写入剩余数据并关闭连接，一条消息出错时报告并继续
+    :param queue: 与客户端通信的队列
+    :param path: 数据库文件路径
+    :param table: 默认表名
+    :param cache_size: DBRecorder的缓存大小
+    :param interval: 空闲多少秒后写入已收到的数据
+    :param setup: 设置DBRecorder的函数
+    :param keep_connection: 是否保持数据库连接
+    :param stopped: 进程结束时设置的Event
+    :return: None
+    """
+    ...
+
+
+def handle_message(recorder: DBRecorder, msg: tuple) -> None:
+    """在写入进程中处理一条消息
+    :param recorder: DBRecorder对象
+    :param msg: (命令, 表名, 数据)
+    :return: None
+    """
+    ...
+
+
+def drop_failed(recorder: DBRecorder) -> None:
+    """写入失败时丢弃缓存中已保存到failed_data.txt的数据，并恢复接收数据
+    :param recorder: DBRecorder对象
+    :return: None
+    """
+    ...
+
+
+def report_failed(msg: tuple) -> None:
+    """打印出错信息，并把消息中的数据保存到failed_data.txt
+    :param msg: (命令, 表名, 数据)
+    :return: None
+    """
+    ...
@@ -0,0 +1,207 @@
+# -*- coding:utf-8 -*-
+from array import array
+from hashlib import blake2b
+from math import ceil, log
+
+from .sidecar import sidecar_path, load_sidecar, save_sidecar, remove_sidecar, file_state, tail_hash
+from .tools import index_key
+
+
+class SeenSet(object):
+    __slots__ = ('_seen', '_new', '_loaded')
+
+    def __init__(self):
+        self._seen = set()
+        self._new = array('Q')  # 未保存的哈希值
+        self._loaded = False  # 是否从文件读取过
+
+    def add(self, digest):
+        h = int.from_bytes(digest[:8], 'little')
+        if h in self._seen:
+            return False
+        self._seen.add(h)
+        self._new.append(h)
+        return True
+
+    def load(self, path):
+        a = array('Q')
+        with open(path, 'rb') as f:
+            a.frombytes(f.read())
+        self._seen.update(a)
+        self._loaded = True
+
+    def save(self, path):
+        if self._loaded and not self._new:
+            return
+        a = self._new if self._loaded else array('Q', self._seen)  # 首次保存时写入全部
+        with open(path, 'ab' if self._loaded else 'wb') as f:
+            f.write(a.tobytes())
+        self._new = array('Q')
+        self._loaded = True
+
+    def __len__(self):
+        return len(self._seen)
+
+
+class BloomFilter(object):
+    __slots__ = ('_bits', '_size', '_hashes', '_count', '_changed', '_loaded')
+
+    def __init__(self, capacity, error_rate):
+        self._size = max(8, ceil(-capacity * log(error_rate) / log(2) ** 2))
+        self._hashes = max(1, round(self._size / capacity * log(2)))
+        self._bits = bytearray((self._size + 7) // 8)
+        self._count = 0
+        self._changed = False
+        self._loaded = False  # 是否从文件读取过，未读取时保存会覆盖已有文件
+
+    def add(self, digest):
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        bits = self._bits
+        size = self._size
+        new = False
+        for i in range(self._hashes):
+            n = (h1 + i * h2) % size
+            byte, bit = n >> 3, 1 << (n & 7)
+            if not bits[byte] & bit:
+                bits[byte] |= bit
+                new = True
+        if new:
+            self._count += 1
+            self._changed = True
+        return new
+
+    def load(self, path):
+        with open(path, 'rb') as f:
+            size = int.from_bytes(f.read(8), 'little')
+            hashes = int.from_bytes(f.read(8), 'little')
+            count = int.from_bytes(f.read(8), 'little')
+            bits = f.read()
+        if size == self._size and hashes == self._hashes and len(bits) == len(self._bits):
+            self._bits = bytearray(bits)
+            self._count = count
+            self._loaded = True
+        else:  # 参数不同时无法合并
+            raise ValueError('Bloom过滤器参数与已保存的不一致。')
+
+    def save(self, path):
+        if self._loaded and not self._changed:
+            return
+        with open(path, 'wb') as f:
+            f.write(self._size.to_bytes(8, 'little') + self._hashes.to_bytes(8, 'little')
+                    + self._count.to_bytes(8, 'little') + self._bits)
+        self._changed = False
+        self._loaded = True
+
+    def __len__(self):
+        return self._count
+
+
+class Deduper(object):
+    def __init__(self, key_cols, persist=True, bloom=False, capacity=1000000, error_rate=.001):
+        if isinstance(key_cols, (str, int)):
+            key_cols = (key_cols,)
+        elif isinstance(key_cols, (list, tuple)) and key_cols:
+            key_cols = tuple(key_cols)
+        else:
+            raise TypeError('key_cols只能是str、int或由它们组成的非空list、tuple。')
+        if bloom and not 0 < error_rate < 1:
+            raise ValueError('error_rate必须大于0且小于1。')
+        self.key_cols = key_cols
+        self.persist = persist
+        self.bloom = bloom
+        self._capacity = capacity
+        self._error_rate = error_rate
+        self._tables = {}  # {表名: SeenSet或BloomFilter}
+        self._positions = {}  # {表名: list数据中各去重列的位置}
+
+    def reset(self):
+        self._tables.clear()
+        self._positions.clear()
+
+    def is_warmed(self, table):
+        return table in self._tables
+
+    def saved(self, path, table, sources=None):
+        if not self.persist or not path:
+            return False
+        file = self._file(path, table)
+        if not file.exists():
+            return False
+        # 保存后数据文件被修改、删除或换成别的文件时，已保存的值不可信
+        return load_sidecar(path, 'dedupe').get(file.name, None) == data_state(sources or (path,))
+
+    def warm(self, path, table, rows=None, positions=None, sources=None):
+        seen = BloomFilter(self._capacity, self._error_rate) if self.bloom else SeenSet()
+        self._tables[table] = seen
+        self._positions[table] = positions
+        if self.saved(path, table, sources):  # 已保存且数据文件未变时不需要读取数据文件
+            file = self._file(path, table)
+            try:
+                seen.load(file)
+                return
+            except (OSError, ValueError):
+                pass
+        if rows is not None:
+            for r in rows:
+                seen.add(make_digest(r))
+
+    def filter(self, table, rows, keys=None):
+        seen = self._tables[table]
+        return [r for r in rows if seen.add(make_digest(self.key_values(table, r, keys)))]
+
+    def key_values(self, table, row, keys=None):
+        if keys is not None:  # 与rows对应的列名
+            row = dict(zip(keys, row))
+        if isinstance(row, dict):
+            return [row.get(k, None) for k in self.key_cols]
+        positions = self._positions.get(table, None)
+        if positions is None:
+            raise RuntimeError('无法确定去重列在list数据中的位置，请设置表头或使用dict数据。')
+        return [row[p] if p < len(row) else None for p in positions]
+
+    def save(self, path, sources=None):
+        if not self.persist or not path or not self._tables:
+            return
+        for table, seen in self._tables.items():
+            seen.save(self._file(path, table))
+        data = load_sidecar(path, 'dedupe')  # 记录保存时数据文件的状态，读取时据此校验
+        state = data_state(sources or (path,))
+        data.update({self._file(path, table).name: state for table in self._tables})
+        save_sidecar(path, 'dedupe', data)
+
+    def _file(self, path, table):
+        suffix = 'bloom' if self.bloom else 'seen'
+        if table is not None:
+            suffix = f'{blake2b(str(table).encode(), digest_size=6).hexdigest()}.{suffix}'
+        return sidecar_path(path, suffix)
+
+    def __len__(self):
+        return sum(len(i) for i in self._tables.values())
+
+
+def make_digest(values):
+    return blake2b('\x1f'.join(index_key(v) for v in values).encode(), digest_size=16).digest()
+
+
+def data_state(paths):
+    res = []
+    for p in paths:
+        state = file_state(p)
+        res.append(None if state is None else [state[0], state[1], tail_hash(p, state[0])])
+    return res
+
+
+def remove_seen(path):
+    for suffix in ('seen', 'bloom', '*.seen', '*.bloom', 'dedupe'):
+        remove_sidecar(path, suffix)
+
+
+def key_positions(key_cols, header):
+    positions = []
+    for k in key_cols:
+        num = header.get_num(k) if header is not None and isinstance(k, str) else k
+        if not isinstance(num, int) or num < 1:
+            return None
+        positions.append(num - 1)
+    return positions
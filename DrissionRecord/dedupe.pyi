@@ -0,0 +1,212 @@
+# -*- coding:utf-8 -*-
+from array import array
+from pathlib import Path
+from typing import Union, Optional, Iterable, List, Dict, Tuple
+
+
+class SeenSet(object):
+    """保存已出现数据哈希值的集合"""
+    _seen: set = ...
+    _new: array = ...
+    _loaded: bool = ...
+
+    def __init__(self) -> None: ...
+
+    def add(self, digest: bytes) -> bool:
+        """添加一个哈希值
+        :param digest: 数据的哈希值
+        :return: 是否新值
+        """
+        ...
+
+    def load(self, path: Union[str, Path]) -> None:
+        """从文件读取已保存的哈希值
+        :param path: 文件路径
+        :return: None
+        """
+        ...
+
+    def save(self, path: Union[str, Path]) -> None:
+        """把哈希值保存到文件，首次保存写入全部，之后只追加新值
+        :param path: 文件路径
+        :return: None
+        """
+        ...
+
+    def __len__(self) -> int: ...
+
+
+class BloomFilter(object):
+    """Bloom过滤器，占用内存固定"""
+    _bits: bytearray = ...
+    _size: int = ...
+    _hashes: int = ...
+    _count: int = ...
+    _changed: bool = ...
+    _loaded: bool = ...
+
+    def __init__(self, capacity: int, error_rate: float) -> None:
+        """
+        :param capacity: 预计容纳的数据量
+        :param error_rate: 达到capacity时的误判率
+        """
+        ...
+
+    def add(self, digest: bytes) -> bool:
+        """添加一个哈希值
+        :param digest: 数据的哈希值
+        :return: 是否新值
+        """
+        ...
+
+    def load(self, path: Union[str, Path]) -> None:
+        """从文件读取已保存的过滤器
+        :param path: 文件路径
+        :return: None
+        """
+        ...
+
+    def save(self, path: Union[str, Path]) -> None:
+        """把过滤器保存到文件
+        :param path: 文件路径
+        :return: None
+        """
+        ...
+
+    def __len__(self) -> int: ...
+
+
+class Deduper(object):
+    """按指定列丢弃重复行的去重器"""
+    key_cols: Tuple[Union[str, int], ...] = ...
+    persist: bool = ...
+    bloom: bool = ...
+    _capacity: int = ...
+    _error_rate: float = ...
+    _tables: Dict[Optional[str], Union[SeenSet, BloomFilter]] = ...
+    _positions: Dict[Optional[str], Optional[List[int]]] = ...
+
+    def __init__(self,
+                 key_cols: Union[str, int, list, tuple],
+                 persist: bool = True,
+                 bloom: bool = False,
+                 capacity: int = 1000000,
+                 error_rate: float = .001) -> None:
+        """
+        :param key_cols: 用于判断是否重复的列名或列序号，可传入多个
+        :param persist: 是否把已出现的值保存到文件
+        :param bloom: 是否使用Bloom过滤器
+        :param capacity: Bloom过滤器预计容纳的数据量
+        :param error_rate: Bloom过滤器在达到capacity时的误判率
+        """
+        ...
+
+    def reset(self) -> None:
+        """清空所有表的去重记录，更换文件时使用
+        :return: None
+        """
+        ...
+
+    def is_warmed(self, table: Optional[str]) -> bool:
+        """返回某个表是否已初始化去重记录
+        :param table: 表名
+        :return: 是否已初始化
+        """
+        ...
+
+    def saved(self,
+              path: Optional[str],
+              table: Optional[str],
+              sources: Optional[Iterable[str]] = None) -> bool:
+        """返回某个表的去重记录是否已保存到文件，且数据文件在保存后没有变化
+        :param path: 数据文件路径
+        :param table: 表名
+        :param sources: 用于校验的数据文件，为None时使用path
+        :return: 是否已保存且有效
+        """
+        ...
+
+    def warm(self,
+             path: Optional[str],
+             table: Optional[str],
+             rows: Optional[Iterable[Iterable]] = None,
+             positions: Optional[List[int]] = None,
+             sources: Optional[Iterable[str]] = None) -> None:
+        """初始化某个表的去重记录，已保存且有效时从文件读取，否则使用rows中的数据
+        :param path: 数据文件路径
+        :param table: 表名
+        :param rows: 已有数据中去重列的值
+        :param positions: 去重列在list数据中的位置
+        :param sources: 用于校验的数据文件，为None时使用path
+        :return: None
+        """
+        ...
+
+    def filter(self, table: Optional[str], rows: list, keys: Optional[list] = None) -> list:
+        """丢弃已出现过的行，并记录新的行
+        :param table: 表名
+        :param rows: 数据列表
+        :param keys: rows为list格式时对应的列名
+        :return: 去重后的数据列表
+        """
+        ...
+
+    def key_values(self, table: Optional[str], row: Union[list, tuple, dict], keys: Optional[list] = None) -> list:
+        """获取一行数据中去重列的值
+        :param table: 表名
+        :param row: 行数据
+        :param keys: row为list格式时对应的列名
+        :return: 去重列的值组成的列表
+        """
+        ...
+
+    def save(self, path: Optional[str], sources: Optional[Iterable[str]] = None) -> None:
+        """把各表的去重记录保存到文件，并记录数据文件当前的状态
+        :param path: 数据文件路径
+        :param sources: 用于校验的数据文件，为None时使用path
+        :return: None
+        """
+        ...
+
+    def _file(self, path: str, table: Optional[str]) -> Path:
+        """返回某个表的去重记录文件路径
+        :param path: 数据文件路径
+        :param table: 表名
+        :return: 文件路径
+        """
+        ...
+
+    def __len__(self) -> int: ...
+
+
+def make_digest(values: Iterable) -> bytes:
+    """计算一组值的哈希值
+    :param values: 值
+    :return: 16字节哈希值
+    """
+    ...
+
+
+def data_state(paths: Iterable[str]) -> List[Optional[list]]:
+    """返回各文件的大小、修改时间和末尾内容的哈希值，用于判断文件是否变化
+    :param paths: 文件路径
+    :return: 每个文件为[大小, 修改时间, 哈希值]，文件不存在时为None
+    """
+    ...
+
+
+def remove_seen(path: Union[str, Path]) -> None:
+    """删除数据文件的所有去重记录文件
+    :param path: 数据文件路径
+    :return: None
+    """
+    ...
+
+
+def key_positions(key_cols: Iterable[Union[str, int]], header: Optional[object]) -> Optional[List[int]]:
+    """根据表头获取去重列在list数据中的位置
+    :param key_cols: 去重列的列名或列序号
+    :param header: 表头对象
+    :return: 从0开始的位置列表，无法确定时返回None
+    """
+    ...
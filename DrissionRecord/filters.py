@@ -0,0 +1,252 @@
+# -*- coding:utf-8 -*-
+from re import compile as re_compile
+
+
+class Filter(object):
+    __slots__ = ('_col', '_op', '_args')
+
+    def __init__(self, col=None):
+        if col is not None and not isinstance(col, (int, str)):
+            raise TypeError(f'col值只能是int或str。当前值：{col}')
+        self._col = col
+        self._op = None
+        self._args = None
+
+    def eq(self, value):
+        return self._new('in', (value,))
+
+    def ne(self, value):
+        return self._new('not_in', (value,))
+
+    def in_(self, values):
+        return self._new('in', tuple(values) if isinstance(values, (list, tuple, set, frozenset)) else (values,))
+
+    def not_in(self, values):
+        return self._new('not_in', tuple(values) if isinstance(values, (list, tuple, set, frozenset)) else (values,))
+
+    def empty(self):
+        return self._new('empty', None)
+
+    def not_empty(self):
+        return ~self._new('empty', None)
+
+    def regex(self, pattern, flags=0):
+        return self._new('regex', pattern if hasattr(pattern, 'search') else re_compile(pattern, flags))
+
+    def between(self, low=None, high=None):
+        if low is None and high is None:
+            raise ValueError('low和high不能都为None。')
+        return self._new('between', (low, high))
+
+    def compile(self, header, file_type):
+        op = self._op
+        if op is None:
+            raise RuntimeError('未设置筛选条件。')
+
+        if op in ('and', 'or'):
+            funcs = tuple(f.compile(header, file_type) for f in self._args)
+            if op == 'and':
+                def match(row):
+                    for f in funcs:
+                        if not f(row):
+                            return False
+                    return True
+            else:
+                def match(row):
+                    for f in funcs:
+                        if f(row):
+                            return True
+                    return False
+            return match
+
+        elif op == 'not':
+            func = self._args.compile(header, file_type)
+            return lambda row: not func(row)
+
+        get = make_getter(self._col, header, file_type)
+        if op in ('in', 'not_in'):
+            values = make_values(self._args, file_type)
+            if op == 'in':
+                return lambda row: get(row) in values
+            return lambda row: get(row) not in values
+
+        elif op == 'empty':
+            def match(row):
+                v = get(row)
+                return v is None or v == ''
+            return match
+
+        elif op == 'text_in':  # 按文本比较，None与''相同，与csv中的标记列一致
+            values = frozenset(self._args)
+            return lambda row: to_text(get(row)) in values
+
+        elif op == 'regex':
+            search = self._args.search
+
+            def match(row):
+                v = get(row)
+                if v is None:
+                    return False
+                return search(v if isinstance(v, str) else str(v)) is not None
+            return match
+
+        elif op == 'between':
+            low, high = self._args
+
+            def match(row):
+                v = to_number(get(row))
+                if v is None:
+                    return False
+                return (low is None or v >= low) and (high is None or v <= high)
+            return match
+
+    def to_sql(self, header, funcs):
+        op = self._op
+        if op is None:
+            raise RuntimeError('未设置筛选条件。')
+
+        if op in ('and', 'or'):
+            parts = [f.to_sql(header, funcs) for f in self._args]
+            return (f'({f" {op.upper()} ".join(p[0] for p in parts)})',
+                    [v for p in parts for v in p[1]])
+
+        elif op == 'not':
+            sql, params = self._args.to_sql(header, funcs)
+            return f'(NOT {sql})', params
+
+        col = sql_col(self._col, header)  # 每个条件都返回0或1，不返回NULL，以便NOT的结果与compile()一致
+        if op in ('in', 'not_in'):
+            values = [v for v in self._args if v is not None]
+            parts = [f'COALESCE({col} IN ({",".join("?" * len(values))}), 0)'] if values else []
+            if len(values) < len(self._args):
+                parts.append(f'{col} IS NULL')
+            sql = f'({" OR ".join(parts)})' if parts else '0'
+            return (sql if op == 'in' else f'(NOT {sql})'), values
+
+        elif op == 'empty':
+            return f'({col} IS NULL OR {col} = \'\')', []
+
+        elif op == 'text_in':
+            return f'(COALESCE(CAST({col} AS TEXT), \'\') IN ({",".join("?" * len(self._args))}))', list(self._args)
+
+        elif op == 'regex':  # sqlite没有内置正则，用注册的函数调用Python的re
+            funcs.append(self._args.search)
+            return f'DR_REGEX({len(funcs) - 1}, {col})', []
+
+        elif op == 'between':
+            low, high = self._args
+            num = f"(CASE WHEN typeof({col}) IN ('integer', 'real') THEN {col} ELSE DR_NUMBER({col}) END)"
+            parts = [i for i in (f'{num} >= ?' if low is not None else None,
+                                 f'{num} <= ?' if high is not None else None) if i]
+            return f'COALESCE({" AND ".join(parts)}, 0)', [i for i in (low, high) if i is not None]
+
+    def _new(self, op, args):
+        if self._col is None or self._op is not None:
+            raise RuntimeError('只能对Filter(col)对象设置一次条件。')
+        f = Filter(self._col)
+        f._op = op
+        f._args = args
+        return f
+
+    def _join(self, op, other):
+        if not isinstance(other, Filter):
+            raise TypeError('只能与Filter对象组合。')
+        if self._op is None or other._op is None:
+            raise RuntimeError('未设置筛选条件。')
+        f = Filter()
+        f._op = op
+        f._args = ((self._args if self._op == op else (self,))
+                   + (other._args if other._op == op else (other,)))
+        return f
+
+    def __and__(self, other):
+        return self._join('and', other)
+
+    def __or__(self, other):
+        return self._join('or', other)
+
+    def __invert__(self):
+        if self._op is None:
+            raise RuntimeError('未设置筛选条件。')
+        if self._op == 'not':
+            return self._args
+        f = Filter()
+        f._op = 'not'
+        f._args = self
+        return f
+
+    def __repr__(self):
+        if self._op in ('and', 'or'):
+            return '(' + f' {self._op} '.join(repr(f) for f in self._args) + ')'
+        elif self._op == 'not':
+            return f'not {self._args!r}'
+        elif self._op == 'regex':
+            return f'<Filter {self._col!r} regex {self._args.pattern!r}>'
+        return f'<Filter {self._col!r} {self._op} {self._args!r}>'
+
+
+def make_getter(col, header, file_type):
+    num = header.get_num(col)
+    ind = num - 1 if num else None
+    default = '' if file_type == 'csv' else None
+
+    if file_type in ('json', 'jsonl'):
+        key = col if isinstance(col, str) else header[num] if num else None
+
+        def get(row):
+            if isinstance(row, dict):
+                return row.get(key, None)
+            return row[ind] if ind is not None and ind < len(row) else None
+        return get
+
+    if ind is None:
+        return lambda row: default
+
+    def get(row):
+        return row[ind] if ind < len(row) else default
+    return get
+
+
+def sql_col(col, header):
+    num = header.get_num(col)
+    if not num or num > len(header):  # 列不存在时视为NULL
+        return 'NULL'
+    return f'`{header[num]}`'
+
+
+def sql_regex(funcs, ind, value):
+    if value is None:
+        return 0
+    return int(funcs[ind](value if isinstance(value, str) else str(value)) is not None)
+
+
+def make_values(values, file_type):
+    if file_type == 'csv':  # csv读取的值都是str
+        values = ['' if v is None else str(v) for v in values]
+    try:
+        return frozenset(values)
+    except TypeError:  # 包含不可哈希的值
+        return tuple(values)
+
+
+def sign_filter(col, signs, deny_sign):
+    # 标记列按文本比较，None和''都表示未标记，与Recorder.rows()读取csv时相同
+    if not isinstance(signs, (list, tuple, set)):
+        signs = (signs,)
+    f = Filter(col)._new('text_in', tuple(to_text(i) for i in signs))
+    return ~f if deny_sign else f
+
+
+def to_text(value):
+    return '' if value is None else str(value)
+
+
+def to_number(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+    elif isinstance(value, str) and value:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return None
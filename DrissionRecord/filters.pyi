@@ -0,0 +1,169 @@
+# -*- coding:utf-8 -*-
+from re import Pattern
+from typing import Any, Optional, Union, Callable, Iterable, Literal, Tuple, FrozenSet, List
+
+from .tools import Header
+
+FILE_TYPE = Literal['xlsx', 'csv', 'json', 'jsonl']
+
+
+class Filter(object):
+    """读取数据时的筛选条件，可用&、|、~组合多个条件，如：
+    Filter('状态').eq('完成') & (Filter('价格').between(10, 20) | ~Filter('备注').empty())
+    """
+    _col: Union[str, int, None] = ...
+    _op: Optional[str] = ...
+    _args: Any = ...
+
+    def __init__(self, col: Union[str, int, None] = None):
+        """
+        :param col: 要判断的列，传入表头值或列序号，要用列号用Col('a')
+        """
+        ...
+
+    def eq(self, value: Any) -> Filter:
+        """列值等于value，csv文件中的值都是str，会把value转为str比较
+        :param value: 要比较的值
+        :return: 新的Filter对象
+        """
+        ...
+
+    def ne(self, value: Any) -> Filter:
+        """列值不等于value
+        :param value: 要比较的值
+        :return: 新的Filter对象
+        """
+        ...
+
+    def in_(self, values: Union[list, tuple, set, Any]) -> Filter:
+        """列值是values中的一个
+        :param values: 可选值，可用list, tuple, set设置多个
+        :return: 新的Filter对象
+        """
+        ...
+
+    def not_in(self, values: Union[list, tuple, set, Any]) -> Filter:
+        """列值不是values中的任何一个
+        :param values: 排除的值，可用list, tuple, set设置多个
+        :return: 新的Filter对象
+        """
+        ...
+
+    def empty(self) -> Filter:
+        """列值为None或''，列不存在时也视为空
+        :return: 新的Filter对象
+        """
+        ...
+
+    def not_empty(self) -> Filter:
+        """列值不为None且不为''
+        :return: 新的Filter对象
+        """
+        ...
+
+    def regex(self, pattern: Union[str, Pattern], flags: int = 0) -> Filter:
+        """列值转为str后能用正则找到匹配内容，值为None时不匹配
+        :param pattern: 正则表达式
+        :param flags: 正则表达式flags，pattern为已编译对象时无效
+        :return: 新的Filter对象
+        """
+        ...
+
+    def between(self, low: Optional[float] = None, high: Optional[float] = None) -> Filter:
+        """列值转为数字后在范围内（包含边界），无法转为数字的不匹配
+        :param low: 下限，None表示不限
+        :param high: 上限，None表示不限
+        :return: 新的Filter对象
+        """
+        ...
+
+    def compile(self, header: Header, file_type: FILE_TYPE) -> Callable[[Union[list, tuple, dict]], bool]:
+        """把条件编译成判断原始行数据的函数
+        :param header: 文件的Header对象
+        :param file_type: 文件类型
+        :return: 接收原始行数据，返回是否符合条件的函数
+        """
+        ...
+
+    def to_sql(self, header: Header, funcs: List[Callable]) -> Tuple[str, list]:
+        """把条件转为sqlite的WHERE子句，结果与compile()的判断一致。正则和转数字通过注册的DR_REGEX、DR_NUMBER函数实现
+        :param header: 数据表的Header对象
+        :param funcs: 收集正则查找函数的列表，DR_REGEX按序号调用
+        :return: (sql语句, 参数列表)
+        """
+        ...
+
+    def _new(self, op: str, args: Any) -> Filter: ...
+
+    def _join(self, op: Literal['and', 'or'], other: Filter) -> Filter: ...
+
+    def __and__(self, other: Filter) -> Filter: ...
+
+    def __or__(self, other: Filter) -> Filter: ...
+
+    def __invert__(self) -> Filter: ...
+
+
+def make_getter(col: Union[str, int], header: Header,
+                file_type: FILE_TYPE) -> Callable[[Union[list, tuple, dict]], Any]:
+    """生成从原始行数据中取出列值的函数
+    :param col: 列名或列序号
+    :param header: Header对象
+    :param file_type: 文件类型
+    :return: 取值函数
+    """
+    ...
+
+
+def sql_col(col: Union[str, int], header: Header) -> str:
+    """返回sql语句中的列名，列不存在时返回NULL
+    :param col: 列名或列序号
+    :param header: Header对象
+    :return: 列名文本
+    """
+    ...
+
+
+def sql_regex(funcs: List[Callable], ind: int, value: Any) -> int:
+    """注册到sqlite的正则判断函数
+    :param funcs: to_sql()收集的正则查找函数
+    :param ind: 函数序号
+    :param value: 列值
+    :return: 1或0
+    """
+    ...
+
+
+def make_values(values: Iterable, file_type: FILE_TYPE) -> Union[FrozenSet, Tuple]:
+    """处理用于比较的值，csv文件会转为str
+    :param values: 要比较的值
+    :param file_type: 文件类型
+    :return: 可用in判断的对象
+    """
+    ...
+
+
+def sign_filter(col: Union[str, int], signs: Any, deny_sign: bool) -> Filter:
+    """生成按文本比较标记列的Filter，None和''都表示未标记，与Recorder.rows()读取csv时的标记筛选相同
+    :param col: 标记列
+    :param signs: 标记值，可传入多个
+    :param deny_sign: 是否反向匹配
+    :return: Filter对象
+    """
+    ...
+
+
+def to_text(value: Any) -> str:
+    """把值转为比较标记时使用的文本，None转为''
+    :param value: 要转换的值
+    :return: 文本
+    """
+    ...
+
+
+def to_number(value: Any) -> Optional[float]:
+    """把值转为数字，无法转换时返回None
+    :param value: 要转换的值
+    :return: 数字或None
+    """
+    ...
@@ -1,16 +1,30 @@
 # -*- coding:utf-8 -*-
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from csv import reader as csv_reader, writer as csv_writer
-from json import loads, load, dump, dumps
+from hashlib import blake2b
+from io import StringIO
+from itertools import islice
+from json import loads, load, dump, dumps, JSONDecoder
+from json.decoder import WHITESPACE
+from mmap import mmap, ACCESS_READ
 from pathlib import Path
+from re import compile as re_compile
 from time import sleep
 
 from openpyxl.reader.excel import load_workbook
 
 from .base import BaseRecorder
+from .dedupe import key_positions
+from .filters import Filter
 from .setter import RecorderSetter, set_csv_header
+from .sidecar import (load_sidecar, save_sidecar, remove_sidecar, sidecar_path, file_state, tail_hash,
+                      OffsetLines)
 from .tools import (ok_list_str, process_content_json, get_key_cols, img2ws, link2ws, height2ws, width2ws,
                     get_csv, parse_coord, do_nothing, Header, get_wb, get_ws, is_single_data,
-                    is_1D_data, data2ws, styles2ws, get_real_row, get_ws_real_coord, RowData, RowText)
+                    is_1D_data, data2ws, styles2ws, get_real_row, get_ws_real_coord, RowData, RowText,
+                    is_frame, is_array, frame2rows, frame2ws, make_final_data_simplify, pack_rows, extend_rows,
+                    process_nothing, index_key, get_tables)
 
 
 class Recorder(BaseRecorder):
@@ -34,7 +48,8 @@ class Recorder(BaseRecorder):
                          'style': styles2ws,
                          'height': height2ws,
                          'width': width2ws,
-                         'data': data2ws}
+                         'data': data2ws,
+                         'frame': frame2ws}
         super().__init__(path=path, cache_size=cache_size)
         self._data = {}
         self._delimiter = ','  # csv文件分隔符
@@ -48,6 +63,11 @@ class Recorder(BaseRecorder):
         self._None_header_is_newest = None
         self._None_header_row_is_newest = None
         self.data_col = 1
+        self._overlay = False  # 修改已有行时是否写入覆盖层
+        self._overlay_data = []  # 未写入覆盖层的修改
+        self._overlay_folded = False  # 覆盖层是否已并入本次写入的数据
+        self._key_indexes = {}  # 已加载的键索引
+        self._row_counter = None  # 已加载的行数计数器
 
     def _set_methods(self, file_type):
         self._methods[file_type] = getattr(self, f'_to_{file_type}_fast')
@@ -84,12 +104,32 @@ class Recorder(BaseRecorder):
     def header(self):
         return get_header(self)
 
+    @property
+    def row_count(self):
+        if not self._path or not Path(self._path).exists():
+            return 0
+        if self.type == 'xlsx':
+            return get_xlsx_max_row(self)
+        if self._row_counter is None or self._row_counter._path != self._path:
+            self._row_counter = RowCounter(self)
+        return self._row_counter.count
+
     def add_data(self, data, coord=None, table=None):
         coord = parse_coord(coord, self.data_col)
-        data, data_num = self._handle_data(data, coord)
-        self._add(data, table,
-                  True if self._fast and coord[0] else False,
-                  data_num, self._methods['addData'])
+        if is_frame(data):
+            data, data_num = self._handle_frame(data, coord)
+        else:
+            data, data_num = self._handle_data(data.tolist() if is_array(data) else data, coord)
+        if self._deduper is not None and not coord[0]:  # 只对新增的行去重
+            data, data_num = self._dedupe(data, table)
+            if not data_num:
+                return
+        if self._overlay and coord[0] > 0:  # 修改已有行时只记录到覆盖层，不改写文件
+            self._add(data, table, False, data_num, self._add_overlay)
+        else:
+            self._add(data, table,
+                      True if self._fast and coord[0] else False,
+                      data_num, self._methods['addData'])
 
     def _handle_data(self, data, coord):
         if is_single_data(data):
@@ -108,6 +148,31 @@ class Recorder(BaseRecorder):
             data_num = len(data)
         return data, data_num
 
+    def _handle_frame(self, frame, coord):
+        cols, rows = frame2rows(frame, self.type)
+        if self._make_final_data is not make_final_data_simplify:  # 有before或after时按普通数据处理
+            return self._handle_data([dict(zip(cols, r)) for r in rows], coord)
+
+        if self.type in ('csv', 'xlsx'):
+            data = {'type': 'frame', 'data': rows, 'cols': cols, 'coord': coord}
+        elif self.type in ('json', 'jsonl'):
+            data = {'type': 'data', 'data': [dict(zip(cols, r)) for r in rows], 'coord': coord}
+        else:
+            data = {'type': 'data', 'data': rows, 'coord': coord}
+        return data, len(rows)
+
+    def _dedupe(self, data, table):
+        if self.type != 'xlsx':
+            table = None
+        elif table is None:
+            table = self._table
+        elif table is True:
+            table = None
+        if not self._deduper.is_warmed(table):
+            warm_seen(self, table)
+        data['data'] = self._deduper.filter(table, data['data'], data.get('cols', None))
+        return data, len(data['data'])
+
     def _add(self, data, table, to_slow, num, add_method):
         while self._pause_add:  # 等待其它线程写入结束
             sleep(.02)
@@ -127,18 +192,24 @@ class Recorder(BaseRecorder):
             self.record()
 
     def _add_data_any(self, data, table):
-        if (self._data.get(table, 0) != 0 and self._data[table]
-                and data['coord'] == self._data[table][-1]['coord']
-                and self._data[table][-1]['type'] == 'data'):
-            self._data[table][-1]['data'].extend(data['data'])
-        else:
-            self._data.setdefault(table, []).append(data)
+        blocks = self._data.setdefault(table, [])
+        if not (blocks and data['coord'] == blocks[-1]['coord']
+                and data['type'] == blocks[-1]['type'] == 'data'
+                and extend_rows(blocks[-1]['data'], data['data'])):
+            blocks.append(pack_rows(data))
 
     def _add_data_txt(self, data, table):
-        if self._data.get(None, None) and data['coord'] == self._data[None][-1]['coord']:
-            self._data[table][-1]['data'].extend(data['data'])
-        else:
-            self._data.setdefault(None, []).append(data)
+        blocks = self._data.setdefault(None, [])
+        if not (blocks and data['coord'] == blocks[-1]['coord']
+                and data['type'] == blocks[-1]['type'] == 'data'
+                and extend_rows(blocks[-1]['data'], data['data'])):
+            blocks.append(pack_rows(data))
+
+    def _add_overlay(self, data, table):
+        rows = data['data'] if data['type'] == 'data' else [dict(zip(data['cols'], r)) for r in data['data']]
+        table = table if self.type == 'xlsx' else None
+        row, col = data['coord']
+        self._overlay_data.extend([table, r, col, d] for r, d in enumerate(rows, row))
 
     def _add_others(self, data, table):
         self._data.setdefault(table, []).append(data)
@@ -178,61 +249,138 @@ class Recorder(BaseRecorder):
     def add_cols_width(self, width, cols=True, table=None):
         self._methods['addWidth'](cols, width, table)
 
-    def rows(self, cols=True, sign_col=True,
-             signs=None, deny_sign=False, count=None, begin_row=None, end_row=None):
-        if not self._path or not Path(self._path).exists():
-            raise RuntimeError('未指定文件路径或文件不存在。')
+    def rows(self, cols=True, sign_col=True, signs=None, deny_sign=False,
+             count=None, begin_row=None, end_row=None, where=None, workers=None):
+        return list(self.iter_rows(cols=cols, sign_col=sign_col, signs=signs, deny_sign=deny_sign, count=count,
+                                   begin_row=begin_row, end_row=end_row, where=where, workers=workers))
 
-        if self.type == 'xlsx':
-            wb = load_workbook(self.path, data_only=True, read_only=True)
-            if self.table and self.table not in [i.title for i in wb.worksheets]:
-                raise RuntimeError(f'xlsx文件未包含指定工作表：{self.table}')
-            ws = wb[self.table] if self.table else wb.active
-            if ws.max_column is None:  # 遇到过read_only时无法获取列数的文件
-                wb.close()
-                wb = load_workbook(self.path, data_only=True)
-                ws = wb[self.table] if self.table else wb.active
-            method = get_xlsx_rows
-
-        elif self.type == 'csv':
-            ws = None
-            method = get_csv_rows
+    def iter_rows(self, cols=True, sign_col=True, signs=None, deny_sign=False,
+                  count=None, begin_row=None, end_row=None, where=None, workers=None):
+        return self._iter_rows(cols=cols, sign_col=sign_col, signs=signs, deny_sign=deny_sign, count=count,
+                               begin_row=begin_row, end_row=end_row, where=where, workers=workers)
 
-        elif self.type == 'jsonl':
-            ws = None
-            method = get_jsonl_rows
+    def tail(self, n=1, cols=True):
+        if not self._path or not Path(self._path).exists():
+            raise RuntimeError('未指定文件路径或文件不存在。')
+        if not isinstance(n, int) or n < 1:
+            raise ValueError('n必须是大于0的int。')
+        method = TAIL_METHODS.get(self.type, None)
+        if method is None:
+            raise RuntimeError('不支持的文件格式。')
+        return method(self, n, cols)
+
+    def resume_cursor(self, sign_col=True, signs=None, deny_sign=False, cols=True, where=None, name=None):
+        return ResumeCursor(self, cols=cols, sign_col=sign_col, signs=signs, deny_sign=deny_sign,
+                            where=where, name=name)
+
+    def build_index(self, col, rebuild=False):
+        name = f'{self.table or ""}|{col}'
+        index = self._key_indexes.get(name, None)
+        if index is None:
+            index = self._key_indexes[name] = KeyIndex(self, col)
+        if rebuild:
+            index.build()
+        else:
+            index.update()
+        self._key_indexes[None] = index
+        return index
 
-        elif self.type == 'json':
-            ws = None
-            method = get_json_rows
+    def find(self, value, col=None):
+        index, rows = self._find(value, col)
+        return read_index_rows(self, rows)
 
-        elif self.type == 'txt':
-            ws = None
-            method = get_txt_rows
+    def contains(self, value, col=None):
+        return bool(self._find(value, col)[1])
 
+    def _find(self, value, col):
+        if not self._path or not Path(self._path).exists():
+            raise RuntimeError('未指定文件路径或文件不存在。')
+        if col is None:
+            index = self._key_indexes.get(None, None)
+            if index is None:
+                raise RuntimeError('请先调用build_index()建立索引。')
+            index.update()
         else:
-            raise RuntimeError('不支持的文件格式。')
+            index = self.build_index(col)
+
+        key = index_key(value)
+        rows = dict(index.rows(key))
+        overlay = load_overlay(self)
+        if overlay:  # 覆盖层中修改过的行以覆盖层为准
+            header = get_header(self)
+            for row, updates in overlay.items():
+                v = overlay_value(updates, index.col, header, self.type)
+                if v is _UNSET:
+                    continue
+                elif index_key(v) == key:
+                    rows.setdefault(row, None)
+                else:
+                    rows.pop(row, None)
+        return index, rows
 
-        header = get_header(self, ws)
+    def _iter_rows(self, cols, sign_col, signs, deny_sign, count, begin_row, end_row, where, cursor=None,
+                   workers=None):
+        if not self._path or not Path(self._path).exists():
+            raise RuntimeError('未指定文件路径或文件不存在。')
+        method = ROWS_METHODS.get(self.type, None)
+        if method is None:
+            raise RuntimeError('不支持的文件格式。')
+        if where is not None and not isinstance(where, Filter):
+            raise TypeError('where参数只能是Filter对象。')
+        if self.type == 'txt' and (where is not None or sign_col is not True):  # txt文件的行没有列
+            raise TypeError('txt文件不支持where和sign_col参数。')
 
         if not isinstance(signs, (list, tuple, set)):
             signs = (signs,)
-        if self.type in ('csv', 'xlsx'):
-            if sign_col is not True:
-                sign_col = header.get_num(sign_col) or 1
-            cols = get_key_cols(cols, header)
-            if not begin_row:
-                begin_row = self._header_row.get(self.table, self._header_row[None]) + 1
-        elif not begin_row:
-            begin_row = 1
+        if workers and workers > 1 and cursor is None and self.type in ('csv', 'jsonl'):
+            return iter_rows_parallel(self, cols=cols, sign_col=sign_col, sign=signs, deny_sign=deny_sign,
+                                      count=count, begin_row=begin_row, end_row=end_row or 0, where=where,
+                                      workers=workers)
+        return method(self, cols=cols, sign_col=sign_col, sign=signs, deny_sign=deny_sign,
+                      count=count, begin_row=begin_row, end_row=end_row or 0, where=where, cursor=cursor)
+
+    def compact(self):
+        self.record()
+        if fold_overlay(self):
+            self.record()
+        return self._path
 
-        return method(self, header=header, key_cols=cols, begin_row=begin_row, end_row=end_row or 0,
-                      sign_col=sign_col, sign=signs, deny_sign=deny_sign, count=count, ws=ws)
+    def clear(self):
+        super().clear()
+        self._overlay_data.clear()
+
+    def delete(self):
+        super().delete()
+        if self._path:  # 覆盖层记录的是被删除文件的修改
+            remove_sidecar(self._path, 'overlay')
+        self._overlay_data.clear()
 
     def _record(self):
-        self._methods[self.type]()
+        if self._overlay_data:
+            write_overlay(self)
+        if (self._data and not self._overlay_folded
+                and (self.type in ('xlsx', 'json') or not self._fast)):  # 要改写整个文件时，先并入覆盖层
+            fold_overlay(self)
+        if self._data:
+            rewrite = not self._fast or (self.type == 'xlsx' and any(
+                d['coord'][0] for data in self._data.values() for d in data))
+            self._methods[self.type]()
+            if rewrite:  # 已有行被修改，索引失效
+                remove_sidecar(self.path, '*.index')
+                for index in self._key_indexes.values():
+                    index._reset()
+            else:
+                for index in self._key_indexes.values():
+                    index._appended = True
+            if self._row_counter is not None and self._row_counter._path == self.path and self.type != 'json':
+                self._row_counter.update()  # 追加数据时只读取新增部分
+        if self._overlay_folded:
+            remove_sidecar(self.path, 'overlay')
+            self._overlay_folded = False
         if not self._fast:
             self._fast_mode()
+        if self._deduper is not None:
+            self._deduper.save(self.path)
 
     def _fast_mode(self):
         self._methods['csv'] = self._to_csv_fast
@@ -313,6 +461,10 @@ class Recorder(BaseRecorder):
         header = self._header[None]
         for d in self._data[None]:
             col = header._get_num(d['coord'][1])
+            if d['type'] == 'frame':  # 已按列处理过的数据，整块写入
+                rows, rewrite = header.make_frame_rows(d['cols'], d['data'], self._auto_new_header, rewrite)
+                writer.writerows(rows if col == 1 else ([None] * (col - 1) + r for r in rows))
+                continue
             for data in d['data']:
                 data, rewrite = header.__getattribute__(rewrite_method)(data, 'csv', rewrite)
                 data = [None] * (col - 1) + data
@@ -335,7 +487,7 @@ class Recorder(BaseRecorder):
         rewrite = False
         method = 'make_change_list_rewrite' if self._auto_new_header else 'make_change_list'
         for i in self._data[None]:
-            data = i['data']
+            data = i['data'] if i['type'] == 'data' else [dict(zip(i['cols'], r)) for r in i['data']]
             row = get_real_row(i['coord'][0], lines_count)
             col = header._get_num(i['coord'][1])
             for r, da in enumerate(data, row):
@@ -386,7 +538,7 @@ class Recorder(BaseRecorder):
                         data[k] = process_content_json(d)
                     json_data.append(data)
                 else:
-                    json_data.append([process_content_json(d) for d in i])
+                    json_data.append([process_content_json(d) for d in data])
 
         with open(self.path, 'w', encoding=self.encoding) as f:
             dump(json_data, f, ensure_ascii=False)
@@ -422,6 +574,585 @@ class Recorder(BaseRecorder):
             dump(lines, f, ensure_ascii=False)
 
 
+class ResumeCursor(object):
+    def __init__(self, recorder, cols, sign_col, signs, deny_sign, where, name):
+        if recorder.type not in ('csv', 'jsonl', 'xlsx', 'json'):
+            raise RuntimeError(f'{recorder.type}格式不支持断点游标。')
+        self._recorder = recorder
+        self._path = recorder.path
+        self._args = {'cols': cols, 'sign_col': sign_col, 'signs': signs, 'deny_sign': deny_sign, 'where': where}
+        self.name = name or f'{recorder.table or ""}|{sign_col}|{signs!r}|{deny_sign}|{where!r}'
+        state = load_sidecar(self._path, 'cursor').get(self.name, {})
+        self.row = state.get('row', None)
+        self.offset = state.get('offset', None)
+        self._file = state.get('file', None)
+        self._tail = state.get('tail', None)
+        self._found = False
+
+    def fetch(self, count=100):
+        self._check()
+        self._found = False
+        rows = list(self._recorder._iter_rows(count=count, begin_row=None, end_row=None,
+                                              cursor=self, **self._args))
+        self._save()
+        return rows
+
+    def reset(self):
+        self.row = self.offset = None
+        self._save()
+
+    def _mark(self, offset, row):
+        if not self._found:
+            self._found = True
+            self.offset = offset
+            self.row = row
+
+    def _check(self):
+        if self.row is None:
+            return
+        state = file_state(self._path)
+        if state is None:
+            self.row = self.offset = None
+        elif self._file is not None and list(state) == list(self._file):
+            return
+        elif self.offset is not None and (state[0] < self.offset
+                                          or tail_hash(self._path, self.offset) != self._tail):
+            self.row = self.offset = None  # 游标前的内容被修改过，从头开始
+
+    def _save(self):
+        data = load_sidecar(self._path, 'cursor')
+        if self.row is None:
+            if data.pop(self.name, None) is None:
+                return
+        else:
+            self._file = file_state(self._path)
+            self._tail = None if self.offset is None else tail_hash(self._path, self.offset)
+            data[self.name] = {'row': self.row, 'offset': self.offset, 'file': self._file, 'tail': self._tail}
+        save_sidecar(self._path, 'cursor', data)
+
+    def __repr__(self):
+        return f'<ResumeCursor {self.name} row={self.row}>'
+
+
+class KeyIndex(object):
+    def __init__(self, recorder, col):
+        if recorder.type not in ('csv', 'jsonl', 'xlsx', 'json'):
+            raise RuntimeError(f'{recorder.type}格式不支持建立索引。')
+        if not isinstance(col, (int, str)):
+            raise TypeError(f'col值只能是int或str。当前值：{col}')
+        self._recorder = recorder
+        self._path = recorder.path
+        self.col = col
+        self.name = f'{recorder.table or ""}|{col}'
+        self._appended = False  # 本对象写入后只在末尾追加了数据
+        self._suffix = f'{blake2b(self.name.encode(), digest_size=6).hexdigest()}.index'
+        state = load_sidecar(self._path, self._suffix)
+        if state.get('col', None) == col:
+            self._keys = state['keys']
+            self._file = state['file']
+            self._end = state['end']
+            self._next_row = state['next_row']
+            self._tail = state['tail']
+        else:
+            self._reset()
+
+    def __len__(self):
+        return len(self._keys)
+
+    def rows(self, value):
+        return self._keys.get(index_key(value), [])
+
+    def build(self):
+        self._reset()
+        self._scan()
+        self.save()
+
+    def update(self):
+        state = file_state(self._path)
+        if state is None:
+            raise RuntimeError('文件不存在。')
+        if self._file is not None and list(state) == list(self._file):
+            return
+        rows = self._next_row
+        if rows is not None and not self._unchanged(state[0]):
+            self._reset()
+        self._scan()
+        if rows is None or self._next_row is None or (self._next_row - rows) * 10 >= rows:
+            self.save()  # 新增的行较少时不保存，文件中的索引仍有效，读取时会补充
+
+    def _unchanged(self, size):
+        if self._end is None:  # xlsx和json无法判断，除非是本对象追加的数据
+            return self._appended
+        return size >= self._end and tail_hash(self._path, self._end) == self._tail
+
+    def _reset(self):
+        self._keys = {}
+        self._file = None
+        self._end = None
+        self._next_row = None
+        self._tail = None
+        self._appended = False
+
+    def save(self):
+        save_sidecar(self._path, self._suffix,
+                     {'col': self.col, 'file': self._file, 'end': self._end, 'next_row': self._next_row,
+                      'tail': self._tail, 'keys': self._keys})
+
+    def _scan(self):
+        SCAN_METHODS[self._recorder.type](self._recorder, self)
+        self._appended = False
+        self._file = file_state(self._path)
+        self._tail = None if self._end is None else tail_hash(self._path, self._end)
+
+    def __repr__(self):
+        return f'<KeyIndex {self.name} keys={len(self._keys)}>'
+
+
+TAIL_BLOCK = 65536  # 从文件末尾向前读取时每次读取的字节数
+COUNT_BLOCK = 1 << 20  # 统计行数时每次处理的字节数
+JSON_BLOCK = 65536  # 解析json文件时每次读取的字符数
+_NUMBER_TAIL = re_compile(r'[0-9.eE+\-]*')
+PARALLEL_CHUNK = 1 << 22  # 多进程读取时每块的最小字节数
+_NOT_MARKS = {}  # {引号: 除引号和换行外的所有字节}
+
+
+class RowCounter(object):
+    def __init__(self, recorder):
+        self._recorder = recorder
+        self._path = recorder.path
+        state = load_sidecar(self._path, 'count')
+        if state:
+            self._lines = state['lines']
+            self._end = state['end']
+            self._quoted = state['quoted']
+            self._last_nl = state['last_nl']
+            self._marks = state.get('marks', [])
+            self._file = state['file']
+            self._tail = state['tail']
+        else:
+            self._reset()
+
+    @property
+    def count(self):
+        self.update()
+        return self._lines if self._last_nl else self._lines + 1
+
+    @property
+    def cheap(self):
+        # 计数与文件一致，或文件只在末尾追加了不超过一个块时，更新计数不用统计整个文件
+        state = file_state(self._path)
+        if state is None or self._file is None:
+            return False
+        if list(state) == list(self._file):
+            return True
+        return (self._recorder.type != 'json' and self._end <= state[0] <= self._end + COUNT_BLOCK
+                and tail_hash(self._path, self._end) == self._tail)
+
+    def offset(self, num):
+        self.update()
+        if self._recorder.type == 'json':
+            return None
+        res = None
+        for mark in self._marks:  # 找到num行之前最近的记录点
+            if mark[1] > num:
+                break
+            res = mark
+        return res
+
+    def update(self):
+        state = file_state(self._path)
+        if state is None:
+            self._reset()
+            return
+        if self._file is not None and list(state) == list(self._file):
+            return
+        if self._recorder.type == 'json':
+            with open(self._path, 'r', encoding=self._recorder.encoding) as f:
+                self._lines = sum(1 for _ in iter_json_array(f))
+            self._last_nl = True
+            self._end = state[0]
+        else:
+            if state[0] < self._end or tail_hash(self._path, self._end) != self._tail:  # 不是只在末尾追加
+                self._reset()
+            quote = self._recorder.quote_char.encode(self._recorder.encoding) \
+                if self._recorder.type == 'csv' else None
+            self._lines, self._quoted, last_nl, self._end = count_lines(self._path, self._end, self._lines, quote,
+                                                                        self._quoted, self._marks)
+            if last_nl is not None:
+                self._last_nl = last_nl
+        self._file = file_state(self._path)
+        self._tail = tail_hash(self._path, self._end)
+        save_sidecar(self._path, 'count',
+                     {'lines': self._lines, 'end': self._end, 'quoted': self._quoted, 'last_nl': self._last_nl,
+                      'marks': self._marks, 'file': self._file, 'tail': self._tail})
+
+    def _reset(self):
+        self._lines = 0
+        self._end = 0
+        self._quoted = False
+        self._last_nl = True
+        self._marks = []  # [[字节位置, 之前的行数, 是否在引号内], ...]，每块一个，用于快速跳过行
+        self._file = None
+        self._tail = None
+
+    def __repr__(self):
+        return f'<RowCounter {self._path} lines={self._lines}>'
+
+
+def count_lines(path, begin=0, lines=0, quote=None, quoted=False, marks=None, block=COUNT_BLOCK):
+    with open(path, 'rb') as f:
+        size = f.seek(0, 2)
+        if size <= begin:
+            return lines, quoted, None, begin
+        with mmap(f.fileno(), 0, access=ACCESS_READ) as mm:
+            for i in range(begin, size, block):
+                if marks is not None and (not marks or i - marks[-1][0] >= block):
+                    marks.append([i, lines, quoted])
+                chunk = mm[i:i + block]
+                if quote is None or (not quoted and quote not in chunk):
+                    lines += chunk.count(b'\n')
+                    continue
+                c, quoted = quoted_lines(chunk, quote, quoted)[:2]
+                lines += c
+            last_nl = mm[size - 1:size] == b'\n'
+    return lines, quoted, last_nl, size
+
+
+def skip_lines(path, num, begin=0, quote=None, quoted=False, block=COUNT_BLOCK):
+    if not num:
+        return begin
+    with open(path, 'rb') as f:
+        size = f.seek(0, 2)
+        if size <= begin:
+            return None
+        with mmap(f.fileno(), 0, access=ACCESS_READ) as mm:
+            for pos in range(begin, size, block):
+                chunk = mm[pos:pos + block]
+                if quote is None or (not quoted and quote not in chunk):
+                    c = chunk.count(b'\n')
+                    if c < num:
+                        num -= c
+                        continue
+                    i = -1
+                    for _ in range(num):
+                        i = chunk.find(b'\n', i + 1)
+                    return pos + i + 1
+
+                c, new_quoted, start = quoted_lines(chunk, quote, quoted)
+                if c < num:
+                    num -= c
+                    quoted = new_quoted
+                    continue
+                if start is not None:  # 引号内没有换行，按换行定位
+                    i = start - 1
+                    for _ in range(num):
+                        i = chunk.find(b'\n', i + 1)
+                    return pos + i + 1
+                i = pos
+                for k, part in enumerate(chunk.split(quote)):
+                    if (k % 2 == 1) == quoted:  # 引号外的段
+                        c = part.count(b'\n')
+                        if c >= num:
+                            j = -1
+                            for _ in range(num):
+                                j = part.find(b'\n', j + 1)
+                            return i + j + 1
+                        num -= c
+                    i += len(part) + len(quote)
+    return None
+
+
+def quoted_lines(chunk, quote, quoted):
+    start = 0
+    if quoted:  # 第一个引号之前都在引号内
+        start = chunk.find(quote) + 1
+        if not start:
+            return 0, True, None
+    if len(quote) == 1:
+        # 只保留引号和换行，去掉相邻的成对引号后，若最后一个换行前没有引号，则引号内没有换行
+        marks = chunk[start:].translate(None, not_marks(quote)).replace(quote * 2, b'')
+        last = marks.rfind(b'\n') + 1
+        if quote not in marks[:last]:
+            return marks.count(b'\n', 0, last), marks[last:] == quote, start
+    parts = chunk.split(quote)  # 引号外的段中的换行才是行边界
+    return (b''.join(parts[1::2] if quoted else parts[::2]).count(b'\n'),
+            quoted != (len(parts) % 2 == 0), None)
+
+
+def not_marks(quote):
+    if quote not in _NOT_MARKS:
+        _NOT_MARKS[quote] = bytes(i for i in range(256) if i not in (quote[0], 10))
+    return _NOT_MARKS[quote]
+
+
+def line_offset(recorder, num):
+    quote = recorder.quote_char.encode(recorder.encoding) if recorder.type == 'csv' else None
+    begin, quoted = 0, False
+    counter = recorder._row_counter
+    if (counter is None or counter._path != recorder.path) and sidecar_path(recorder.path, 'count').exists():
+        counter = recorder._row_counter = RowCounter(recorder)
+    if counter is not None and counter._path == recorder.path:  # 有行数计数器时从最近的记录点开始
+        if num > counter.count:
+            return None
+        mark = counter.offset(num)
+        if mark is not None:
+            begin, lines, quoted = mark
+            num -= lines
+    return skip_lines(recorder.path, num, begin, quote, quoted)
+
+
+def open_at_row(recorder, num):
+    if num and '\n'.encode(recorder.encoding) == b'\n':  # 换行符为单字节的编码才能按字节查找
+        offset = line_offset(recorder, num)
+        if offset is None:
+            return None
+        f = open(recorder.path, 'r', encoding=recorder.encoding)
+        if offset:
+            f.seek(offset)
+        return f
+
+    f = open(recorder.path, 'r', encoding=recorder.encoding)
+    if num and recorder.type == 'csv':
+        reader = csv_reader(f, delimiter=recorder.delimiter, quotechar=recorder.quote_char)
+        for _ in range(num):
+            if next(reader, None) is None:
+                f.close()
+                return None
+    else:
+        for _ in range(num):
+            if not f.readline():
+                f.close()
+                return None
+    return f
+
+
+def get_xlsx_max_row(recorder):
+    wb = load_workbook(recorder.path, read_only=True)
+    try:
+        if recorder.table and recorder.table not in wb.sheetnames:
+            return 0
+        ws = wb[recorder.table] if recorder.table else wb.active
+        max_row = ws.max_row
+    finally:
+        wb.close()
+    if max_row is None:  # 文件中没有记录尺寸时遍历工作表
+        wb = load_workbook(recorder.path)
+        ws = wb[recorder.table] if recorder.table else wb.active
+        max_row = ws.max_row
+        wb.close()
+    return max_row
+
+
+def warm_seen(recorder, table):
+    deduper = recorder._deduper
+    old_table = recorder._table
+    recorder._table = table
+    try:
+        header = None if recorder.type == 'txt' else get_header(recorder)
+        rows = None
+        if (recorder.type != 'txt' and recorder.path and Path(recorder.path).exists()
+                and not deduper.saved(recorder.path, table)
+                and (recorder.type != 'xlsx' or table is None or table in get_tables(recorder.path))):
+            rows = ([r.get(k, None) for k in deduper.key_cols]
+                    for r in recorder._iter_rows(cols=True, sign_col=True, signs=None, deny_sign=False,
+                                                 count=None, begin_row=None, end_row=None, where=None))
+        deduper.warm(recorder.path, table, rows, key_positions(deduper.key_cols, header))
+    finally:
+        recorder._table = old_table
+
+
+def write_overlay(recorder):
+    state = file_state(recorder.path)
+    end = state[0] if state else 0
+    mark = {'end': end, 'tail': tail_hash(recorder.path, end) if end else None}  # 写入时数据文件的状态
+    with open(sidecar_path(recorder.path, 'overlay'), 'a', encoding='utf-8') as f:
+        f.write(dumps(mark) + '\n'
+                + ''.join(dumps(i, ensure_ascii=False, default=str) + '\n' for i in recorder._overlay_data))
+    recorder._overlay_data.clear()
+
+
+def read_overlay(recorder):
+    path = sidecar_path(recorder.path, 'overlay')
+    if not path.exists():
+        return []
+    entries = []
+    valid = False
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                item = loads(line)
+            except ValueError:  # 写入中断留下的不完整行
+                continue
+            if isinstance(item, dict):  # 之后的修改只在数据文件仍是写入时那个文件时有效
+                valid = overlay_matches(recorder.path, item)
+            elif valid:
+                entries.append(item)
+    return entries
+
+
+def overlay_matches(path, mark):
+    end = mark.get('end', 0)
+    if not end:
+        return True
+    state = file_state(path)  # 数据文件之后只能在末尾追加，开头部分须与写入时相同
+    return state is not None and state[0] >= end and tail_hash(path, end) == mark.get('tail', None)
+
+
+def load_overlay(recorder):
+    table = recorder.table if recorder.type == 'xlsx' else None
+    overlay = {}
+    for t, row, col, value in read_overlay(recorder):
+        if t == table:
+            overlay.setdefault(row, []).append((col, value))
+    return overlay or None
+
+
+def fold_overlay(recorder):
+    entries = read_overlay(recorder)
+    if not entries:
+        return False
+    blocks = {}
+    for table, row, col, value in entries:
+        blocks.setdefault(table, []).append({'type': 'data', 'data': [value], 'coord': (row, col)})
+    for table, data in blocks.items():
+        recorder._data[table] = data + recorder._data.get(table, [])
+    if recorder.type != 'xlsx':
+        recorder._slow_mode()
+    recorder._data_count += len(entries)
+    recorder._overlay_folded = True
+    return True
+
+
+def overlay_cells(line, updates, header, empty, process):
+    for col, value in updates:
+        if isinstance(value, dict):
+            cells = [(header.get_num(k), v) for k, v in value.items()]
+        else:
+            cells = enumerate(value, header._get_num(col))
+        for num, v in cells:
+            if not num:  # 表头中没有的列
+                continue
+            if num > len(line):
+                line.extend([empty] * (num - len(line)))
+            line[num - 1] = process(v)
+    return line
+
+
+def csv_value(value):
+    return '' if value is None else str(value)
+
+
+_UNSET = object()
+
+
+def scan_csv_keys(recorder, index):
+    header = get_header(recorder)
+    num = header.get_num(index.col)
+    if not num:
+        raise RuntimeError(f'表头中没有该列：{index.col}')
+    keys = index._keys
+    with open(recorder.path, 'rb') as f:
+        lines = OffsetLines(f, recorder.encoding, index._end or 0)
+        if index._next_row is None:
+            index._next_row = recorder._header_row[None] + 1
+            for _ in range(index._next_row - 1):
+                lines.readline()
+        pos = lines.pos
+        for row, line in enumerate(csv_reader(lines, delimiter=recorder.delimiter, quotechar=recorder.quote_char),
+                                   index._next_row):
+            keys.setdefault(index_key(line[num - 1] if num <= len(line) else None), []).append([row, pos])
+            pos = lines.pos
+            index._next_row = row + 1
+        index._end = pos
+
+
+def scan_jsonl_keys(recorder, index):
+    header = get_header(recorder)
+    col = index.col
+    keys = index._keys
+    with open(recorder.path, 'rb') as f:
+        lines = OffsetLines(f, recorder.encoding, index._end or 0)
+        if index._next_row is None:
+            index._next_row = 1
+        pos = lines.pos
+        for row, line in enumerate(lines, index._next_row):
+            line = loads(line.strip())
+            if not isinstance(line, (dict, list)):
+                line = [line]
+            keys.setdefault(index_key(get_json_sign(line, col, header)), []).append([row, pos])
+            pos = lines.pos
+            index._next_row = row + 1
+        index._end = pos
+
+
+def scan_table_keys(recorder, index):
+    keys = index._keys
+    col = index.col
+    for r in recorder._iter_rows(cols=True, sign_col=True, signs=None, deny_sign=False, count=None,
+                                 begin_row=index._next_row, end_row=None, where=None):
+        keys.setdefault(index_key(r.get(col, None)), []).append([r.row, None])
+        index._next_row = r.row + 1
+    if index._next_row is None:
+        index._next_row = recorder._header_row.get(recorder.table, recorder._header_row[None]) + 1 \
+            if recorder.type == 'xlsx' else 1
+
+
+def overlay_value(updates, col, header, file_type):
+    res = _UNSET
+    if file_type in ('json', 'jsonl'):
+        line = updates[-1][1]
+        return get_json_sign(line if isinstance(line, (dict, list)) else [line], col, header)
+
+    num = header.get_num(col)
+    if not num:
+        return res
+    for c, value in updates:
+        if isinstance(value, dict):
+            for k, v in value.items():
+                if header.get_num(k) == num:
+                    res = v
+        else:
+            begin = header._get_num(c)
+            if begin <= num < begin + len(value):
+                res = value[num - begin]
+    return res
+
+
+def read_index_rows(recorder, rows):
+    if not rows:
+        return []
+    res = []
+    seek = {r: o for r, o in rows.items() if o is not None}
+    if seek:
+        header = get_header(recorder)
+        header_len = len(header)
+        headers = {}
+        overlay = load_overlay(recorder)
+        with open(recorder.path, 'rb') as f:
+            for row in sorted(seek):
+                if recorder.type == 'csv':
+                    line = next(csv_reader(OffsetLines(f, recorder.encoding, seek[row]),
+                                           delimiter=recorder.delimiter, quotechar=recorder.quote_char))
+                    if overlay and row in overlay:
+                        line = overlay_cells(line, overlay[row], header, '', csv_value)
+                    res.append(make_csv_row(line, header, row, True, header_len, None))
+                else:
+                    f.seek(seek[row])
+                    line = overlay[row][-1][1] if overlay and row in overlay \
+                        else loads(f.readline().decode(recorder.encoding).strip())
+                    if not isinstance(line, (dict, list)):
+                        line = [line]
+                    res.append(make_json_row(line, header, row, True, header_len, headers))
+
+    others = {r for r, o in rows.items() if o is None}
+    if others:  # 没有字节位置的行，读取其所在范围
+        res.extend(r for r in recorder._iter_rows(cols=True, sign_col=True, signs=None, deny_sign=False,
+                                                  count=None, begin_row=min(others), end_row=max(others),
+                                                  where=None) if r.row in others)
+        res.sort(key=lambda r: r.row)
+    return res
+
+
 def handle_txt_lines(data_lst, lines, val, method):
     lines_len = len(lines)
     for data in data_lst:
@@ -509,11 +1240,10 @@ def get_header(recorder, ws=None):
 
     elif recorder.type == 'json':
         with open(recorder.path, 'r', newline='', encoding=recorder.encoding) as f:
-            j = load(f)
-            if recorder._header_row[None] > len(j):
+            header = next(islice(iter_json_array(f), recorder._header_row[None] - 1, None), _UNSET)
+            if header is _UNSET:
                 header = []
             else:
-                header = j[recorder._header_row[None] - 1]
                 if isinstance(header, dict):
                     header = header.keys()
                 elif not isinstance(header, list):
@@ -552,326 +1282,656 @@ def get_first_dict(data):
         return False
     elif data[0]['type'] == 'data' and data[0]['data'] and isinstance(data[0]['data'][0], dict):
         return data[0]['data'][0]
+    elif data[0]['type'] == 'frame':
+        return dict.fromkeys(data[0]['cols'])
+
+
+def get_table_args(recorder, header, cols, sign_col, begin_row):
+    if sign_col is not True:
+        sign_col = header.get_num(sign_col) or 1
+    if not begin_row:
+        begin_row = recorder._header_row.get(recorder.table, recorder._header_row[None]) + 1
+    return get_key_cols(cols, header), sign_col, begin_row
 
 
-def get_xlsx_rows(recorder, header, key_cols, begin_row, end_row, sign_col, sign, deny_sign, count, ws):
-    rows = ws.rows
+def iter_xlsx_rows(recorder, cols, sign_col, sign, deny_sign, count, begin_row, end_row, where, cursor=None):
+    wb = load_workbook(recorder.path, data_only=True, read_only=True)
     try:
-        for _ in range(begin_row - 1):
-            next(rows)
-    except StopIteration:
-        return []
+        if recorder.table and recorder.table not in wb.sheetnames:
+            raise RuntimeError(f'xlsx文件未包含指定工作表：{recorder.table}')
+        ws = wb[recorder.table] if recorder.table else wb.active
+        if ws.max_column is None:  # 遇到过read_only时无法获取列数的文件
+            wb.close()
+            wb = load_workbook(recorder.path, data_only=True)
+            ws = wb[recorder.table] if recorder.table else wb.active
+
+        header = get_header(recorder, ws)
+        tail = -begin_row if begin_row and begin_row < 0 else None
+        key_cols, sign_col, begin_row = get_table_args(recorder, header, cols, sign_col, None if tail else begin_row)
+        if tail:  # 负数表示最后几行
+            begin_row = max(begin_row, (ws.max_row or 0) - tail + 1)
+        if sign_col is not True and sign_col > ws.max_column:  # 获取所有行
+            sign_col = True
+        match = where.compile(header, 'xlsx') if where else None
+        overlay = load_overlay(recorder)
+        if cursor and cursor.row:
+            begin_row = cursor.row
+
+        if key_cols is not True:
+            index = header.get_index(tuple(key_cols))
+            key_cols = [c - 1 for c in key_cols]
 
-    if sign_col is True or sign_col > ws.max_column:  # 获取所有行
-        if count or end_row:
-            rows = list(rows)[:(min(count, end_row - begin_row + 1)
-                                if count and end_row else (count or end_row - begin_row + 1))]
-
-        if key_cols is True:  # 获取整行
-            res = [header.make_row_data(ind, {col: cell.value for col, cell in enumerate(row, 1)})
-                   for ind, row in enumerate(rows, begin_row)]
-        else:  # 只获取对应的列
-            res = [header.make_row_data(ind, {col: row[col - 1].value for col in key_cols})
-                   for ind, row in enumerate(rows, begin_row)]
-
-    else:  # 获取符合条件的行
-        if count:
-            res = get_xlsx_rows_with_count(key_cols, deny_sign, header, rows,
-                                           begin_row, end_row, sign_col, sign, count)
-        else:
-            res = get_xlsx_rows_without_count(key_cols, deny_sign, header, rows, begin_row, end_row,
-                                              sign_col, sign)
+        got = 0
+        ind = begin_row - 1
+        for ind, row in enumerate(ws.iter_rows(min_row=begin_row, values_only=True), begin_row):
+            if (end_row and ind > end_row) or (count and got == count):
+                break
+            if overlay and ind in overlay:
+                row = overlay_cells(list(row), overlay[ind], header, None, process_nothing)
+            if sign_col is not True and (row[sign_col - 1] in sign) == deny_sign:
+                continue
+            if match and not match(row):
+                continue
+            if cursor:
+                cursor._mark(None, ind)
+            if key_cols is True:  # 获取整行
+                yield RowData(ind, header, None, header.get_index(len(row)), row)
+            else:  # 只获取对应的列
+                yield RowData(ind, header, None, index, tuple(map(row.__getitem__, key_cols)))
+            got += 1
+        if cursor:  # 没有符合条件的行时，游标移到末尾
+            cursor._mark(None, ind + 1)
 
-    ws.parent.close()
-    return res
+    finally:
+        wb.close()
 
 
-def get_xlsx_rows_with_count(key_cols, deny_sign, header, rows, begin_row, end_row, sign_col, sign, count):
-    got = 0
-    res = []
-    if key_cols is True:  # 获取整行
-        if deny_sign:
-            for ind, row in enumerate(rows, begin_row):
-                if got == count or (end_row and ind > end_row):
-                    break
-                if row[sign_col - 1].value not in sign:
-                    res.append(header.make_row_data(ind, {col: cell.value for col, cell in enumerate(row, 1)}))
-                    got += 1
-        else:
-            for ind, row in enumerate(rows, begin_row):
-                if got == count or (end_row and ind > end_row):
-                    break
-                if row[sign_col - 1].value in sign:
-                    res.append(header.make_row_data(ind, {col: cell.value for col, cell in enumerate(row, 1)}))
-                    got += 1
+def iter_csv_rows(recorder, cols, sign_col, sign, deny_sign, count, begin_row, end_row, where, cursor=None):
+    header = get_header(recorder)
+    key_cols, sign_col, begin_row = get_table_args(recorder, header, cols, sign_col, begin_row)
+    sign = ['' if i is None else str(i) for i in sign]
+    header_len = len(header)
+    index = None if key_cols is True else header.get_index(tuple(key_cols))
+    match = where.compile(header, 'csv') if where else None
+    overlay = load_overlay(recorder)
+    if cursor:  # 以二进制读取，以便记录每行的字节位置
+        f = open(recorder.path, 'rb')
+        lines = OffsetLines(f, recorder.encoding, cursor.offset or 0)
+        if cursor.offset is None:
+            for _ in range(begin_row - 1):
+                if not lines.readline():
+                    f.close()
+                    return
+    else:  # 用mmap定位开始行，不逐行读取
+        f = lines = open_at_row(recorder, begin_row - 1)
+        if f is None:
+            return
+    with f:
+        if cursor and cursor.offset is not None:
+            begin_row = cursor.row
+        reader = csv_reader(lines, delimiter=recorder.delimiter, quotechar=recorder.quote_char)
 
-    else:  # 只获取对应的列
-        if deny_sign:
-            for ind, row in enumerate(rows, begin_row):
-                if got == count or (end_row and ind > end_row):
-                    break
-                if row[sign_col - 1].value not in sign:
-                    res.append(header.make_row_data(ind, {col: row[col - 1].value for col in key_cols}))
-                    got += 1
-        else:
-            for ind, row in enumerate(rows, begin_row):
-                if got == count or (end_row and ind > end_row):
-                    break
-                if row[sign_col - 1].value in sign:
-                    res.append(header.make_row_data(ind, {col: row[col - 1].value for col in key_cols}))
-                    got += 1
-    return res
+        got = 0
+        ind = begin_row - 1
+        pos = lines.pos if cursor else None
+        for ind, line in enumerate(reader, begin_row):
+            if cursor:
+                line_pos, pos = pos, lines.pos
+            if (end_row and ind > end_row) or (count and got == count):
+                break
+            if overlay and ind in overlay:
+                line = overlay_cells(line, overlay[ind], header, '', csv_value)
+            if sign_col is not True:
+                row_sign = '' if sign_col > len(line) else line[sign_col - 1]
+                if (row_sign in sign) == deny_sign:
+                    continue
+            if match and not match(line):
+                continue
+            if cursor:
+                cursor._mark(line_pos, ind)
+            yield make_csv_row(line, header, ind, key_cols, header_len, index)
+            got += 1
+        if cursor:  # 没有符合条件的行时，游标移到末尾
+            cursor._mark(pos, ind + 1)
 
 
-def get_xlsx_rows_without_count(key_cols, deny_sign, header, rows, begin_row, end_row, sign_col, sign):
-    if end_row:
-        if end_row < begin_row:
-            return []
-        rows = list(rows)[:end_row - begin_row + 1]
+def make_csv_row(line, header, ind, key_cols, header_len, index):
+    line_len = len(line)
     if key_cols is True:  # 获取整行
-        if deny_sign:
-            return [header.make_row_data(ind, {col: cell.value for col, cell in enumerate(row, 1)})
-                    for ind, row in enumerate(rows, begin_row)
-                    if row[sign_col - 1].value not in sign]
-        else:
-            return [header.make_row_data(ind, {col: cell.value for col, cell in enumerate(row, 1)})
-                    for ind, row in enumerate(rows, begin_row)
-                    if row[sign_col - 1].value in sign]
-
+        if line_len < header_len:
+            line.extend([''] * (header_len - line_len))
+            line_len = header_len
+        return RowData(ind, header, None, header.get_index(line_len), line)
     else:  # 只获取对应的列
-        if deny_sign:
-            return [header.make_row_data(ind, {col: row[col - 1].value for col in key_cols})
-                    for ind, row in enumerate(rows, begin_row)
-                    if row[sign_col - 1].value not in sign]
-        else:
-            return [header.make_row_data(ind, {col: row[col - 1].value for col in key_cols})
-                    for ind, row in enumerate(rows, begin_row)
-                    if row[sign_col - 1].value in sign]
+        return RowData(ind, header, None, index, tuple(line[col - 1] if col <= line_len else '' for col in key_cols))
 
 
-def get_csv_rows(recorder, header, key_cols, begin_row, end_row, sign_col, sign, deny_sign, count, ws):
+def iter_jsonl_rows(recorder, cols, sign_col, sign, deny_sign, count, begin_row, end_row, where, cursor=None):
+    header = get_header(recorder)
     sign = ['' if i is None else str(i) for i in sign]
-    begin_row -= 1
-    res = []
-    with open(recorder.path, 'r', encoding=recorder.encoding) as f:
-        try:
-            for i in range(begin_row):
-                next(f)
-        except StopIteration:
-            return res
-        reader = csv_reader(f, delimiter=recorder.delimiter, quotechar=recorder.quote_char)
+    begin_row = begin_row or 1
+    header_len = len(header)
+    headers = {}  # 按dict键缓存的Header
+    match = where.compile(header, recorder.type) if where else None
+    overlay = load_overlay(recorder)
+    # 按sign筛选时先按块在字节中查找sign序列化后的值，只解析包含该值的行
+    pre = sign_prefilter(sign, recorder.encoding) if sign_col is not True and not deny_sign and not overlay else None
+    if pre:
+        yield from iter_jsonl_candidates(recorder, header, cols, sign_col, sign, count, begin_row, end_row,
+                                         match, pre, cursor)
+        return
 
-        if sign_col is True:  # 获取所有行
-            header_len = len(header)
-            if count or end_row:
-                end = min(count + begin_row, end_row) if count and end_row else (end_row or count + begin_row)
-            else:
-                end = False
-            method = get_csv_rows_key_is_True if key_cols is True else get_csv_rows_key_not_True
-            for ind, line in enumerate(reader, begin_row + 1):
-                if end and ind > end:
-                    break
-                method(line, res, header, ind, key_cols, header_len)
-
-        else:  # 获取符合条件的行
-            sign_col -= 1
-            get_csv_rows_with_count(reader, begin_row, end_row, sign_col, sign, deny_sign,
-                                    key_cols, res, header, count)
+    if cursor:  # 以二进制读取，以便记录每行的字节位置
+        f = open(recorder.path, 'rb')
+        lines = OffsetLines(f, recorder.encoding, cursor.offset or 0)
+        if cursor.offset is None:
+            for _ in range(begin_row - 1):
+                if not lines.readline():
+                    f.close()
+                    return
+    else:  # 用mmap定位开始行，不逐行读取
+        f = lines = open_at_row(recorder, begin_row - 1)
+        if f is None:
+            return
+    with f:
+        if cursor and cursor.offset is not None:
+            begin_row = cursor.row
 
-    return res
+        got = 0
+        ind = begin_row - 1
+        pos = lines.pos if cursor else None
+        for ind, line in enumerate(lines, begin_row):
+            if cursor:
+                line_pos, pos = pos, lines.pos
+            if (end_row and ind > end_row) or (count and got == count):
+                break
+            line = overlay[ind][-1][1] if overlay and ind in overlay else loads(line.strip())
+            if sign_col is not True and (get_json_sign(line, sign_col, header) in sign) == deny_sign:
+                continue
+            if match and not match(line):
+                continue
+            if cursor:
+                cursor._mark(line_pos, ind)
+            yield make_json_row(line, header, ind, cols, header_len, headers)
+            got += 1
+        if cursor:  # 没有符合条件的行时，游标移到末尾
+            cursor._mark(pos, ind + 1)
 
 
-def get_csv_rows_key_is_True(line, res, header, ind, key_cols, header_len):
-    if not line:
-        res.append(header.make_row_data(ind, {col: '' for col in range(1, header_len + 1)}))
+def iter_jsonl_candidates(recorder, header, cols, sign_col, sign, count, begin_row, end_row, match, pre, cursor):
+    if cursor and cursor.offset is not None:
+        begin, begin_row = cursor.offset, cursor.row
     else:
+        begin = line_offset(recorder, begin_row - 1)
+        if begin is None:
+            return
+    header_len = len(header)
+    headers = {}
+    got = 0
+    with open(recorder.path, 'rb') as f:
+        lines = CandidateLines(f, pre, begin, begin_row)
+        for ind, line_pos, line in lines:
+            if (end_row and ind > end_row) or (count and got == count):
+                break
+            line = loads(line.decode(recorder.encoding).strip())
+            if get_json_sign(line, sign_col, header) not in sign:
+                continue
+            if match and not match(line):
+                continue
+            if cursor:
+                cursor._mark(line_pos, ind)
+            yield make_json_row(line, header, ind, cols, header_len, headers)
+            got += 1
+        if cursor:  # 没有符合条件的行时，游标移到末尾
+            cursor._mark(lines.pos, lines.row)
+
+
+class CandidateLines(object):
+    __slots__ = ('_file', '_patterns', '_block', 'pos', 'row')
+
+    def __init__(self, file, patterns, pos, row, block=COUNT_BLOCK):
+        self._file = file
+        self._patterns = patterns
+        self._block = block
+        self.pos = pos  # 已读取部分之后的字节位置
+        self.row = row  # pos位置的行号
+
+    def __iter__(self):
+        size = self._file.seek(0, 2)
+        if size <= self.pos:
+            return
+        with mmap(self._file.fileno(), 0, access=ACCESS_READ) as mm:
+            pos, row = self.pos, self.row
+            while pos < size:
+                end = min(pos + self._block, size)
+                if end < size:  # 块在完整的行结束
+                    cut = mm.rfind(b'\n', pos, end) + 1 or mm.find(b'\n', end) + 1
+                    end = cut or size
+                chunk = mm[pos:end]
+
+                starts = set()
+                for p in self._patterns:
+                    i = chunk.find(p)
+                    while i >= 0:
+                        starts.add(chunk.rfind(b'\n', 0, i) + 1)
+                        e = chunk.find(b'\n', i)
+                        if e < 0:
+                            break
+                        i = chunk.find(p, e + 1)
+
+                counted = 0
+                for s in sorted(starts):
+                    row += chunk.count(b'\n', counted, s)
+                    counted = s
+                    e = chunk.find(b'\n', s) + 1 or len(chunk)
+                    self.pos, self.row = pos + e, row + 1
+                    yield row, pos + s, chunk[s:e]
+                row += chunk.count(b'\n', counted)
+                if chunk[-1:] != b'\n':  # 文件最后一行没有换行符
+                    row += 1
+                pos = end
+                self.pos, self.row = pos, row
+
+
+def sign_prefilter(sign, encoding):
+    if '\n'.encode(encoding) != b'\n':
+        return None
+    res = set()
+    for s in sign:  # 只有str值会与sign相等
+        if '/' in s:  # 其它程序可能写成'\\/'
+            return None
+        for ascii_only in (False, True):
+            try:
+                res.add(dumps(s, ensure_ascii=ascii_only).encode(encoding))
+            except UnicodeEncodeError:  # 编码中没有的字符只能以转义形式出现
+                pass
+    return tuple(res)
+
+
+def iter_json_rows(recorder, cols, sign_col, sign, deny_sign, count, begin_row, end_row, where, cursor=None):
+    header = get_header(recorder)
+    sign = ['' if i is None else str(i) for i in sign]
+    begin_row = begin_row or 1
+    header_len = len(header)
+    headers = {}  # 按dict键缓存的Header
+    match = where.compile(header, recorder.type) if where else None
+    overlay = load_overlay(recorder)
+    if cursor and cursor.row:
+        begin_row = cursor.row
+
+    with open(recorder.path, 'r', encoding=recorder.encoding) as f:  # 逐个解析数组元素，不读取整个文件
+        got = 0
+        ind = begin_row - 1
+        for ind, line in enumerate(islice(iter_json_array(f), begin_row - 1, None), begin_row):
+            if (end_row and ind > end_row) or (count and got == count):
+                break
+            if overlay and ind in overlay:
+                line = overlay[ind][-1][1]
+            if not isinstance(line, (dict, list)):
+                line = [line]
+            if sign_col is not True and (get_json_sign(line, sign_col, header) in sign) == deny_sign:
+                continue
+            if match and not match(line):
+                continue
+            if cursor:
+                cursor._mark(None, ind)
+            yield make_json_row(line, header, ind, cols, header_len, headers)
+            got += 1
+    if cursor:  # 没有符合条件的行时，游标移到末尾
+        cursor._mark(None, ind + 1)
+
+
+def iter_json_array(f, block=JSON_BLOCK):
+    scan = JSONDecoder().scan_once
+    skip = WHITESPACE.match
+    buf = ''
+    i = 0
+    size = block
+    eof = False
+    state = 0  # 0：等待'['，1：等待第一个元素或']'，2：等待','或']'，3：等待元素
+    while True:
+        i = skip(buf, i).end()
+        if i == len(buf):
+            if eof:
+                raise ValueError('json文件不完整。')
+            buf, i = f.read(size), 0
+            eof = not buf
+            continue
+
+        if state == 3 or (state == 1 and buf[i] != ']'):
+            try:
+                value, end = scan(buf, i)
+            except (StopIteration, ValueError):  # 元素被块截断
+                if eof:
+                    raise ValueError(f'json文件格式错误，位置：{f.tell()}')
+                more = f.read(size)
+                size *= 2  # 大元素时避免反复解析
+                buf, i = buf[i:] + more, 0
+                eof = not more
+                continue
+            if end >= len(buf) - 2 and not eof and _NUMBER_TAIL.fullmatch(buf, end):  # 数字可能被截断
+                more = f.read(size)
+                if more:
+                    buf, i = buf[i:] + more, 0
+                    continue
+                eof = True
+            yield value
+            size = block
+            state = 2
+            i = end
+            if i >= block:  # 丢弃已解析的内容
+                buf, i = buf[i:], 0
+            continue
+
+        c = buf[i]
+        i += 1
+        if state == 2 and c == ',':
+            state = 3
+        elif state == 0 and c == '[':
+            state = 1
+        elif c == ']' and state != 0:
+            return
+        elif state == 0:
+            raise ValueError('json文件内容须为数组。')
+        else:
+            raise ValueError(f'json文件格式错误，位置：{f.tell()}')
+
+
+def get_json_sign(line, sign_col, header):
+    if isinstance(sign_col, str):
+        if isinstance(line, dict):
+            return line.get(sign_col, None)
+        sign_col = header[sign_col]  # list
+        return None if not sign_col or sign_col > len(line) else line[sign_col - 1]
+    elif sign_col > len(line):  # int
+        return None
+    return line[list(line.keys())[sign_col - 1]] if isinstance(line, dict) else line[sign_col - 1]
+
+
+def make_json_row(line, header, ind, key_cols, header_len, headers):
+    if key_cols is True:  # 获取整行
+        if isinstance(line, dict):
+            return RowData.from_dict(ind, header, None, line)
         line_len = len(line)
-        x = max(header_len, line_len)
-        res.append(header.make_row_data(ind, {col: line[col - 1] if col <= line_len else ''
-                                              for col in range(1, x + 1)}))
+        if line_len < header_len:
+            line.extend([None] * (header_len - line_len))
+            line_len = header_len
+        return RowData(ind, header, None, header.get_index(line_len), line)
+
+    elif isinstance(line, dict):  # 只获取对应的列
+        keys = tuple(line)
+        if keys not in headers:
+            line_header = Header(keys)
+            headers[keys] = line_header, tuple(get_key_cols(key_cols, line_header))
+        header, nums = headers[keys]
+        return RowData(ind, header, None, header.get_index(nums), tuple(line[header[c]] for c in nums))
 
+    else:
+        x = len(line) + 1
+        nums = tuple(get_key_cols(key_cols, header))
+        return RowData(ind, header, None, header.get_index(nums),
+                       tuple(line[col - 1] if col < x else None for col in nums))
 
-def get_csv_rows_key_not_True(line, res, header, ind, key_cols, header_len):
-    x = len(line) + 1
-    res.append(header.make_row_data(ind, {col: line[col - 1] if col < x else '' for col in key_cols}))
 
+def iter_txt_rows(recorder, cols, sign_col, sign, deny_sign, count, begin_row, end_row, where, cursor=None):
+    begin_row = begin_row or 1
+    overlay = load_overlay(recorder)
+    f = open_at_row(recorder, begin_row - 1)
+    if f is None:
+        return
+    with f:
+        for ind, line in enumerate(f, begin_row):
+            if (end_row and ind > end_row) or (count and ind - begin_row == count):
+                break
+            if overlay and ind in overlay:
+                line = ' '.join(ok_list_str(overlay[ind][-1][1]))
+            t = RowText(line.strip())
+            t.row = ind
+            yield t
 
-def get_csv_rows_with_count(lines, begin_row, end_row, sign_col, sign, deny_sign, key_cols, res, header, count):
-    got = 0
+
+def iter_rows_parallel(recorder, cols, sign_col, sign, deny_sign, count, begin_row, end_row, where, workers,
+                       chunk_size=PARALLEL_CHUNK):
+    # 有覆盖层或换行符不是单字节时不能按字节分块，逐行读取
+    if load_overlay(recorder) or '\n'.encode(recorder.encoding) != b'\n':
+        yield from ROWS_METHODS[recorder.type](recorder, cols, sign_col, sign, deny_sign, count,
+                                               begin_row, end_row, where)
+        return
+
+    header = get_header(recorder)
+    is_csv = recorder.type == 'csv'
+    if is_csv:
+        key_cols, sign_col, begin_row = get_table_args(recorder, header, cols, sign_col, begin_row)
+        index = None if key_cols is True else header.get_index(tuple(key_cols))
+        quote = recorder.quote_char.encode(recorder.encoding)
+    else:
+        key_cols, index, quote = cols, None, None
+        begin_row = begin_row or 1
+    begin = line_offset(recorder, begin_row - 1)
+    if begin is None:
+        return
+    end = line_offset(recorder, end_row) if end_row else None
+    if end is None:
+        end = Path(recorder.path).stat().st_size
+    ranges = split_ranges(recorder.path, begin, end, workers * 4, quote, chunk_size)
+    if len(ranges) < 2:  # 文件太小，不值得开进程
+        yield from ROWS_METHODS[recorder.type](recorder, cols, sign_col, sign, deny_sign, count,
+                                               begin_row, end_row, where)
+        return
+
+    sign = ['' if i is None else str(i) for i in sign]
+    args = ((recorder.path, b, e, recorder.encoding, recorder.delimiter, recorder.quote_char,
+             sign_col, sign, deny_sign, header, where) for b, e in ranges)
+    scan = scan_csv_chunk if is_csv else scan_jsonl_chunk
     header_len = len(header)
-    for ind, line in enumerate(lines, begin_row + 1):
-        if (end_row and ind > end_row) or (count and got == count):
-            break
-        row_sign = '' if sign_col > len(line) - 1 else line[sign_col]
-        if (row_sign not in sign) if deny_sign else (row_sign in sign):
-            if key_cols is True:  # 获取整行
-                if not line:
-                    res.append(header.make_row_data(ind, {col: '' for col in range(1, header_len + 1)}))
+    headers = {}
+    got = 0
+    executor = ProcessPoolExecutor(workers)
+    try:
+        row = begin_row
+        for num, lines in executor.map(scan, *zip(*args)):  # 按块的顺序合并结果
+            for i, line in lines:
+                if is_csv:
+                    yield make_csv_row(line, header, row + i, key_cols, header_len, index)
                 else:
-                    line_len = len(line)
-                    x = max(header_len, line_len)
-                    res.append(header.make_row_data(ind, {col: line[col - 1] if col <= line_len else ''
-                                                          for col in range(1, x + 1)}))
-            else:  # 只获取对应的列
-                x = len(line) + 1
-                res.append(header.make_row_data(ind, {col: line[col - 1] if col < x else '' for col in key_cols}))
-            got += 1
+                    yield make_json_row(line, header, row + i, key_cols, header_len, headers)
+                got += 1
+                if count and got == count:
+                    return
+            row += num
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def split_ranges(path, begin, end, parts, quote=None, chunk_size=PARALLEL_CHUNK):
+    step = max(chunk_size, (end - begin) // parts)
+    bounds = [begin]
+    quoted = False
+    pos = target = begin
+    with open(path, 'rb') as f, mmap(f.fileno(), 0, access=ACCESS_READ) as mm:
+        while True:
+            target += step
+            if target >= end:
+                break
+            if quote is not None:  # 统计目标位置前的引号数，判断目标位置是否在引号内
+                for i in range(pos, target, COUNT_BLOCK):
+                    if mm[i:min(i + COUNT_BLOCK, target)].count(quote) % 2:
+                        quoted = not quoted
+                pos = target
+            bound = skip_lines(path, 1, target, quote, quoted)  # 对齐到下一个记录边界
+            if bound is None or bound >= end:
+                break
+            if bound > bounds[-1]:
+                bounds.append(bound)
+    bounds.append(end)
+    return list(zip(bounds, bounds[1:]))
 
 
-def get_jsonl_rows(recorder, header, key_cols, begin_row, end_row, sign_col, sign, deny_sign, count, ws):
-    sign = ['' if i is None else str(i) for i in sign]
-    begin_row -= 1
-    res = []
-    with open(recorder.path, 'r', encoding=recorder.encoding) as f:
-        try:
-            for i in range(begin_row):
-                next(f)
-        except StopIteration:
-            return res
+def read_chunk(path, begin, end, encoding):
+    with open(path, 'rb') as f:
+        f.seek(begin)
+        return f.read(end - begin).decode(encoding)
 
-        if sign_col is True:  # 获取所有行
-            header_len = len(header)
-            if count or end_row:
-                end = min(count + begin_row, end_row) if count and end_row else (end_row or count + begin_row)
-            else:
-                end = False
-            method = get_jsonl_rows_key_is_True if key_cols is True else get_jsonl_rows_key_not_True
-            for ind, line in enumerate(f, begin_row + 1):
-                if end and ind > end:
-                    break
-                line = loads(line.strip())
-                method(line, res, header, ind, key_cols, header_len)
-
-        else:  # 获取符合条件的行
-            get_jsonl_rows_with_count(f, begin_row, end_row, sign_col, sign, deny_sign,
-                                      key_cols, res, header, count)
 
-    return res
+def scan_csv_chunk(path, begin, end, encoding, delimiter, quote_char, sign_col, sign, deny_sign, header, where):
+    match = where.compile(header, 'csv') if where else None
+    res = []
+    num = 0
+    lines = StringIO(read_chunk(path, begin, end, encoding), newline=None)
+    for num, line in enumerate(csv_reader(lines, delimiter=delimiter, quotechar=quote_char), 1):
+        if sign_col is not True:
+            row_sign = '' if sign_col > len(line) else line[sign_col - 1]
+            if (row_sign in sign) == deny_sign:
+                continue
+        if match and not match(line):
+            continue
+        res.append((num - 1, line))
+    return num, res
+
+
+def scan_jsonl_chunk(path, begin, end, encoding, delimiter, quote_char, sign_col, sign, deny_sign, header, where):
+    match = where.compile(header, 'jsonl') if where else None
+    res = []
+    lines = read_chunk(path, begin, end, encoding).split('\n')
+    if not lines[-1]:
+        lines.pop()
+    for ind, line in enumerate(lines):
+        line = loads(line.strip())
+        if sign_col is not True and (get_json_sign(line, sign_col, header) in sign) == deny_sign:
+            continue
+        if match and not match(line):
+            continue
+        res.append((ind, line))
+    return len(lines), res
 
 
-def get_jsonl_rows_key_is_True(line, res, header, ind, key_cols, header_len):
-    if isinstance(line, dict):
-        res.append(RowData(ind, header, None, line))
-    elif isinstance(line, list):
-        if not line:
-            res.append(header.make_row_data(ind, {col: None for col in range(1, header_len + 1)}))
-        else:
-            line_len = len(line)
-            x = max(header_len, line_len)
-            res.append(header.make_row_data(ind, {col: line[col - 1] if col <= line_len else None
-                                                  for col in range(1, x + 1)}))
+def tail_xlsx_rows(recorder, n, cols):
+    return list(recorder._iter_rows(cols=cols, sign_col=True, signs=None, deny_sign=False, count=None,
+                                    begin_row=-n, end_row=None, where=None))
 
 
-def get_jsonl_rows_key_not_True(line, res, header, ind, key_cols, header_len):
-    if isinstance(line, dict):
-        header = Header(line.keys())
-        key_cols = get_key_cols(key_cols, header)
-        res.append(RowData(ind, header, None, {header[c]: line[header[c]] for c in key_cols}))
-    else:
-        x = len(line) + 1
-        key_cols = get_key_cols(key_cols, header)
-        res.append(header.make_row_data(ind, {col: line[col - 1] if col < x else None for col in key_cols}))
+def tail_by_iter(recorder, n, cols):
+    return list(deque(recorder._iter_rows(cols=cols, sign_col=True, signs=None, deny_sign=False, count=None,
+                                          begin_row=None, end_row=None, where=None), n))
 
 
-def get_jsonl_rows_with_count(lines, begin_row, end_row, sign_col, sign, deny_sign, key_cols, res, header, count):
-    got = 0
+def tail_csv_rows(recorder, n, cols):
+    text = read_tail(recorder, n, recorder.quote_char)
+    if text is None:
+        return tail_by_iter(recorder, n, cols)
+    header = get_header(recorder)
+    key_cols = get_key_cols(cols, header)
+    index = None if key_cols is True else header.get_index(tuple(key_cols))
     header_len = len(header)
-    for ind, line in enumerate(lines, begin_row + 1):
-        if (end_row and ind > end_row) or (count and got == count):
-            break
-        line = loads(line.strip())
-        if isinstance(sign_col, str):
-            if isinstance(line, dict):
-                row_sign = line[sign_col]
-            else:  # list
-                sign_col = header[sign_col]
-                row_sign = None if sign_col > len(line) else line[sign_col - 1]
-        else:  # int
-            if isinstance(line, dict):
-                row_sign = None if sign_col > len(line) else line[list(line.keys())[sign_col - 1]]
-            else:
-                row_sign = None if sign_col > len(line) else line[sign_col - 1]
+    # 只按换行符分行，字段中的U+2028等字符不是行边界
+    lines = list(csv_reader(StringIO(text, newline=''), delimiter=recorder.delimiter, quotechar=recorder.quote_char))
+    return [make_csv_row(line, header, ind, key_cols, header_len, index)
+            for ind, line in zip(tail_row_nums(recorder, len(lines)), lines)]
 
-        if (row_sign not in sign) if deny_sign else (row_sign in sign):
-            if key_cols is True:  # 获取整行
-                get_jsonl_rows_key_is_True(line, res, header, ind, key_cols, header_len)
-            else:  # 只获取对应的列
-                get_jsonl_rows_key_not_True(line, res, header, ind, key_cols, header_len)
-            got += 1
 
+def tail_jsonl_rows(recorder, n, cols):
+    text = read_tail(recorder, n)
+    if text is None:
+        return tail_by_iter(recorder, n, cols)
+    header = get_header(recorder)
+    header_len = len(header)
+    headers = {}
+    lines = split_tail_lines(text)
+    return [make_json_row(loads(line), header, ind, cols, header_len, headers)
+            for ind, line in zip(tail_row_nums(recorder, len(lines)), lines)]
 
-def get_json_rows(recorder, header, key_cols, begin_row, end_row, sign_col, sign, deny_sign, count, ws):
-    sign = ['' if i is None else str(i) for i in sign]
-    begin_row -= 1
+
+def tail_txt_rows(recorder, n, cols):
+    text = read_tail(recorder, n)
+    if text is None:
+        return tail_by_iter(recorder, n, cols)
     res = []
-    with open(recorder.path, 'r', encoding=recorder.encoding) as f:
-        lines = load(f)
-        if sign_col is True:  # 获取所有行
-            header_len = len(header)
-            if count or end_row:
-                end = min(count + begin_row, end_row) if count and end_row else (end_row or count + begin_row)
-            else:
-                end = None
-            method = get_jsonl_rows_key_is_True if key_cols is True else get_jsonl_rows_key_not_True
-            for ind, line in enumerate(lines[begin_row:end], begin_row + 1):
-                if not isinstance(line, (dict, list)):
-                    line = [line]
-                method(line, res, header, ind, key_cols, header_len)
-
-        else:  # 获取符合条件的行
-            get_json_rows_with_count(lines, begin_row, end_row, sign_col, sign, deny_sign,
-                                     key_cols, res, header, count)
+    lines = split_tail_lines(text)
+    for ind, line in zip(tail_row_nums(recorder, len(lines)), lines):
+        t = RowText(line.strip())
+        t.row = ind
+        res.append(t)
     return res
 
 
-def get_json_rows_with_count(lines, begin_row, end_row, sign_col, sign, deny_sign, key_cols, res, header, count):
-    got = 0
-    header_len = len(header)
-    for ind, line in enumerate(lines, begin_row + 1):
-        if (end_row and ind > end_row) or (count and got == count):
-            break
-        if not isinstance(line, (dict, list)):
-            line = [line]
-        if isinstance(sign_col, str):
-            if isinstance(line, dict):
-                row_sign = line[sign_col]
-            else:  # list
-                sign_col = header[sign_col]
-                row_sign = None if sign_col > len(line) else line[sign_col - 1]
-        else:  # int
-            if isinstance(line, dict):
-                row_sign = None if sign_col > len(line) else line[list(line.keys())[sign_col - 1]]
-            else:
-                row_sign = None if sign_col > len(line) else line[sign_col - 1]
+def split_tail_lines(text):
+    lines = text.split('\n')  # 与逐行读取一致，只按换行符分行
+    if not lines[-1]:
+        lines.pop()
+    return lines
 
-        if (row_sign not in sign) if deny_sign else (row_sign in sign):
-            if key_cols is True:  # 获取整行
-                get_jsonl_rows_key_is_True(line, res, header, ind, key_cols, header_len)
-            else:  # 只获取对应的列
-                get_jsonl_rows_key_not_True(line, res, header, ind, key_cols, header_len)
-            got += 1
 
+def tail_row_nums(recorder, num):
+    # 行数计数有效时由行数推算行号，与从头读取时一致；否则为了不统计整个文件，行号为None
+    counter = recorder._row_counter
+    if counter is None or counter._path != recorder.path:
+        counter = recorder._row_counter = RowCounter(recorder)
+    if not counter.cheap:
+        return [None] * num
+    first = counter.count - num + 1
+    return range(first, first + num)
 
-def get_txt_rows(recorder, header, key_cols, begin_row, end_row, sign_col, sign, deny_sign, count, ws):
-    begin_row -= 1
-    res = []
-    with open(recorder.path, 'r', encoding=recorder.encoding) as f:
-        try:
-            for i in range(begin_row):
-                next(f)
-        except StopIteration:
-            return res
 
-        got = 0
-        for ind, line in enumerate(f, begin_row + 1):
-            if (end_row and ind > end_row) or (count and got == count):
-                break
-            t = RowText(line.strip())
-            t.row = ind
-            res.append(t)
-            got += 1
+def read_tail(recorder, n, quote=None):
+    if load_overlay(recorder):  # 覆盖层按行号记录，须从头读取才知道行号
+        return None
+    with open(recorder.path, 'rb') as f:
+        offset = find_tail_offset(f, n, quote.encode(recorder.encoding) if quote else None)
+        if offset is None:
+            return None
+        f.seek(offset)
+        return f.read().decode(recorder.encoding)
+
+
+def find_tail_offset(f, n, quote=None, block=TAIL_BLOCK):
+    pos = f.seek(0, 2)
+    buf = b''
+    i = last = None  # i为已检查到的位置，last为上一个行边界
+    quotes = found = 0
+    while pos > 0:
+        step = min(block, pos)
+        pos -= step
+        f.seek(pos)
+        buf = f.read(step) + buf
+        if i is None:
+            i = last = len(buf)
+        else:
+            i += step
+            last += step
 
-    return res
+        while True:
+            j = buf.rfind(b'\n', 0, i)
+            if j < 0:
+                break
+            if quote:  # 换行之后的引号数为奇数时，该换行在引号内
+                quotes += buf.count(quote, j + 1, i)
+            i = j
+            if quotes % 2:
+                continue
+            if found or buf[j + 1:last].strip(b'\r'):  # 文件末尾的换行不算一行
+                found += 1
+                if found == n:
+                    return pos + j + 1 if pos else None  # 读到文件开头时从头读取才能排除表头
+            last = j
+    return None
+
+
+SCAN_METHODS = {'csv': scan_csv_keys,
+                'jsonl': scan_jsonl_keys,
+                'xlsx': scan_table_keys,
+                'json': scan_table_keys}
+
+ROWS_METHODS = {'xlsx': iter_xlsx_rows,
+                'csv': iter_csv_rows,
+                'jsonl': iter_jsonl_rows,
+                'json': iter_json_rows,
+                'txt': iter_txt_rows}
+
+TAIL_METHODS = {'xlsx': tail_xlsx_rows,
+                'csv': tail_csv_rows,
+                'jsonl': tail_jsonl_rows,
+                'json': tail_by_iter,
+                'txt': tail_txt_rows}
 
 
 def get_and_set_csv_header(recorder, new_csv, file, writer):
@@ -2,14 +2,15 @@
 from csv import writer, reader
 from io import TextIOWrapper
 from pathlib import Path
-from typing import Any, Optional, Union, List, Dict, Tuple, Callable, Iterable
+from typing import Any, Optional, Union, List, Dict, Tuple, Callable, Iterable, Generator, BinaryIO, TextIO, Pattern
 
 from openpyxl.worksheet.worksheet import Worksheet
 
 from .base import BaseRecorder
 from .setter import RecorderSetter
 from .cell_style import CellStyle
-from .tools import Header, RowData, RowText
+from .filters import Filter
+from .tools import Header, RowData, RowText, ColumnBuffer
 
 
 class Recorder(BaseRecorder):
@@ -24,11 +25,16 @@ class Recorder(BaseRecorder):
     _fast: bool = ...
     _methods: dict = ...
     _link_style: Optional[CellStyle] = ...
-    _data: Dict[Optional[str], list] = ...
+    _data: Dict[Optional[str], List[Dict[str, Union[str, tuple, list, ColumnBuffer, None]]]] = ...
     _None_header_is_newest: Optional[bool] = ...
     _None_header_row_is_newest: Optional[bool] = ...
-    data: Dict[Optional[str], list] = ...
+    data: Dict[Optional[str], List[Dict[str, Union[str, tuple, list, ColumnBuffer, None]]]] = ...
     data_col: int = ...
+    _overlay: bool = ...
+    _overlay_data: List[list] = ...
+    _overlay_folded: bool = ...
+    _key_indexes: Dict[Optional[str], KeyIndex] = ...
+    _row_counter: Optional[RowCounter] = ...
 
     def __init__(self, path: Union[str, Path] = None, cache_size: int = 1000):
         """用于缓存并记录数据，可在达到一定数量时自动记录，以降低文件读写次数，减少开销
@@ -61,6 +67,13 @@ class Recorder(BaseRecorder):
         """返回表头，只支持csv和xlsx格式"""
         ...
 
+    @property
+    def row_count(self) -> int:
+        """返回文件中的行数（包括表头行），不包括未写入的缓存数据。
+        csv、jsonl、txt、json的计数保存在'文件路径.count'文件中，按文件大小和修改时间校验，
+        文件只在末尾追加数据时只统计新增部分，否则重新统计；xlsx返回当前工作表的最大行号"""
+        ...
+
     def add_data(self,
                  data: Any,
                  coord: Union[list, Tuple[Union[None, int], Union[None, int, str]], str, int] = None,
@@ -211,6 +224,14 @@ class Recorder(BaseRecorder):
         """
         ...
 
+    def _dedupe(self, data: dict, table: Union[str, bool, None]) -> Tuple[dict, int]:
+        """丢弃新增数据中已出现过的行
+        :param data: 处理后的数据
+        :param table: 要添加数据的表
+        :return: (去重后的数据, 数据数量)
+        """
+        ...
+
     def _add(self, data: dict, table: Optional[str], to_slow: bool, num: int, add_method: Callable) -> None:
         """为单元格设置样式，可批量设置范围内的单元格
         :param data: 数据，[dict, ...]格式
@@ -238,6 +259,14 @@ class Recorder(BaseRecorder):
         """
         ...
 
+    def _add_overlay(self, data: dict, table: Optional[str]) -> None:
+        """把修改已有行的数据转为覆盖层记录，暂存在_overlay_data
+        :param data: 数据
+        :param table: 要添加数据的表
+        :return: None
+        """
+        ...
+
     def _add_others(self, data: dict, table: Optional[str]) -> None:
         """添加style、link等到_data的操作
         :param data: 数据
@@ -253,7 +282,9 @@ class Recorder(BaseRecorder):
              deny_sign: bool = False,
              count: int = None,
              begin_row: Optional[int] = None,
-             end_row: Optional[int] = None) -> List[Union[RowData, RowText]]:
+             end_row: Optional[int] = None,
+             where: Optional[Filter] = None,
+             workers: Optional[int] = None) -> List[Union[RowData, RowText]]:
         """返回符合条件的行数据，可指定只要某些列。txt格式只有count、begin_row、end_row有效
         :param cols: 要获取的列，可以是多列，传入表头值或列序号，要用列号用Col('a')，为True获取所有列
         :param sign_col: 用于筛选数据的列，传入表头值或列序号，要用列号用Col('a')，为True获取所有行
@@ -262,10 +293,115 @@ class Recorder(BaseRecorder):
         :param count: 获取多少条数据，为None获取所有
         :param begin_row: 数据开始的行，None表示header_row后面一行
         :param end_row: 数据结束的行，None表示最后一行
+        :param where: 多列组合筛选条件，Filter对象，在生成RowData前判断，与sign_col同时设置时要两者都满足，txt文件设置where或sign_col时抛出TypeError
+        :param workers: 进程数，大于1时csv和jsonl大文件按记录边界分块，在多个进程中解析和筛选，结果按行顺序合并，
+                        需在if __name__ == '__main__'下调用，有未合并的覆盖层时逐行读取
         :return: txt文件返回RowText对象组成的列表，其它返回RowData对象组成的列表，
         """
         ...
 
+    def iter_rows(self,
+                  cols: Union[str, int, list, tuple, True] = True,
+                  sign_col: Union[str, int, True] = True,
+                  signs: Any = None,
+                  deny_sign: bool = False,
+                  count: int = None,
+                  begin_row: Optional[int] = None,
+                  end_row: Optional[int] = None,
+                  where: Optional[Filter] = None,
+                  workers: Optional[int] = None) -> Generator[Union[RowData, RowText], None, None]:
+        """逐条返回符合条件的行数据，参数与rows()相同，不一次读取所有数据。
+        遍历结束或调用生成器的close()时关闭文件，未遍历完时可用contextlib.closing()包裹
+        :param cols: 要获取的列，可以是多列，传入表头值或列序号，要用列号用Col('a')，为True获取所有列
+        :param sign_col: 用于筛选数据的列，传入表头值或列序号，要用列号用Col('a')，为True获取所有行
+        :param signs: 按这个值筛选目标行，可用list, tuple, set设置多个
+        :param deny_sign: 是否反向匹配sign，即筛选值不是sign的行
+        :param count: 获取多少条数据，为None获取所有
+        :param begin_row: 数据开始的行，None表示header_row后面一行
+        :param end_row: 数据结束的行，None表示最后一行
+        :param where: 多列组合筛选条件，Filter对象，在生成RowData前判断，与sign_col同时设置时要两者都满足，txt文件设置where或sign_col时抛出TypeError
+        :param workers: 进程数，大于1时csv和jsonl大文件按记录边界分块，在多个进程中解析和筛选，结果按行顺序合并，
+                        需在if __name__ == '__main__'下调用，有未合并的覆盖层时逐行读取
+        :return: 逐条返回RowText或RowData对象的生成器
+        """
+        ...
+
+    def tail(self, n: int = 1, cols: Union[str, int, list, tuple, True] = True) -> List[Union[RowData, RowText]]:
+        """返回文件最后n行数据，csv、jsonl、txt从文件末尾向前读取，不用遍历整个文件，行号由行数计数推算，
+        没有有效的'文件路径.count'计数文件时不为行号统计整个文件，行号为None，可先调用row_count建立计数。
+        文件较小或有未合并的覆盖层时从头读取，xlsx按工作表尺寸只读取最后几行，json读取整个文件
+        :param n: 行数
+        :param cols: 要获取的列，可以是多列，传入表头值或列序号，为True获取所有列
+        :return: txt文件返回RowText对象组成的列表，其它返回RowData对象组成的列表，按文件中的顺序排列
+        """
+        ...
+
+    def resume_cursor(self,
+                      sign_col: Union[str, int, True] = True,
+                      signs: Any = None,
+                      deny_sign: bool = False,
+                      cols: Union[str, int, list, tuple, True] = True,
+                      where: Optional[Filter] = None,
+                      name: Optional[str] = None) -> ResumeCursor:
+        """获取断点游标，记录第一个未处理行的位置，每次获取数据从该位置开始读取，不用重新遍历已处理的行。
+        游标保存在'文件路径.cursor'文件中，文件被修改时根据大小、修改时间和游标前的内容校验，失效时从头读取。
+        支持csv、jsonl、xlsx、json格式，xlsx和json只记录行号
+        :param sign_col: 用于筛选数据的列，传入表头值或列序号，要用列号用Col('a')，为True获取所有行
+        :param signs: 按这个值筛选未处理的行，可用list, tuple, set设置多个
+        :param deny_sign: 是否反向匹配sign，即筛选值不是sign的行
+        :param cols: 要获取的列，为True获取所有列
+        :param where: 多列组合筛选条件
+        :param name: 游标名称，用于在同一文件保存多个游标，为None时根据筛选条件生成
+        :return: ResumeCursor对象
+        """
+        ...
+
+    def build_index(self, col: Union[str, int], rebuild: bool = False) -> KeyIndex:
+        """为某列建立值到行号的索引，保存在'文件路径.*.index'文件中，之后可用find()和contains()快速查找。
+        文件末尾追加数据后只读取新增部分更新索引，已有行被修改时索引会在下次使用时重建。
+        支持csv、jsonl、xlsx、json格式，csv和jsonl同时记录行的字节位置，读取行时直接定位
+        :param col: 要建立索引的列，传入表头值或列序号
+        :param rebuild: 是否重新建立，为False时使用已保存的索引并补充新数据
+        :return: KeyIndex对象
+        """
+        ...
+
+    def find(self, value: Any, col: Union[str, int, None] = None) -> List[RowData]:
+        """用索引查找某列值等于value的行，会合并覆盖层中的修改
+        :param value: 要查找的值，会转为str比较
+        :param col: 要查找的列，没有索引时自动建立，为None时使用最近建立的索引
+        :return: RowData对象组成的列表
+        """
+        ...
+
+    def contains(self, value: Any, col: Union[str, int, None] = None) -> bool:
+        """用索引判断某列是否有值等于value的行，不读取行数据
+        :param value: 要查找的值，会转为str比较
+        :param col: 要查找的列，没有索引时自动建立，为None时使用最近建立的索引
+        :return: 是否存在
+        """
+        ...
+
+    def _find(self, value: Any, col: Union[str, int, None]) -> Tuple[KeyIndex, Dict[int, Optional[int]]]:
+        """查找符合条件的行
+        :param value: 要查找的值
+        :param col: 要查找的列
+        :return: (KeyIndex对象, {行号: 字节位置})
+        """
+        ...
+
+    def _iter_rows(self,
+                   cols: Union[str, int, list, tuple, True],
+                   sign_col: Union[str, int, True],
+                   signs: Any,
+                   deny_sign: bool,
+                   count: Optional[int],
+                   begin_row: Optional[int],
+                   end_row: Optional[int],
+                   where: Optional[Filter],
+                   cursor: Optional[ResumeCursor] = None,
+                   workers: Optional[int] = None) -> Generator[Union[RowData, RowText], None, None]: ...
+
     def _handle_data(self, data: Any, coord: tuple) -> Tuple[dict, int]:
         """把数据处理成存储格式
         :param data: 要处理的数据
@@ -274,6 +410,28 @@ class Recorder(BaseRecorder):
         """
         ...
 
+    def _handle_frame(self, frame: Any, coord: tuple) -> Tuple[dict, int]:
+        """把DataFrame处理成存储格式，按列批量清洗数据
+        :param frame: DataFrame对象
+        :param coord: 单元格坐标
+        :return: (处理后的数据, 数据数量)
+        """
+        ...
+
+    def compact(self) -> str:
+        """把覆盖层中的修改写入文件，并删除覆盖层文件
+        :return: 文件路径
+        """
+        ...
+
+    def clear(self) -> None:
+        """清空缓存中的数据，包括未写入覆盖层的修改"""
+        ...
+
+    def delete(self) -> None:
+        """删除所指向的文件、它的覆盖层和去重记录"""
+        ...
+
     def _record(self) -> None:
         """记录数据"""
         ...
@@ -323,6 +481,468 @@ class Recorder(BaseRecorder):
         ...
 
 
+class ResumeCursor(object):
+    """断点游标，记录第一个符合筛选条件（即未处理）的行的位置"""
+    _recorder: Recorder = ...
+    _path: str = ...
+    _args: dict = ...
+    name: str = ...
+    row: Optional[int] = ...
+    offset: Optional[int] = ...
+    _file: Optional[Tuple[int, int]] = ...
+    _tail: Optional[str] = ...
+    _found: bool = ...
+
+    def __init__(self, recorder: Recorder,
+                 cols: Union[str, int, list, tuple, True],
+                 sign_col: Union[str, int, True],
+                 signs: Any,
+                 deny_sign: bool,
+                 where: Optional[Filter],
+                 name: Optional[str]):
+        """
+        :param recorder: Recorder对象
+        :param cols: 要获取的列
+        :param sign_col: 用于筛选数据的列
+        :param signs: 筛选值
+        :param deny_sign: 是否反向匹配sign
+        :param where: 多列组合筛选条件
+        :param name: 游标名称
+        """
+        ...
+
+    def fetch(self, count: int = 100) -> List[RowData]:
+        """从游标位置开始获取符合条件的行，并把游标移到其中第一行并保存。
+        获取的行处理后要修改筛选列并record()，否则下次会再次获取
+        :param count: 获取多少条数据
+        :return: RowData对象组成的列表
+        """
+        ...
+
+    def reset(self) -> None:
+        """清除游标，下次从头读取"""
+        ...
+
+    def _mark(self, offset: Optional[int], row: int) -> None:
+        """读取时记录第一个符合条件的行的位置
+        :param offset: 行开头的字节位置，xlsx和json为None
+        :param row: 行号
+        :return: None
+        """
+        ...
+
+    def _check(self) -> None:
+        """检查文件是否被修改，游标失效时清除"""
+        ...
+
+    def _save(self) -> None:
+        """把游标保存到文件"""
+        ...
+
+
+class KeyIndex(object):
+    """某列值到行号的索引"""
+    _recorder: Recorder = ...
+    _path: str = ...
+    col: Union[str, int] = ...
+    name: str = ...
+    _appended: bool = ...
+    _suffix: str = ...
+    _keys: Dict[str, List[List[Optional[int]]]] = ...
+    _file: Optional[Tuple[int, int]] = ...
+    _end: Optional[int] = ...
+    _next_row: Optional[int] = ...
+    _tail: Optional[str] = ...
+
+    def __init__(self, recorder: Recorder, col: Union[str, int]):
+        """
+        :param recorder: Recorder对象
+        :param col: 建立索引的列
+        """
+        ...
+
+    def __len__(self) -> int: ...
+
+    def rows(self, value: Any) -> List[List[Optional[int]]]:
+        """获取某值所在的行，只包含文件中的数据，不包含覆盖层
+        :param value: 要查找的值
+        :return: [[行号, 字节位置], ...]，xlsx和json字节位置为None
+        """
+        ...
+
+    def build(self) -> None:
+        """重新建立索引并保存"""
+        ...
+
+    def update(self) -> None:
+        """文件有变化时更新索引，只追加了数据时只读取新增部分，否则重建"""
+        ...
+
+    def save(self) -> None:
+        """把索引保存到文件"""
+        ...
+
+    def _unchanged(self, size: int) -> bool:
+        """判断已建立索引的部分是否未被修改
+        :param size: 当前文件大小
+        :return: 是否未被修改
+        """
+        ...
+
+    def _reset(self) -> None:
+        """清空索引"""
+        ...
+
+    def _scan(self) -> None:
+        """读取未建立索引的行"""
+        ...
+
+
+_UNSET: object = ...
+
+
+def scan_csv_keys(recorder: Recorder, index: KeyIndex) -> None:
+    """从索引记录的位置开始读取csv文件，补充索引
+    :param recorder: Recorder对象
+    :param index: KeyIndex对象
+    :return: None
+    """
+    ...
+
+
+def scan_jsonl_keys(recorder: Recorder, index: KeyIndex) -> None:
+    """从索引记录的位置开始读取jsonl文件，补充索引
+    :param recorder: Recorder对象
+    :param index: KeyIndex对象
+    :return: None
+    """
+    ...
+
+
+def scan_table_keys(recorder: Recorder, index: KeyIndex) -> None:
+    """从索引记录的行开始读取xlsx或json文件，补充索引
+    :param recorder: Recorder对象
+    :param index: KeyIndex对象
+    :return: None
+    """
+    ...
+
+
+def overlay_value(updates: List[Tuple[Union[str, int], Any]], col: Union[str, int],
+                  header: Header, file_type: str) -> Any:
+    """获取覆盖层对某一列的修改
+    :param updates: [(列, 数据), ...]
+    :param col: 列
+    :param header: Header对象
+    :param file_type: 文件类型
+    :return: 修改后的值，没有修改该列时返回_UNSET
+    """
+    ...
+
+
+def read_index_rows(recorder: Recorder, rows: Dict[int, Optional[int]]) -> List[RowData]:
+    """读取指定的行，有字节位置的直接定位读取
+    :param recorder: Recorder对象
+    :param rows: {行号: 字节位置}
+    :return: RowData对象组成的列表
+    """
+    ...
+
+
+SCAN_METHODS: Dict[str, Callable[[Recorder, KeyIndex], None]] = ...
+
+
+def tail_xlsx_rows(recorder: Recorder, n: int, cols: Union[str, int, list, tuple, True]) -> List[RowData]:
+    """读取xlsx当前工作表最后n行
+    :param recorder: Recorder对象
+    :param n: 行数
+    :param cols: 要获取的列
+    :return: RowData对象组成的列表
+    """
+    ...
+
+
+def tail_by_iter(recorder: Recorder, n: int,
+                 cols: Union[str, int, list, tuple, True]) -> List[Union[RowData, RowText]]:
+    """从头遍历文件，保留最后n行
+    :param recorder: Recorder对象
+    :param n: 行数
+    :param cols: 要获取的列
+    :return: RowData或RowText对象组成的列表
+    """
+    ...
+
+
+def tail_csv_rows(recorder: Recorder, n: int, cols: Union[str, int, list, tuple, True]) -> List[RowData]:
+    """从末尾读取csv文件最后n行
+    :param recorder: Recorder对象
+    :param n: 行数
+    :param cols: 要获取的列
+    :return: RowData对象组成的列表
+    """
+    ...
+
+
+def tail_jsonl_rows(recorder: Recorder, n: int, cols: Union[str, int, list, tuple, True]) -> List[RowData]:
+    """从末尾读取jsonl文件最后n行
+    :param recorder: Recorder对象
+    :param n: 行数
+    :param cols: 要获取的列
+    :return: RowData对象组成的列表
+    """
+    ...
+
+
+def tail_txt_rows(recorder: Recorder, n: int, cols: Any) -> List[RowText]:
+    """从末尾读取txt文件最后n行
+    :param recorder: Recorder对象
+    :param n: 行数
+    :param cols: 无效
+    :return: RowText对象组成的列表
+    """
+    ...
+
+
+def split_tail_lines(text: str) -> List[str]:
+    """把从末尾读取的文本按换行符分行，去掉最后一个换行后的空串
+    :param text: 文本
+    :return: 行文本列表
+    """
+    ...
+
+
+def tail_row_nums(recorder: Recorder, num: int) -> Iterable[Optional[int]]:
+    """按行数计数推算从末尾读取的各行的行号，计数文件无效、须统计整个文件才能得到行数时行号都为None
+    :param recorder: Recorder对象
+    :param num: 读取到的行数
+    :return: 各行行号
+    """
+    ...
+
+
+def read_tail(recorder: Recorder, n: int, quote: Optional[str] = None) -> Optional[str]:
+    """读取文件最后n行的文本
+    :param recorder: Recorder对象
+    :param n: 行数
+    :param quote: csv的引号字符，换行在引号内时不作为行边界
+    :return: 文本，需要从头读取时返回None
+    """
+    ...
+
+
+def find_tail_offset(f: BinaryIO, n: int, quote: Optional[bytes] = None, block: int = ...) -> Optional[int]:
+    """从文件末尾向前按块查找最后n行开始的字节位置
+    :param f: 以二进制打开的文件对象
+    :param n: 行数
+    :param quote: 引号字节，用于按引号奇偶判断换行是否在字段内
+    :param block: 每次读取的字节数
+    :return: 字节位置，读到文件开头时返回None
+    """
+    ...
+
+
+TAIL_BLOCK: int = ...
+COUNT_BLOCK: int = ...
+JSON_BLOCK: int = ...
+_NUMBER_TAIL: Pattern = ...
+PARALLEL_CHUNK: int = ...
+_NOT_MARKS: Dict[bytes, bytes] = ...
+
+
+class RowCounter(object):
+    """文件行数计数器"""
+    _recorder: Recorder = ...
+    _path: str = ...
+    _lines: int = ...
+    _end: int = ...
+    _quoted: bool = ...
+    _last_nl: bool = ...
+    _marks: List[List[Union[int, bool]]] = ...
+    _file: Optional[Tuple[int, int]] = ...
+    _tail: Optional[str] = ...
+
+    def __init__(self, recorder: Recorder):
+        """
+        :param recorder: Recorder对象
+        """
+        ...
+
+    @property
+    def count(self) -> int:
+        """返回文件行数，最后一行没有换行符时也计算在内"""
+        ...
+
+    @property
+    def cheap(self) -> bool:
+        """计数与文件一致，或文件只在末尾追加了不超过一个块，更新计数时不用统计整个文件"""
+        ...
+
+    def offset(self, num: int) -> Optional[List[Union[int, bool]]]:
+        """返回第num行之前最近的记录点，用于跳过前面的行
+        :param num: 要跳过的行数
+        :return: [字节位置, 之前的行数, 是否在引号内]，没有时返回None
+        """
+        ...
+
+    def update(self) -> None:
+        """文件有变化时更新计数并保存，只追加了数据时只读取新增部分，否则重新统计"""
+        ...
+
+    def _reset(self) -> None:
+        """清空计数"""
+        ...
+
+
+def count_lines(path: Union[str, Path],
+                begin: int = 0,
+                lines: int = 0,
+                quote: Optional[bytes] = None,
+                quoted: bool = False,
+                marks: Optional[list] = None,
+                block: int = ...) -> Tuple[int, bool, Optional[bool], int]:
+    """用mmap统计文件某个位置之后的换行数，quote不为None时不统计引号内的换行
+    :param path: 文件路径
+    :param begin: 开始统计的字节位置
+    :param lines: begin之前的行数
+    :param quote: 引号字节
+    :param quoted: begin位置是否在引号内
+    :param marks: 传入列表时，每块开始处添加[字节位置, 之前的行数, 是否在引号内]
+    :param block: 每次处理的字节数
+    :return: (总换行数, 结束位置是否在引号内, 文件是否以换行结尾，没有新内容时为None, 结束位置)
+    """
+    ...
+
+
+def skip_lines(path: Union[str, Path],
+               num: int,
+               begin: int = 0,
+               quote: Optional[bytes] = None,
+               quoted: bool = False,
+               block: int = ...) -> Optional[int]:
+    """用mmap跳过begin之后的num行，quote不为None时引号内的换行不算行边界
+    :param path: 文件路径
+    :param num: 要跳过的行数
+    :param begin: 开始的字节位置
+    :param quote: 引号字节
+    :param quoted: begin位置是否在引号内
+    :param block: 每次处理的字节数
+    :return: 跳过后的字节位置，行数不足时返回None
+    """
+    ...
+
+
+def quoted_lines(chunk: bytes, quote: bytes, quoted: bool) -> Tuple[int, bool, Optional[int]]:
+    """统计一块数据中引号外的换行数
+    :param chunk: 数据
+    :param quote: 引号字节
+    :param quoted: 开始时是否在引号内
+    :return: (换行数, 结束时是否在引号内, 引号内没有换行时可按换行定位的开始位置，否则为None)
+    """
+    ...
+
+
+def not_marks(quote: bytes) -> bytes:
+    """返回除引号和换行外的所有字节，用于bytes.translate()删除
+    :param quote: 引号字节
+    :return: 字节
+    """
+    ...
+
+
+def line_offset(recorder: Recorder, num: int) -> Optional[int]:
+    """返回跳过文件前num行后的字节位置，有行数计数器时从最近的记录点开始查找
+    :param recorder: Recorder对象
+    :param num: 要跳过的行数
+    :return: 字节位置，行数不足时返回None
+    """
+    ...
+
+
+def open_at_row(recorder: Recorder, num: int) -> Optional[TextIO]:
+    """以文本方式打开文件并跳过前num行，换行符为单字节的编码用mmap定位，不逐行读取
+    :param recorder: Recorder对象
+    :param num: 要跳过的行数
+    :return: 文件对象，行数不足时返回None
+    """
+    ...
+
+
+def get_xlsx_max_row(recorder: Recorder) -> int:
+    """以只读方式获取xlsx当前工作表的最大行号
+    :param recorder: Recorder对象
+    :return: 最大行号，工作表不存在时返回0
+    """
+    ...
+
+
+def warm_seen(recorder: Recorder, table: Optional[str]) -> None:
+    """读取文件中已有数据，初始化某个表的去重记录
+    :param recorder: Recorder对象
+    :param table: 表名
+    :return: None
+    """
+    ...
+
+
+def write_overlay(recorder: Recorder) -> None:
+    """把缓存的修改追加到覆盖层文件，每批修改前记录数据文件当前的状态
+    :param recorder: Recorder对象
+    :return: None
+    """
+    ...
+
+
+def read_overlay(recorder: Recorder) -> List[list]:
+    """读取覆盖层中所有有效记录，写入后数据文件被替换或改写过的批次被忽略
+    :param recorder: Recorder对象
+    :return: [表名, 行号, 列, 数据]组成的列表
+    """
+    ...
+
+
+def overlay_matches(path: Union[str, Path], mark: dict) -> bool:
+    """判断数据文件是否仍是覆盖层记录写入时的文件，之后只在末尾追加过数据
+    :param path: 数据文件路径
+    :param mark: 写入时记录的{'end': 文件大小, 'tail': 末尾内容的哈希值}
+    :return: 是否一致
+    """
+    ...
+
+
+def load_overlay(recorder: Recorder) -> Optional[Dict[int, List[Tuple[Union[str, int], Any]]]]:
+    """读取当前表的覆盖层记录，按行号分组
+    :param recorder: Recorder对象
+    :return: {行号: [(列, 数据), ...]}，没有记录时返回None
+    """
+    ...
+
+
+def fold_overlay(recorder: Recorder) -> bool:
+    """把覆盖层记录插入到缓存数据最前面，在改写整个文件时一起写入
+    :param recorder: Recorder对象
+    :return: 是否有覆盖层记录
+    """
+    ...
+
+
+def overlay_cells(line: list, updates: List[Tuple[Union[str, int], Any]], header: Header,
+                  empty: Optional[str], process: Callable) -> list:
+    """把覆盖层中的修改应用到一行数据上
+    :param line: 行数据
+    :param updates: [(列, 数据), ...]
+    :param header: Header对象
+    :param empty: 补齐行长度时使用的空值
+    :param process: 处理单元格值的方法
+    :return: 修改后的行数据
+    """
+    ...
+
+
+def csv_value(value: Any) -> str:
+    """把值转为从csv读取时的形式"""
+    ...
+
+
 def handle_txt_lines(data_lst: list, lines: list, val: Any, method: Callable) -> None:
     """txt、json、jsonl格式相同的写入逻辑
     :param data_lst: 数据总列表
@@ -391,187 +1011,315 @@ def get_first_dict(data: list) -> dict:
     ...
 
 
-def get_xlsx_rows(recorder: Recorder, header: Header, key_cols: Union[list, True],
-                  begin_row: Optional[int], end_row: Optional[int],
-                  sign_col: Union[str, int, bool], sign: Any,
-                  deny_sign: bool, count: int, ws: Worksheet) -> List[RowData]:
-    """获取xlsx文件指定行数据
+def get_table_args(recorder: Recorder, header: Header, cols: Union[str, int, list, tuple, True],
+                   sign_col: Union[str, int, True],
+                   begin_row: Optional[int]) -> Tuple[Union[List[int], True], Union[int, True], int]:
+    """处理xlsx和csv格式读取数据的参数
     :param recorder: Recorder对象
     :param header: Header对象
-    :param key_cols: 要获取的列，为True获取所有，可指定多列
-    :param begin_row: 开始行号
-    :param end_row: 结束行号，None为最后一行
+    :param cols: 要获取的列
     :param sign_col: 作为条件的列
+    :param begin_row: 开始行号
+    :return: (列序号列表, 条件列序号, 开始行号)
+    """
+    ...
+
+
+def iter_xlsx_rows(recorder: Recorder, cols: Union[str, int, list, tuple, True],
+                   sign_col: Union[str, int, True], sign: Iterable, deny_sign: bool,
+                   count: Optional[int], begin_row: Optional[int], end_row: int,
+                   where: Optional[Filter],
+                   cursor: Optional[ResumeCursor] = None) -> Generator[RowData, None, None]:
+    """逐行读取xlsx文件数据，结束或关闭生成器时关闭文件
+    :param recorder: Recorder对象
+    :param cols: 要获取的列，为True获取所有，可指定多列
+    :param sign_col: 作为条件的列，为True获取所有行
     :param sign: 按这个值筛选目标行，可设置多个
     :param deny_sign: 是否反向匹配sign，即筛选指不是sign的行
     :param count: 获取多少条数据，为None获取所有
-    :param ws: Worksheet对象
-    :return: 获取到的数据列表
+    :param begin_row: 开始行号，None表示header_row后面一行
+    :param end_row: 结束行号，0为最后一行
+    :param where: 多列组合筛选条件
+    :param cursor: 断点游标，传入时从游标位置开始读取并记录第一个符合条件的行
+    :return: 逐条返回数据的生成器
     """
     ...
 
 
-def get_csv_rows(recorder: Recorder, header: Header, key_cols: Union[list, True],
-                 begin_row: Optional[int], end_row: Optional[int],
-                 sign_col: Union[str, int, bool], sign: Any,
-                 deny_sign: bool, count: int, ws: Worksheet) -> List[RowData]:
-    """获取csv文件指定行数据
+def iter_csv_rows(recorder: Recorder, cols: Union[str, int, list, tuple, True],
+                  sign_col: Union[str, int, True], sign: Iterable, deny_sign: bool,
+                  count: Optional[int], begin_row: Optional[int], end_row: int,
+                  where: Optional[Filter],
+                  cursor: Optional[ResumeCursor] = None) -> Generator[RowData, None, None]:
+    """逐行读取csv文件数据，结束或关闭生成器时关闭文件
     :param recorder: Recorder对象
-    :param header: Header对象
-    :param key_cols: 要获取的列，为True获取所有，可指定多列
-    :param begin_row: 开始行号
-    :param end_row: 结束行号，None为最后一行
-    :param sign_col: 作为条件的列
+    :param cols: 要获取的列，为True获取所有，可指定多列
+    :param sign_col: 作为条件的列，为True获取所有行
     :param sign: 按这个值筛选目标行，可设置多个
     :param deny_sign: 是否反向匹配sign，即筛选指不是sign的行
     :param count: 获取多少条数据，为None获取所有
-    :param ws: 与get_xlsx_rows()对应
-    :return: 获取到的数据列表
+    :param begin_row: 开始行号，None表示header_row后面一行
+    :param end_row: 结束行号，0为最后一行
+    :param where: 多列组合筛选条件
+    :param cursor: 断点游标，传入时从游标位置开始读取并记录第一个符合条件的行
+    :return: 逐条返回数据的生成器
     """
     ...
 
 
-def get_csv_rows_key_is_True(line: Union[list, dict], res: list, header: Header, ind: int,
-                             key_cols: list, header_len: int) -> None: ...
-
-
-def get_csv_rows_key_not_True(line: Union[list, dict], res: list, header: Header, ind: int,
-                              key_cols: list, header_len: int) -> None: ...
+def make_csv_row(line: list, header: Header, ind: int, key_cols: Union[List[int], True],
+                 header_len: int, index: Optional[dict]) -> RowData:
+    """把csv一行数据生成RowData对象
+    :param line: 行数据
+    :param header: Header对象
+    :param ind: 行号
+    :param key_cols: 要获取的列
+    :param header_len: 表头长度
+    :param index: 只获取部分列时共用的索引
+    :return: RowData对象
+    """
+    ...
 
 
-def get_jsonl_rows(recorder: Recorder, header: Header, key_cols: Union[list, True],
-                   begin_row: Optional[int], end_row: Optional[int],
-                   sign_col: Union[str, int, bool], sign: Any,
-                   deny_sign: bool, count: int, ws: Worksheet) -> List[RowData]:
-    """获取csv文件指定行数据
+def iter_jsonl_rows(recorder: Recorder, cols: Union[str, int, list, tuple, True],
+                    sign_col: Union[str, int, True], sign: Iterable, deny_sign: bool,
+                    count: Optional[int], begin_row: Optional[int], end_row: int,
+                    where: Optional[Filter],
+                    cursor: Optional[ResumeCursor] = None) -> Generator[RowData, None, None]:
+    """逐行读取jsonl文件数据，结束或关闭生成器时关闭文件
     :param recorder: Recorder对象
-    :param header: Header对象
-    :param key_cols: 要获取的列，为True获取所有，可指定多列
-    :param begin_row: 开始行号
-    :param end_row: 结束行号，None为最后一行
-    :param sign_col: 作为条件的列
+    :param cols: 要获取的列，为True获取所有，可指定多列
+    :param sign_col: 作为条件的列，为True获取所有行
     :param sign: 按这个值筛选目标行，可设置多个
     :param deny_sign: 是否反向匹配sign，即筛选指不是sign的行
     :param count: 获取多少条数据，为None获取所有
-    :param ws: 与get_xlsx_rows()对应
-    :return: 获取到的数据列表
+    :param begin_row: 开始行号，None表示header_row后面一行
+    :param end_row: 结束行号，0为最后一行
+    :param where: 多列组合筛选条件
+    :param cursor: 断点游标，传入时从游标位置开始读取并记录第一个符合条件的行
+    :return: 逐条返回数据的生成器
     """
     ...
 
 
-def get_jsonl_rows_key_is_True(line: Union[list, dict], res: list, header: Header, ind: int,
-                               key_cols: list, header_len: int) -> None: ...
+def iter_jsonl_candidates(recorder: Recorder, header: Header, cols: Union[str, int, list, tuple, True],
+                          sign_col: Union[str, int], sign: List[str], count: Optional[int], begin_row: int,
+                          end_row: int, match: Optional[Callable[[Any], bool]], pre: Tuple[bytes, ...],
+                          cursor: Optional[ResumeCursor]) -> Generator[RowData, None, None]:
+    """按sign筛选jsonl文件时，只解析包含sign序列化后的值的行
+    :param recorder: Recorder对象
+    :param header: 表头
+    :param cols: 要获取的列
+    :param sign_col: 作为条件的列
+    :param sign: 转换为str的sign值
+    :param count: 获取多少条数据，为None获取所有
+    :param begin_row: 开始行号
+    :param end_row: 结束行号，0为最后一行
+    :param match: Filter编译后的判断函数
+    :param pre: 要查找的字节
+    :param cursor: 断点游标
+    :return: 逐条返回数据的生成器
+    """
+    ...
 
 
-def get_jsonl_rows_key_not_True(line: Union[list, dict], res: list, header: Header, ind: int,
-                                key_cols: list, header_len: int) -> None: ...
+class CandidateLines(object):
+    """用mmap按块查找包含某些字节的行，逐个返回(行号, 行开始位置, 行)"""
+    _file: BinaryIO = ...
+    _patterns: Tuple[bytes, ...] = ...
+    _block: int = ...
+    pos: int = ...
+    row: int = ...
 
+    def __init__(self, file: BinaryIO, patterns: Tuple[bytes, ...], pos: int, row: int, block: int = ...):
+        """
+        :param file: 以二进制打开的文件对象
+        :param patterns: 要查找的字节
+        :param pos: 开始的字节位置，须为行首
+        :param row: pos位置的行号
+        :param block: 每次处理的字节数
+        """
+        ...
 
-def get_jsonl_rows_with_count(lines: TextIOWrapper, begin_row: Optional[int], end_row: Optional[int],
-                              sign_col: Union[str, int, bool], sign: Any, deny_sign: bool,
-                              key_cols: Union[list, True], res, header: Header, count: int) -> None: ...
+    def __iter__(self) -> Generator[Tuple[int, int, bytes], None, None]: ...
 
 
-def get_json_rows_with_count(lines: list, begin_row: Optional[int], end_row: Optional[int],
-                             sign_col: Union[str, int, bool], sign: Any, deny_sign: bool,
-                             key_cols: Union[list, True], res, header: Header, count: int) -> None: ...
+def sign_prefilter(sign: List[str], encoding: str) -> Optional[Tuple[bytes, ...]]:
+    """返回sign值在jsonl文件中可能的字节形式，包括转义和不转义非ascii字符两种
+    :param sign: 转换为str的sign值
+    :param encoding: 文件编码
+    :return: 字节形式组成的tuple，无法确定时返回None
+    """
+    ...
 
 
-def get_json_rows(recorder: Recorder, header: Header, key_cols: Union[list, True],
-                  begin_row: Optional[int], end_row: Optional[int],
-                  sign_col: Union[str, int, bool], sign: Any,
-                  deny_sign: bool, count: int, ws: Worksheet) -> List[RowData]:
-    """获取csv文件指定行数据
+def iter_json_rows(recorder: Recorder, cols: Union[str, int, list, tuple, True],
+                   sign_col: Union[str, int, True], sign: Iterable, deny_sign: bool,
+                   count: Optional[int], begin_row: Optional[int], end_row: int,
+                   where: Optional[Filter],
+                   cursor: Optional[ResumeCursor] = None) -> Generator[RowData, None, None]:
+    """逐条读取json文件数据
     :param recorder: Recorder对象
-    :param header: Header对象
-    :param key_cols: 要获取的列，为True获取所有，可指定多列
-    :param begin_row: 开始行号
-    :param end_row: 结束行号，None为最后一行
-    :param sign_col: 作为条件的列
+    :param cols: 要获取的列，为True获取所有，可指定多列
+    :param sign_col: 作为条件的列，为True获取所有行
     :param sign: 按这个值筛选目标行，可设置多个
     :param deny_sign: 是否反向匹配sign，即筛选指不是sign的行
     :param count: 获取多少条数据，为None获取所有
-    :param ws: 与get_xlsx_rows()对应
-    :return: 获取到的数据列表
+    :param begin_row: 开始行号，None表示header_row后面一行
+    :param end_row: 结束行号，0为最后一行
+    :param where: 多列组合筛选条件
+    :param cursor: 断点游标，传入时从游标位置开始读取并记录第一个符合条件的行
+    :return: 逐条返回数据的生成器
     """
     ...
 
 
-def get_txt_rows(recorder: Recorder, header: Header, key_cols: Union[list, True],
-                 begin_row: Optional[int], end_row: Optional[int],
-                 sign_col: Union[str, int, bool], sign: Any,
-                 deny_sign: bool, count: int, ws: Worksheet) -> List[RowText]:
-    """获取csv文件指定行数据
-    :param recorder: Recorder对象
-    :param header: Header对象
-    :param key_cols: 要获取的列，为True获取所有，可指定多列
-    :param begin_row: 开始行号
-    :param end_row: 结束行号，None为最后一行
+def iter_json_array(f: TextIO, block: int = ...) -> Generator[Any, None, None]:
+    """逐个解析json文件顶层数组的元素，不一次读取整个文件
+    :param f: 以文本方式打开的文件对象
+    :param block: 每次读取的字符数
+    :return: 逐个返回元素的生成器
+    """
+    ...
+
+
+def get_json_sign(line: Union[dict, list], sign_col: Union[str, int], header: Header) -> Any:
+    """获取json或jsonl一行数据中条件列的值
+    :param line: 行数据
     :param sign_col: 作为条件的列
+    :param header: Header对象
+    :return: 条件列的值，没有时返回None
+    """
+    ...
+
+
+def make_json_row(line: Union[dict, list], header: Header, ind: int,
+                  key_cols: Union[str, int, list, tuple, True], header_len: int,
+                  headers: Dict[tuple, Tuple[Header, tuple]]) -> RowData:
+    """把json或jsonl一行数据生成RowData对象
+    :param line: 行数据
+    :param header: Header对象
+    :param ind: 行号
+    :param key_cols: 要获取的列
+    :param header_len: 表头长度
+    :param headers: 按dict键缓存的Header和列序号
+    :return: RowData对象
+    """
+    ...
+
+
+def iter_txt_rows(recorder: Recorder, cols: Union[str, int, list, tuple, True],
+                  sign_col: Union[str, int, True], sign: Iterable, deny_sign: bool,
+                  count: Optional[int], begin_row: Optional[int], end_row: int,
+                  where: Optional[Filter],
+                  cursor: Optional[ResumeCursor] = None) -> Generator[RowText, None, None]:
+    """逐行读取txt文件数据，结束或关闭生成器时关闭文件
+    :param recorder: Recorder对象
+    :param cols: 要获取的列，为True获取所有，可指定多列
+    :param sign_col: 作为条件的列，为True获取所有行
     :param sign: 按这个值筛选目标行，可设置多个
     :param deny_sign: 是否反向匹配sign，即筛选指不是sign的行
     :param count: 获取多少条数据，为None获取所有
-    :param ws: 与get_xlsx_rows()对应
-    :return: 获取到的数据列表
+    :param begin_row: 开始行号，None表示header_row后面一行
+    :param end_row: 结束行号，0为最后一行
+    :param where: 多列组合筛选条件
+    :param cursor: 断点游标，传入时从游标位置开始读取并记录第一个符合条件的行
+    :return: 逐条返回数据的生成器
     """
     ...
 
 
-def get_xlsx_rows_with_count(key_cols: Union[list, True], deny_sign: bool, header: Header, rows: Iterable,
-                             begin_row: Optional[int], end_row: Optional[int],
-                             sign_col: Union[str, int, bool], sign: Any,
-                             count: int) -> List[RowData]:
-    """执行从xlsx中获取数据，有指定数量
-    :param key_cols: 要获取的列，True为所有
+def iter_rows_parallel(recorder: Recorder, cols: Union[str, int, list, tuple, True],
+                       sign_col: Union[str, int, True], sign: Iterable, deny_sign: bool,
+                       count: Optional[int], begin_row: Optional[int], end_row: int,
+                       where: Optional[Filter], workers: int,
+                       chunk_size: int = ...) -> Generator[RowData, None, None]:
+    """把csv或jsonl文件按记录边界分块，在多个进程中解析和筛选，按行顺序返回结果
+    :param recorder: Recorder对象
+    :param cols: 要获取的列，为True获取所有，可指定多列
+    :param sign_col: 作为条件的列，为True获取所有行
+    :param sign: 按这个值筛选目标行，可设置多个
     :param deny_sign: 是否反向匹配sign，即筛选指不是sign的行
-    :param header: Header对象
-    :param rows: 行组成的列表
-    :param begin_row: 开始行号
-    :param end_row: 结束行号，None为最后一行
-    :param sign_col: 用于筛选数据的列
-    :param sign: 用于筛选数据的值
-    :param count: 数据总条数
-    :return: 数据对象列表
+    :param count: 获取多少条数据，为None获取所有，在合并结果时计数
+    :param begin_row: 开始行号，None表示header_row后面一行
+    :param end_row: 结束行号，0为最后一行
+    :param where: 多列组合筛选条件
+    :param workers: 进程数
+    :param chunk_size: 每块的最小字节数，文件只能分出一块时逐行读取
+    :return: 逐条返回数据的生成器
     """
     ...
 
 
-def get_xlsx_rows_without_count(key_cols: Union[list, True], deny_sign: bool, header: Header, rows: Iterable,
-                                begin_row: Optional[int], end_row: Optional[int],
-                                sign_col: Union[str, int, bool], sign: Any) -> List[RowData]:
-    """执行从xlsx中获取全部数据
-    :param key_cols: 要获取的列，True为所有
-    :param deny_sign: 是否反向匹配sign，即筛选指不是sign的行
-    :param header: Header对象
-    :param rows: 行组成的列表
-    :param begin_row: 开始行号
-    :param end_row: 结束行号，None为最后一行
-    :param sign_col: 用于筛选数据的列
-    :param sign: 用于筛选数据的值
-    :return: 数据对象列表
+def split_ranges(path: Union[str, Path], begin: int, end: int, parts: int,
+                 quote: Optional[bytes] = None, chunk_size: int = ...) -> List[Tuple[int, int]]:
+    """把文件的字节范围分成若干块，每块都从记录开头开始
+    :param path: 文件路径
+    :param begin: 开始字节位置，须在记录开头
+    :param end: 结束字节位置，须在记录开头或文件末尾
+    :param parts: 希望分成的块数
+    :param quote: csv的引号，传入时引号内的换行不作为分块位置
+    :param chunk_size: 每块的最小字节数
+    :return: [(开始位置, 结束位置), ...]
     """
     ...
 
 
-def get_csv_rows_with_count(lines: reader, begin_row: Optional[int], end_row: Optional[int],
-                            sign_col: Union[str, int, bool], sign: Any, deny_sign: bool,
-                            key_cols: Union[list, True], res, header: Header, count: int) -> List[RowData]:
-    """执行从csv中获取数据，有指定数量
-    :param lines:
-    :param begin_row: 开始行号
-    :param end_row: 结束行号，None为最后一行
-    :param sign_col: 用于筛选数据的列
-    :param sign: 用于筛选数据的值
-    :param deny_sign: 是否反向匹配sign，即筛选指不是sign的行
-    :param key_cols: 要获取的列，True为所有
-    :param res: 结果列表
-    :param header: Header对象
-    :param count: 数据总条数
-    :return: 数据对象列表
+def read_chunk(path: Union[str, Path], begin: int, end: int, encoding: str) -> str:
+    """读取文件中一段字节并解码
+    :param path: 文件路径
+    :param begin: 开始字节位置
+    :param end: 结束字节位置
+    :param encoding: 编码
+    :return: 文本
     """
     ...
 
 
+def scan_csv_chunk(path: str, begin: int, end: int, encoding: str, delimiter: str, quote_char: str,
+                   sign_col: Union[int, True], sign: List[str], deny_sign: bool, header: Header,
+                   where: Optional[Filter]) -> Tuple[int, List[Tuple[int, list]]]:
+    """在子进程中解析csv文件的一块并筛选
+    :param path: 文件路径
+    :param begin: 开始字节位置
+    :param end: 结束字节位置
+    :param encoding: 编码
+    :param delimiter: 分隔符
+    :param quote_char: 引号
+    :param sign_col: 作为条件的列序号，为True获取所有行
+    :param sign: 按这个值筛选目标行
+    :param deny_sign: 是否反向匹配sign
+    :param header: 表头
+    :param where: 多列组合筛选条件
+    :return: (块中的记录数, [(在块中的序号, 行数据), ...])
+    """
+    ...
+
+
+def scan_jsonl_chunk(path: str, begin: int, end: int, encoding: str, delimiter: str, quote_char: str,
+                     sign_col: Union[str, int, True], sign: List[str], deny_sign: bool, header: Header,
+                     where: Optional[Filter]) -> Tuple[int, List[Tuple[int, Union[dict, list]]]]:
+    """在子进程中解析jsonl文件的一块并筛选，参数与scan_csv_chunk()相同，delimiter和quote_char不使用
+    :param path: 文件路径
+    :param begin: 开始字节位置
+    :param end: 结束字节位置
+    :param encoding: 编码
+    :param delimiter: 不使用
+    :param quote_char: 不使用
+    :param sign_col: 作为条件的列，为True获取所有行
+    :param sign: 按这个值筛选目标行
+    :param deny_sign: 是否反向匹配sign
+    :param header: 表头
+    :param where: 多列组合筛选条件
+    :return: (块中的行数, [(在块中的序号, 行数据), ...])
+    """
+    ...
+
+
+ROWS_METHODS: Dict[str, Callable] = ...
+TAIL_METHODS: Dict[str, Callable[[Recorder, int, Union[str, int, list, tuple, True]], list]] = ...
+
+
 def get_and_set_csv_header(recorder: Recorder, new_csv: bool, file: TextIOWrapper, writer: writer) -> None:
     """从csv获取表头或把已获取的表头设置到新csv
     :param recorder: Recorder对象
@@ -1,13 +1,17 @@
 # -*- coding:utf-8 -*-
 from pathlib import Path
+from re import fullmatch
 
 from openpyxl.reader.excel import load_workbook
 from openpyxl.workbook import Workbook
 
 from .cell_style import CellStyle
+from .dedupe import Deduper
 from .tools import (make_valid_name, make_final_data_simplify, make_final_data,
                     Header, ZeroHeader, process_content_xlsx, ok_list_str, data2ws_follow, data2ws, data2ws_style)
 
+COL_TYPE = r'[A-Za-z_ ]+(\(\s*\d+\s*(,\s*\d+\s*)?\))?'  # 类型名和约束关键字，可带数字参数，如NUMERIC(10, 2)
+
 
 class OriginalSetter(object):
     def __init__(self, recorder):
@@ -51,6 +55,15 @@ class BaseSetter(OriginalSetter):
         self._recorder._auto_new_header = on_off
         return self
 
+    def dedupe(self, key_cols, persist=True, bloom=False, capacity=1000000, error_rate=.001):
+        self._recorder.record()
+        if key_cols is None or key_cols is False:
+            self._recorder._deduper = None
+        else:
+            self._recorder._deduper = Deduper(key_cols, persist=persist, bloom=bloom,
+                                              capacity=capacity, error_rate=error_rate)
+        return self
+
     def before(self, data):
         return self._set_after_before(True, data)
 
@@ -137,6 +150,8 @@ class RecorderSetter(BaseSetter):
             if suffix:
                 file_type = suffix[1:]
         self.file_type(file_type)
+        if self._recorder._deduper is not None:
+            self._recorder._deduper.reset()
         self._recorder._header = {None: None}
         self._recorder._header_row = {None: 1}
         self._recorder._None_header_is_newest = None
@@ -194,6 +209,10 @@ class RecorderSetter(BaseSetter):
             self._recorder.data_col = col
         return self
 
+    def overlay(self, on_off=True):
+        self._recorder._overlay = on_off
+        return self
+
     def link_style(self, style=True):
         if style is True:
             style = CellStyle()
@@ -205,10 +224,14 @@ class RecorderSetter(BaseSetter):
 
 class DBSetter(BaseSetter):
     def path(self, path, table=None):
+        self._recorder._rebuild_dropped()  # 换文件前重建原文件中本次删除的延迟索引
         with self._recorder._lock:
             super().path(path)
-            if self._recorder._conn is not None:
-                self._recorder._close_connection()
+            if self._recorder._deduper is not None:
+                self._recorder._deduper.reset()
+            self._recorder._close_connection(True)
+            self._recorder.refresh_schema()
+            self._recorder._load_indexes()
             self._recorder._connect()
 
             if table:
@@ -221,6 +244,105 @@ class DBSetter(BaseSetter):
             self._recorder._close_connection()
         return self
 
+    def col_types(self, table, types):
+        if not types:
+            self._recorder._col_types.pop(table, None)
+            return self
+        if not isinstance(types, dict):
+            raise TypeError('types只能是dict或None。')
+        for k, v in types.items():
+            if '`' in str(k) or not isinstance(v, str) or not fullmatch(COL_TYPE, v):
+                raise ValueError(f'列类型设置无效：{k}: {v}')
+        self._recorder._col_types[table] = {str(k): v for k, v in types.items()}
+        return self
+
+    def infer_types(self, on_off=True):
+        self._recorder._infer_types = on_off
+        return self
+
+    def indexes(self, table, cols, deferred=True):
+        if not self._recorder.path:
+            raise RuntimeError('未指定数据库文件。')
+        if '`' in table:
+            raise ValueError('table名称不能包含字符"`"。')
+        if isinstance(cols, str):
+            cols = [(cols,)]
+        elif cols and all(isinstance(i, str) for i in cols):  # 一个多列索引
+            cols = [tuple(cols)]
+        elif cols:
+            cols = [(i,) if isinstance(i, str) else tuple(i) for i in cols]
+        if cols and any(not i or any('`' in c for c in i) for i in cols):
+            raise ValueError('列名不能为空或包含字符"`"。')
+
+        self._recorder.record()
+        indexes = self._recorder._indexes
+        if not cols:  # 清除该表的索引设置，不删除已建立的索引
+            for name in [k for k, v in indexes.items() if v[0] == table]:
+                indexes.pop(name)
+        for i in cols or ():
+            name = f"idx_{table}_{'_'.join(i)}"
+            indexes[name] = (table, i, deferred)
+            self._recorder._indexes_done.discard(name)
+        self._recorder._save_indexes()
+        return self
+
+    def keep_connection(self, on_off=True):
+        self._recorder._rebuild_dropped()
+        with self._recorder._lock:
+            if on_off:
+                self._recorder._pragmas.setdefault('journal_mode', 'WAL')
+                self._recorder._pragmas.setdefault('synchronous', 'NORMAL')
+            self._recorder._close_connection(True)
+            self._recorder._keep_conn = on_off
+        return self
+
+    def pragmas(self, journal_mode=None, synchronous=None, cache_size=None, mmap_size=None, temp_store=None):
+        pragmas = {}
+        if journal_mode is not None:
+            if str(journal_mode).upper() not in ('DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF'):
+                raise ValueError(f'journal_mode值无效：{journal_mode}')
+            pragmas['journal_mode'] = str(journal_mode).upper()
+        if synchronous is not None:
+            if str(synchronous).upper() not in ('OFF', 'NORMAL', 'FULL', 'EXTRA', '0', '1', '2', '3'):
+                raise ValueError(f'synchronous值无效：{synchronous}')
+            pragmas['synchronous'] = str(synchronous).upper()
+        if temp_store is not None:
+            if str(temp_store).upper() not in ('DEFAULT', 'FILE', 'MEMORY', '0', '1', '2'):
+                raise ValueError(f'temp_store值无效：{temp_store}')
+            pragmas['temp_store'] = str(temp_store).upper()
+        for k, v in (('cache_size', cache_size), ('mmap_size', mmap_size)):
+            if v is not None:
+                if not isinstance(v, int) or isinstance(v, bool):
+                    raise TypeError(f'{k}值只能是int。')
+                pragmas[k] = v
+
+        with self._recorder._lock:
+            self._recorder._pragmas.update(pragmas)
+            if self._recorder._conn is not None:  # 已有连接时立即生效
+                self._recorder._set_pragmas()
+        return self
+
+    def conflict(self, mode=None, keys=None):
+        if mode is not None:
+            mode = str(mode).upper()
+            if mode not in ('IGNORE', 'REPLACE', 'UPDATE'):
+                raise ValueError("mode只能是None、'ignore'、'replace'或'update'。")
+        if isinstance(keys, str):
+            keys = (keys,)
+        elif keys is not None:
+            if not isinstance(keys, (list, tuple)) or not keys:
+                raise TypeError('keys只能是str、list、tuple或None。')
+            keys = tuple(str(i) for i in keys)
+        if mode == 'UPDATE' and not keys:
+            raise ValueError("mode为'update'时必须设置keys。")
+        if keys and any('`' in i for i in keys):
+            raise ValueError('列名不能包含字符"`"。')
+        self._recorder.record()
+        if keys:
+            self._recorder._make_unique_indexes(keys, self._recorder.table)
+        self._recorder._conflict = (mode, keys or None)
+        return self
+
     def table(self, name):
         if '`' in name:
             raise ValueError('table名称不能包含字符"`"。')
@@ -228,6 +350,56 @@ class DBSetter(BaseSetter):
         return self
 
 
+class ShardedDBSetter(BaseSetter):
+    def path(self, path, shards=None):
+        super().path(path)
+        self._recorder._set_shards(shards or len(self._recorder._shards) or 4)
+        return self
+
+    def key_col(self, col):
+        if col is not None and not isinstance(col, (int, str)):
+            raise TypeError('col值只能是int、str或None。')
+        self._recorder.record()
+        self._recorder._key_col = col
+        self._recorder._key_pos.clear()
+        return self
+
+    def table(self, name):
+        if '`' in name:
+            raise ValueError('table名称不能包含字符"`"。')
+        self._recorder._table = name
+        return self._forward('table', name)
+
+    def auto_new_header(self, on_off=True):
+        super().auto_new_header(on_off)
+        return self._forward('auto_new_header', on_off)
+
+    def keep_connection(self, on_off=True):
+        return self._forward('keep_connection', on_off)
+
+    def pragmas(self, journal_mode=None, synchronous=None, cache_size=None, mmap_size=None, temp_store=None):
+        return self._forward('pragmas', journal_mode, synchronous, cache_size, mmap_size, temp_store)
+
+    def conflict(self, mode=None, keys=None):
+        return self._forward('conflict', mode, keys)
+
+    def col_types(self, table, types):
+        return self._forward('col_types', table, types)
+
+    def infer_types(self, on_off=True):
+        return self._forward('infer_types', on_off)
+
+    def indexes(self, table, cols, deferred=True):
+        return self._forward('indexes', table, cols, deferred)
+
+    def _forward(self, name, *args):  # 各分片使用相同设置，并保存下来在重新分片时再次设置
+        self._recorder.record()
+        for shard in self._recorder._shards:
+            getattr(shard.set, name)(*args)
+        self._recorder._settings.append((name, args))
+        return self
+
+
 def set_csv_header(recorder, header, row):
     if not recorder.path:
         raise FileNotFoundError('未指定文件。')
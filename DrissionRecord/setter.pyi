@@ -6,9 +6,13 @@ from .base import OriginalRecorder, BaseRecorder
 from .cell_style import CellStyle
 from .db_recorder import DBRecorder
 from .recorder import Recorder
+from .sharded_db_recorder import ShardedDBRecorder
 from .tools import Header
 
 
+COL_TYPE: str = ...
+
+
 class OriginalSetter(object):
     _recorder: OriginalRecorder = ...
 
@@ -65,6 +69,24 @@ class BaseSetter(OriginalSetter):
         """
         ...
 
+    def dedupe(self,
+               key_cols: Union[str, int, list, tuple, None],
+               persist: bool = True,
+               bloom: bool = False,
+               capacity: int = 1000000,
+               error_rate: float = .001) -> BaseSetter:
+        """设置按某些列去重，add_data()时丢弃这些列的值已出现过的新增行，指定行号的修改不去重。
+        首次向某表添加数据时读取文件中已有数据，persist为True时已出现的值保存在'文件路径.seen'或'.bloom'文件中，
+        下次直接读取该文件。list格式数据按表头确定列的位置，从第一列开始计算
+        :param key_cols: 用于判断是否重复的列名或列序号，可传入多个，为None时关闭去重
+        :param persist: 是否把已出现的值保存到文件
+        :param bloom: 是否使用Bloom过滤器，占用内存固定，但有很小概率把未出现的行误判为重复
+        :param capacity: Bloom过滤器预计容纳的数据量
+        :param error_rate: Bloom过滤器在达到capacity时的误判率
+        :return: 设置对象自己
+        """
+        ...
+
     def before(self, data: Any) -> BaseSetter:
         """设置在数据前面补充的列
         :param data: 列表、元组或字符串，为字符串时则补充一列
@@ -128,6 +150,24 @@ class RecorderSetter(BaseSetter):
         """
         ...
 
+    def dedupe(self,
+               key_cols: Union[str, int, list, tuple, None],
+               persist: bool = True,
+               bloom: bool = False,
+               capacity: int = 1000000,
+               error_rate: float = .001) -> RecorderSetter:
+        """设置按某些列去重，add_data()时丢弃这些列的值已出现过的新增行，指定行号的修改不去重。
+        首次向某表添加数据时读取文件中已有数据，persist为True时已出现的值保存在'文件路径.seen'或'.bloom'文件中，
+        下次直接读取该文件。list格式数据按表头确定列的位置，从第一列开始计算
+        :param key_cols: 用于判断是否重复的列名或列序号，可传入多个，为None时关闭去重
+        :param persist: 是否把已出现的值保存到文件
+        :param bloom: 是否使用Bloom过滤器，占用内存固定，但有很小概率把未出现的行误判为重复
+        :param capacity: Bloom过滤器预计容纳的数据量
+        :param error_rate: Bloom过滤器在达到capacity时的误判率
+        :return: 设置对象自己
+        """
+        ...
+
     def after(self, data: Any) -> RecorderSetter:
         """设置在每条数据后面补充的数据
         :param data: 列表、元组或字符串，为字符串时则补充一列
@@ -229,6 +269,14 @@ class RecorderSetter(BaseSetter):
         """
         ...
 
+    def overlay(self, on_off: bool = True) -> RecorderSetter:
+        """设置修改已有行时是否写入覆盖层，开启后指定正数行号的add_data()只追加记录到'文件路径.overlay'，
+        不改写原文件，rows()读取时自动合并，调用compact()或以改写整个文件的方式写入时并入原文件
+        :param on_off: True或False
+        :return: 设置对象自己
+        """
+        ...
+
     def link_style(self, style: Union[CellStyle, True] = True) -> RecorderSetter:
         """设置单元格的链接样式
         :param style: CellStyle对象，为True时使用内置的默认样式
@@ -276,6 +324,24 @@ class DBSetter(BaseSetter):
         """
         ...
 
+    def dedupe(self,
+               key_cols: Union[str, int, list, tuple, None],
+               persist: bool = True,
+               bloom: bool = False,
+               capacity: int = 1000000,
+               error_rate: float = .001) -> DBSetter:
+        """设置按某些列去重，add_data()时丢弃这些列的值已出现过的新增行，指定行号的修改不去重。
+        首次向某表添加数据时读取文件中已有数据，persist为True时已出现的值保存在'文件路径.seen'或'.bloom'文件中，
+        下次直接读取该文件。list格式数据按表头确定列的位置，从第一列开始计算
+        :param key_cols: 用于判断是否重复的列名或列序号，可传入多个，为None时关闭去重
+        :param persist: 是否把已出现的值保存到文件
+        :param bloom: 是否使用Bloom过滤器，占用内存固定，但有很小概率把未出现的行误判为重复
+        :param capacity: Bloom过滤器预计容纳的数据量
+        :param error_rate: Bloom过滤器在达到capacity时的误判率
+        :return: 设置对象自己
+        """
+        ...
+
     def after(self, data: Any) -> DBSetter:
         """设置在数据后面补充的列
         :param data: 列表、元组或字符串，为字符串时则补充一列
@@ -300,6 +366,72 @@ class DBSetter(BaseSetter):
         """
         ...
 
+    def conflict(self,
+                 mode: Optional[str] = None,
+                 keys: Union[str, list, tuple, None] = None) -> DBSetter:
+        """设置写入数据与已有数据冲突时的处理方式，设置前先写入缓存数据。
+        设置keys时立即为默认数据表创建唯一索引，已有数据中有重复值时抛出ValueError，其它表在首次写入时创建
+        :param mode: None为普通插入，'ignore'保留已有行，'replace'删除已有行后插入，'update'用新数据更新已有行的对应列
+        :param keys: 判断冲突的唯一键列名，可传入多个，mode为'update'时必须设置，为None时按表中已有约束判断
+        :return: 设置对象自己
+        """
+        ...
+
+    def col_types(self, table: str, types: Optional[Dict[str, str]]) -> DBSetter:
+        """设置新建表或新增列时的列类型，已存在的列不修改
+        :param table: 数据表名称
+        :param types: {列名: 类型}，类型如'INTEGER'、'REAL'、'TEXT'、'BLOB'、'NUMERIC(10, 2)'，为None时清除该表的设置
+        :return: 设置对象自己
+        """
+        ...
+
+    def infer_types(self, on_off: bool = True) -> DBSetter:
+        """设置新建表或新增列时是否按第一批数据推断未指定类型的列的类型，
+        int为INTEGER，float为REAL，bytes为BLOB，其它为TEXT，全为None的列不指定类型
+        :param on_off: bool表示开关
+        :return: 设置对象自己
+        """
+        ...
+
+    def indexes(self,
+                table: str,
+                cols: Union[str, list, tuple, None],
+                deferred: bool = True) -> DBSetter:
+        """设置表的索引，设置保存在'文件路径.indexes'文件中，下次使用时沿用。
+        延迟索引在每次运行首次写入该表时，如果是新表、空表或写入行数多于已有行数则删除，批量写入时不维护，
+        record(final=True)、close()、更换文件、切换连接方式或对象销毁时重建；少量追加时保留并补建缺少的索引；
+        非延迟索引在写入数据后立即创建
+        :param table: 数据表名称
+        :param cols: 索引的列名，传入多个列名为一个多列索引，传入由列表组成的列表为多个索引，为None时清除该表的索引设置
+        :param deferred: 是否延迟创建
+        :return: 设置对象自己
+        """
+        ...
+
+    def keep_connection(self, on_off: bool = True) -> DBSetter:
+        """设置是否保持数据库连接，开启时写入和查询共用一个连接，不在每次操作后关闭，
+        未设置journal_mode和synchronous时设为WAL和NORMAL，使用完毕后调用close()关闭连接
+        :param on_off: bool表示开关
+        :return: 设置对象自己
+        """
+        ...
+
+    def pragmas(self,
+                journal_mode: Optional[str] = None,
+                synchronous: Union[str, int, None] = None,
+                cache_size: Optional[int] = None,
+                mmap_size: Optional[int] = None,
+                temp_store: Union[str, int, None] = None) -> DBSetter:
+        """设置每次连接数据库后执行的PRAGMA，为None的项不修改已设置值，已有连接时立即生效
+        :param journal_mode: 日志模式，'DELETE'、'TRUNCATE'、'PERSIST'、'MEMORY'、'WAL'或'OFF'
+        :param synchronous: 同步模式，'OFF'、'NORMAL'、'FULL'、'EXTRA'或0-3
+        :param cache_size: 页缓存大小，正数为页数，负数为KiB数
+        :param mmap_size: 内存映射读取的最大字节数，0为不使用
+        :param temp_store: 临时表存放位置，'DEFAULT'、'FILE'、'MEMORY'或0-2
+        :return: 设置对象自己
+        """
+        ...
+
     def table(self, name: Union[str, bool]) -> DBSetter:
         """设置默认表名
         :param name: 表名
@@ -308,6 +440,168 @@ class DBSetter(BaseSetter):
         ...
 
 
+class ShardedDBSetter(BaseSetter):
+    _recorder: ShardedDBRecorder = ...
+
+    def __init__(self, recorder: ShardedDBRecorder): ...
+
+    # -------------------上级开始-------------------
+    def cache_size(self, size: int) -> ShardedDBSetter:
+        """设置缓存大小
+        :param size: 缓存大小
+        :return: 设置对象自己
+        """
+        ...
+
+    def show_msg(self, on_off: bool) -> ShardedDBSetter:
+        """设置是否显示运行信息
+        :param on_off: bool表示开关
+        :return: 设置对象自己
+        """
+        ...
+
+    def auto_backup(self,
+                    interval: int = None,
+                    folder: Union[str, Path] = None,
+                    overwrite: bool = None) -> ShardedDBSetter:
+        """设置自动备份相关参数，每个分片分别备份
+        :param interval: 自动保存多少次时触发备份，为0表示不自动备份，为None时不修改已设置值（初始为0）
+        :param folder: 备份文件存放文件夹路径，为None时不修改已设置值（初始为 'backup'）
+        :param overwrite: 是否覆盖同名文件，为False时每个文件名都添加当前时间，为None时不修改已设置值（初始为False）
+        :return: 设置对象自己
+        """
+        ...
+
+    def after(self, data: Any) -> ShardedDBSetter:
+        """设置在数据后面补充的列
+        :param data: 列表、元组或字符串，为字符串时则补充一列
+        :return: 设置对象自己
+        """
+        ...
+
+    def before(self, data: Any) -> ShardedDBSetter:
+        """设置在数据前面补充的列
+        :param data: 列表、元组或字符串，为字符串时则补充一列
+        :return: 设置对象自己
+        """
+        ...
+
+    # -------------------上级结束-------------------
+
+    def path(self, path: Union[str, Path], shards: Optional[int] = None) -> ShardedDBSetter:
+        """设置文件路径，分片文件为'文件名_序号.后缀'，重新设置路径后各分片的设置需重新设置
+        :param path: 文件路径
+        :param shards: 分片数，为None时沿用原来的分片数（初始为4）
+        :return: 设置对象自己
+        """
+        ...
+
+    def key_col(self, col: Union[str, int, None]) -> ShardedDBSetter:
+        """设置用于分片的键列，键值相同的行总是写入同一分片，为None时轮流写入各分片
+        :param col: 列名或列序号，list格式数据用列名时按表中列的顺序确定位置
+        :return: 设置对象自己
+        """
+        ...
+
+    def table(self, name: str) -> ShardedDBSetter:
+        """设置默认表名
+        :param name: 表名
+        :return: 设置对象自己
+        """
+        ...
+
+    def auto_new_header(self, on_off: bool = True) -> ShardedDBSetter:
+        """数据中有不存在的列时是否自动新增列，应用到所有分片
+        :param on_off: bool表示开关
+        :return: 设置对象自己
+        """
+        ...
+
+    def dedupe(self,
+               key_cols: Union[str, int, list, tuple, None],
+               persist: bool = True,
+               bloom: bool = False,
+               capacity: int = 1000000,
+               error_rate: float = .001) -> ShardedDBSetter:
+        """设置按某些列去重，在数据分配到分片前判断，已有数据从所有分片读取
+        :param key_cols: 用于判断是否重复的列名或列序号，可传入多个，为None时关闭去重
+        :param persist: 是否把已出现的值保存到文件
+        :param bloom: 是否使用Bloom过滤器
+        :param capacity: Bloom过滤器预计容纳的数据量
+        :param error_rate: Bloom过滤器在达到capacity时的误判率
+        :return: 设置对象自己
+        """
+        ...
+
+    def keep_connection(self, on_off: bool = True) -> ShardedDBSetter:
+        """设置各分片是否保持数据库连接（初始为True）
+        :param on_off: bool表示开关
+        :return: 设置对象自己
+        """
+        ...
+
+    def pragmas(self,
+                journal_mode: Optional[str] = None,
+                synchronous: Union[str, int, None] = None,
+                cache_size: Optional[int] = None,
+                mmap_size: Optional[int] = None,
+                temp_store: Union[str, int, None] = None) -> ShardedDBSetter:
+        """设置各分片连接后执行的PRAGMA，参数与DBSetter.pragmas()相同
+        :param journal_mode: 日志模式
+        :param synchronous: 同步模式
+        :param cache_size: 页缓存大小
+        :param mmap_size: 内存映射读取的最大字节数
+        :param temp_store: 临时表存放位置
+        :return: 设置对象自己
+        """
+        ...
+
+    def conflict(self,
+                 mode: Optional[str] = None,
+                 keys: Union[str, list, tuple, None] = None) -> ShardedDBSetter:
+        """设置各分片写入冲突时的处理方式，keys与分片键列相同时唯一约束对所有分片有效
+        :param mode: None、'ignore'、'replace'或'update'
+        :param keys: 判断冲突的唯一键列名
+        :return: 设置对象自己
+        """
+        ...
+
+    def col_types(self, table: str, types: Optional[Dict[str, str]]) -> ShardedDBSetter:
+        """设置各分片新建表或新增列时的列类型
+        :param table: 数据表名称
+        :param types: {列名: 类型}，为None时清除该表的设置
+        :return: 设置对象自己
+        """
+        ...
+
+    def infer_types(self, on_off: bool = True) -> ShardedDBSetter:
+        """设置各分片新建表或新增列时是否按数据推断类型
+        :param on_off: bool表示开关
+        :return: 设置对象自己
+        """
+        ...
+
+    def indexes(self,
+                table: str,
+                cols: Union[str, list, tuple, None],
+                deferred: bool = True) -> ShardedDBSetter:
+        """设置各分片的索引，参数与DBSetter.indexes()相同
+        :param table: 数据表名称
+        :param cols: 索引的列名
+        :param deferred: 是否延迟创建
+        :return: 设置对象自己
+        """
+        ...
+
+    def _forward(self, name: str, *args: Any) -> ShardedDBSetter:
+        """先写入缓存数据，再对每个分片调用同名设置方法，并记录设置以便新建分片时再次调用
+        :param name: 设置方法名称
+        :param args: 参数
+        :return: 设置对象自己
+        """
+        ...
+
+
 def set_csv_header(recorder: Recorder,
                    header: Header,
                    row: int) -> None:
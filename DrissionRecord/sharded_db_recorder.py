@@ -0,0 +1,230 @@
+# -*- coding:utf-8 -*-
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from sqlite3 import connect
+from time import sleep
+from zlib import crc32
+
+from .base import BaseRecorder
+from .db_recorder import DBRecorder
+from .dedupe import key_positions
+from .setter import ShardedDBSetter
+from .tools import Header
+
+
+class ShardedDBRecorder(BaseRecorder):
+    _handle_data = DBRecorder._handle_data
+
+    def __init__(self, path=None, shards=4, key_col=None, cache_size=1000, table=None):
+        self._shards = []
+        self._executor = None
+        self._key_col = key_col
+        self._key_pos = {}  # {表名: 键列在list数据中的位置}
+        self._next = 0  # 没有设置键列时轮流分配
+        self._settings = []  # [(设置方法名, 参数), ...]，新建分片时按顺序重新设置
+        super().__init__(None, cache_size)
+        self._data = {}
+        self._type = 'db'
+        if path:
+            self.set.path(path, shards)
+        if table:
+            self.set.table(table)
+
+    @property
+    def set(self):
+        if self._setter is None:
+            self._setter = ShardedDBSetter(self)
+        return self._setter
+
+    @property
+    def shards(self):
+        return self._shards
+
+    @property
+    def shard_paths(self):
+        return [s.path for s in self._shards]
+
+    @property
+    def key_col(self):
+        return self._key_col
+
+    @property
+    def tables(self):
+        tables = {}
+        for s in self._shards:
+            if Path(s.path).exists():
+                tables.update(dict.fromkeys(s.tables))
+        return list(tables)
+
+    def add_data(self, data, table=None):
+        while self._pause_add:  # 等待其它线程写入结束
+            sleep(.02)
+
+        table = table or self.table
+        if not isinstance(table, str):
+            raise RuntimeError('未指定数据库表名。')
+
+        data = self._handle_data(data)
+        if self._deduper is not None:  # 在分配到分片前去重，已有数据从所有分片读取
+            if not self._deduper.is_warmed(table):
+                warm_sharded_seen(self, table)
+            kept = self._deduper.filter(table, data)
+            self._data_count -= len(data) - len(kept)
+            data = kept
+        if data:
+            self._data.setdefault(table, []).extend(data)
+
+        if 0 < self.cache_size <= self._data_count:
+            self.record()
+
+    def record(self, final=False):
+        path = super().record()
+        if final:
+            for s in self._shards:
+                s.build_indexes()
+        return path
+
+    def close(self):
+        self.record(final=True)
+        for s in self._shards:
+            s.close()
+        if self._deduper is not None:  # 关闭连接后分片文件有变化，重新记录文件状态
+            self._deduper.save(self._path, self.shard_paths)
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def delete(self):
+        for s in self._shards:
+            s.delete()
+        super().delete()
+
+    def backup(self, folder=None, name=None, overwrite=None):
+        name = name or Path(self._path).stem
+        paths = [s.backup(folder or self._backup_path, f'{name}_{i}', overwrite) for i, s in enumerate(self._shards)]
+        self._backup_times = 0
+        return paths
+
+    def connect(self):
+        conn = connect(':memory:')
+        for i, s in enumerate(self._shards):
+            if Path(s.path).exists():
+                conn.execute(f'ATTACH DATABASE ? AS `s{i}`', (s.path,))
+        schemas = [r[1] for r in conn.execute('PRAGMA database_list') if r[1] not in ('main', 'temp')]
+        tables = {}  # {表名: {分片: 列名列表}}
+        for schema in schemas:
+            for (table,) in conn.execute(f"SELECT name FROM `{schema}`.sqlite_master WHERE type='table'"):
+                cols = [i[1] for i in conn.execute(f'PRAGMA `{schema}`.table_info(`{table}`)')]
+                tables.setdefault(table, {})[schema] = cols
+
+        for table, shards in tables.items():  # 各分片中同名表合并为一个视图，缺少的列补NULL
+            all_cols = list(dict.fromkeys(c for cols in shards.values() for c in cols))
+            selects = []
+            for schema, cols in shards.items():
+                cols = set(cols)
+                fields = ','.join(f'`{c}`' if c in cols else f'NULL AS `{c}`' for c in all_cols)
+                selects.append(f'SELECT {fields} FROM `{schema}`.`{table}`')
+            conn.execute(f"CREATE TEMP VIEW `{table}` AS {' UNION ALL '.join(selects)}")
+        return conn
+
+    def run_sql(self, sql, single=True):
+        conn = self.connect()
+        try:
+            cur = conn.execute(sql)
+            return cur.fetchone() if single else cur.fetchall()
+        finally:
+            conn.close()
+
+    def _set_shards(self, num):
+        if not isinstance(num, int) or num < 1:
+            raise ValueError('shards值必须是大于0的int。')
+        for s in self._shards:
+            s.close()
+        p = Path(self._path)
+        self._shards = [DBRecorder(p.with_name(f'{p.stem}_{i}{p.suffix}'), cache_size=0, table=self._table)
+                        for i in range(num)]
+        for s in self._shards:
+            s.show_msg = False
+            s.set.keep_connection()
+            for name, args in self._settings:
+                getattr(s.set, name)(*args)
+        self._key_pos.clear()
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def _record(self):
+        shards = self._shards
+        num = len(shards)
+        routed = [{} for _ in shards]  # 先算出全部数据的分片，出错时不会有数据已移入分片
+        nxt = self._next
+        for table, data in self._data.items():  # 按键列的哈希值分配到各分片
+            pos = header = None
+            for d in data:
+                if self._key_col is None:
+                    i = nxt = (nxt + 1) % num
+                else:
+                    if isinstance(d, dict):
+                        key = d.get(self._key_col, None)
+                    else:
+                        if pos is None:
+                            pos, header = self._get_key_pos(table, data)
+                        key = d[pos] if pos < len(d) else None
+                        if header:  # 表还没创建，转为dict，分到没有收到dict的分片时也能建表
+                            if len(d) > len(header):
+                                raise RuntimeError('数据个数大于列数（注意before和after属性）。')
+                            d = dict(zip(header, d))
+                    i = crc32(str(key).encode('utf-8')) % num
+                routed[i].setdefault(table, []).append(d)
+
+        self._next = nxt
+        for s, tables in zip(shards, routed):
+            for table, data in tables.items():
+                s._data.setdefault(table, []).extend(data)
+                s._data_count += len(data)
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(num)
+        # 每个分片有自己的连接，在各自的线程中写入，sqlite执行时释放GIL
+        for f in [self._executor.submit(s.record) for s in shards if s._data_count]:
+            f.result()
+        if self._deduper is not None:
+            self._deduper.save(self._path, self.shard_paths)
+
+    def _get_key_pos(self, table, data=()):
+        pos = self._key_pos.get(table, None)
+        if pos is not None:
+            return pos, None
+        if isinstance(self._key_col, int):
+            pos = self._key_col - 1
+        else:
+            for s in self._shards:
+                if Path(s.path).exists():
+                    cols = [i[1] for i in s.run_sql(f'PRAGMA table_info(`{table}`)', single=False)]
+                    if cols:
+                        break
+            else:  # 表还没创建时，按本批数据中第一个dict的键确定，建表后再从分片读取
+                cols = next(([str(k) for k in d] for d in data if isinstance(d, dict)), [])
+                if self._key_col not in cols:
+                    raise RuntimeError(f'表{table}还没创建，且数据中没有含键列{self._key_col}的dict，list格式数据无法分片。')
+                return cols.index(self._key_col), cols
+            if self._key_col not in cols:
+                raise RuntimeError(f'表{table}中没有键列：{self._key_col}，list格式数据无法分片。')
+            pos = cols.index(self._key_col)
+        self._key_pos[table] = pos
+        return pos, None
+
+
+def warm_sharded_seen(recorder, table):
+    deduper = recorder._deduper
+    conn = recorder.connect()  # 各分片的同名表合并为一个视图
+    try:
+        cols = [i[1] for i in conn.execute(f'PRAGMA table_info(`{table}`)')]
+        positions = key_positions(deduper.key_cols, Header(cols) if cols else None)
+        rows = None
+        if (cols and positions is not None and max(positions) < len(cols)
+                and not deduper.saved(recorder.path, table, recorder.shard_paths)):
+            rows = conn.execute(f"SELECT `{'`,`'.join(cols[p] for p in positions)}` FROM `{table}`")
+        deduper.warm(recorder.path, table, rows, positions, recorder.shard_paths)
+    finally:
+        conn.close()
@@ -0,0 +1,147 @@
+# -*- coding:utf-8 -*-
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from sqlite3 import Connection
+from typing import Union, Any, Optional, List, Dict, Tuple, Iterable
+
+from .base import BaseRecorder
+from .db_recorder import DBRecorder
+from .setter import ShardedDBSetter
+
+
+class ShardedDBRecorder(BaseRecorder):
+    """按键列的哈希值把数据分配到多个sqlite文件，每个分片有自己的连接，写入时各分片在自己的线程中进行"""
+    _shards: List[DBRecorder] = ...
+    _executor: Optional[ThreadPoolExecutor] = ...
+    _key_col: Union[str, int, None] = ...
+    _key_pos: Dict[str, int] = ...
+    _next: int = ...
+    _settings: List[Tuple[str, tuple]] = ...
+    _setter: Optional[ShardedDBSetter] = ...
+    _data: dict = ...
+    data: dict = ...
+
+    def __init__(self,
+                 path: Union[str, Path] = None,
+                 shards: int = 4,
+                 key_col: Union[str, int, None] = None,
+                 cache_size: int = 1000,
+                 table: str = None):
+        """
+        :param path: 文件路径，分片文件为'文件名_序号.后缀'
+        :param shards: 分片数
+        :param key_col: 用于分片的键列，键值相同的行总是写入同一分片，为None时轮流写入各分片
+        :param cache_size: 每接收多少条记录写入文件，0为不自动写入
+        :param table: 默认表名
+        """
+        ...
+
+    @property
+    def set(self) -> ShardedDBSetter:
+        """返回用于设置属性的对象"""
+        ...
+
+    @property
+    def shards(self) -> List[DBRecorder]:
+        """返回各分片的DBRecorder对象"""
+        ...
+
+    @property
+    def shard_paths(self) -> List[str]:
+        """返回各分片的文件路径"""
+        ...
+
+    @property
+    def key_col(self) -> Union[str, int, None]:
+        """返回用于分片的键列"""
+        ...
+
+    @property
+    def tables(self) -> list:
+        """返回所有分片中的表名"""
+        ...
+
+    def add_data(self, data: Any, table: str = None) -> None:
+        """添加数据，格式与DBRecorder.add_data()相同，写入时按键列分配到各分片
+        :param data: 可以是一维或二维数据
+        :param table: 数据要插入的表名称
+        :return: None
+        """
+        ...
+
+    def record(self, final: bool = False) -> str:
+        """把数据分配到各分片并同时写入
+        :param final: 是否批量写入已结束，为True时各分片建立所有设置的索引
+        :return: 文件路径
+        """
+        ...
+
+    def close(self) -> None:
+        """写入缓存数据、建立索引并关闭各分片的连接和写入线程
+        :return: None
+        """
+        ...
+
+    def delete(self) -> None:
+        """删除所有分片文件和去重记录"""
+        ...
+
+    def backup(self,
+               folder: Union[str, Path, None] = None,
+               name: str = None,
+               overwrite: bool = None) -> List[str]:
+        """用sqlite在线备份分别备份各分片，文件名为'名称_序号.后缀'
+        :param folder: 文件夹路径，为None使用内置路径（初始 'backup'）
+        :param name: 保存的文件名，不含后缀，为None使用文件名
+        :param overwrite: 是否覆盖同名文件，为None使用内置设置
+        :return: 各分片备份文件路径组成的列表
+        """
+        ...
+
+    def connect(self) -> Connection:
+        """返回附加了所有分片的内存数据库连接，各分片的同名表合并为同名临时视图，缺少的列为NULL，可直接查询。
+        sqlite默认最多附加10个数据库，使用完毕后须关闭连接
+        :return: Connection对象
+        """
+        ...
+
+    def run_sql(self, sql: str, single: bool = True) -> Union[None, list, tuple]:
+        """在合并了所有分片的连接上执行只读sql语句并返回结果
+        :param sql: sql语句
+        :param single: 是否只获取一个结果
+        :return: 查找到的结果，没有结果时返回None
+        """
+        ...
+
+    def _set_shards(self, num: int) -> None:
+        """按当前路径创建分片的DBRecorder对象，关闭原有分片，并按顺序应用之前的设置
+        :param num: 分片数
+        :return: None
+        """
+        ...
+
+    def _record(self) -> None:
+        """先算出全部缓存数据的分片再一次移入各分片，并在线程池中同时写入"""
+        ...
+
+    def _get_key_pos(self, table: str, data: Iterable = ()) -> Tuple[int, Optional[List[str]]]:
+        """获取键列在list格式数据中的位置，键列为列名时按分片中表的列顺序确定，
+        表还没创建时按本批数据中第一个dict的键确定
+        :param table: 数据表名称
+        :param data: 本批要写入该表的数据
+        :return: (从0开始的位置, 表还没创建时用于把list转为dict的列名，否则为None)
+        """
+        ...
+
+    def _handle_data(self, data: Any) -> list:
+        """接收数据后的格式化，与DBRecorder相同"""
+        ...
+
+
+def warm_sharded_seen(recorder: ShardedDBRecorder, table: str) -> None:
+    """从所有分片读取已有数据，初始化去重器中某个表的已出现值
+    :param recorder: ShardedDBRecorder对象
+    :param table: 数据表名称
+    :return: None
+    """
+    ...
@@ -0,0 +1,82 @@
+# -*- coding:utf-8 -*-
+from hashlib import blake2b
+from json import load, dumps
+from os import replace
+from pathlib import Path
+
+TAIL_SIZE = 64  # 校验游标位置时比对的字节数
+
+
+def sidecar_path(path, suffix):
+    return Path(f'{path}.{suffix}')
+
+
+def load_sidecar(path, suffix):
+    try:
+        with open(sidecar_path(path, suffix), 'r', encoding='utf-8') as f:
+            data = load(f)
+    except (OSError, ValueError):  # 文件不存在或已损坏
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def save_sidecar(path, suffix, data):
+    p = sidecar_path(path, suffix)
+    tmp = p.with_name(f'{p.name}.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(dumps(data, ensure_ascii=False))  # dumps使用C实现，比dump快得多
+    replace(tmp, p)
+
+
+def remove_sidecar(path, suffix):
+    if '*' in suffix:
+        path = Path(path)
+        for p in path.parent.glob(f'{path.name}.{suffix}'):
+            p.unlink()
+        return
+    p = sidecar_path(path, suffix)
+    if p.exists():
+        p.unlink()
+
+
+def file_state(path):
+    try:
+        st = Path(path).stat()
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+def tail_hash(path, offset, size=TAIL_SIZE):
+    begin = max(0, offset - size)
+    with open(path, 'rb') as f:
+        f.seek(begin)
+        data = f.read(offset - begin)
+    if len(data) != offset - begin:
+        return None
+    return blake2b(data, digest_size=8).hexdigest()
+
+
+class OffsetLines(object):
+    __slots__ = ('_file', '_encoding', 'pos')
+
+    def __init__(self, file, encoding, pos=0):
+        self._file = file
+        self._encoding = encoding
+        self.pos = pos
+        file.seek(pos)
+
+    def readline(self):
+        line = self._file.readline()
+        self.pos += len(line)
+        return line.decode(self._encoding)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        line = self._file.readline()
+        if not line:
+            raise StopIteration
+        self.pos += len(line)
+        return line.decode(self._encoding)
@@ -0,0 +1,84 @@
+# -*- coding:utf-8 -*-
+from io import BufferedReader
+from pathlib import Path
+from typing import Union, Optional, Tuple
+
+TAIL_SIZE: int = ...
+
+
+def sidecar_path(path: Union[str, Path], suffix: str) -> Path:
+    """获取数据文件附属文件的路径
+    :param path: 数据文件路径
+    :param suffix: 附属文件后缀
+    :return: 附属文件路径
+    """
+    ...
+
+
+def load_sidecar(path: Union[str, Path], suffix: str) -> dict:
+    """读取附属文件，文件不存在或已损坏时返回空dict
+    :param path: 数据文件路径
+    :param suffix: 附属文件后缀
+    :return: 附属文件内容
+    """
+    ...
+
+
+def save_sidecar(path: Union[str, Path], suffix: str, data: dict) -> None:
+    """先写入临时文件再替换，保存附属文件
+    :param path: 数据文件路径
+    :param suffix: 附属文件后缀
+    :param data: 要保存的内容
+    :return: None
+    """
+    ...
+
+
+def remove_sidecar(path: Union[str, Path], suffix: str) -> None:
+    """删除附属文件
+    :param path: 数据文件路径
+    :param suffix: 附属文件后缀，包含'*'时删除所有匹配的文件
+    :return: None
+    """
+    ...
+
+
+def file_state(path: Union[str, Path]) -> Optional[Tuple[int, int]]:
+    """获取文件大小和修改时间，用于判断文件是否被修改
+    :param path: 文件路径
+    :return: (字节数, 纳秒修改时间)，文件不存在时返回None
+    """
+    ...
+
+
+def tail_hash(path: Union[str, Path], offset: int, size: int = TAIL_SIZE) -> Optional[str]:
+    """获取文件指定位置前若干字节的哈希值，用于校验该位置前的内容是否被修改
+    :param path: 文件路径
+    :param offset: 字节位置
+    :param size: 比对的字节数
+    :return: 哈希值，文件长度不足时返回None
+    """
+    ...
+
+
+class OffsetLines(object):
+    """逐行读取二进制文件并解码，同时记录读取到的字节位置"""
+    _file: BufferedReader = ...
+    _encoding: str = ...
+    pos: int = ...
+
+    def __init__(self, file: BufferedReader, encoding: str, pos: int = 0):
+        """
+        :param file: 以'rb'模式打开的文件对象
+        :param encoding: 文件编码
+        :param pos: 开始读取的字节位置
+        """
+        ...
+
+    def readline(self) -> str:
+        """读取一行，到达末尾时返回''"""
+        ...
+
+    def __iter__(self) -> OffsetLines: ...
+
+    def __next__(self) -> str: ...
@@ -1,8 +1,12 @@
 # -*- coding:utf-8 -*-
-from collections.abc import Iterable
+from array import array
+from collections.abc import Iterable, Mapping, MutableSequence
 from csv import reader as csv_reader, writer as csv_writer
+from datetime import datetime, date
 from pathlib import Path
 from re import search, sub, match
+from sys import modules, intern
+from threading import Lock
 
 from openpyxl.cell import Cell, ReadOnlyCell
 from openpyxl.reader.excel import load_workbook
@@ -10,6 +14,9 @@ from openpyxl.workbook import Workbook
 
 from .cell_style import CellStyle, CellStyleCopier, NoneStyle
 
+_XLSX_ILLEGAL = r'[\000-\010]|[\013-\014]|[\016-\037]'  # xlsx不允许写入的控制字符
+_INDEX_CACHE = 256  # Header中每种索引缓存的最大数量
+
 
 def line2ws(ws, header, row, col, data, rewrite_method, rewrite):
     if isinstance(data, dict):
@@ -52,6 +59,20 @@ def data2ws(recorder, ws, data, coord, header, rewrite, rewrite_method, new_row)
     return rewrite
 
 
+def frame2ws(recorder, ws, data, coord, header, rewrite, rewrite_method, new_row):
+    rows, rewrite = header.make_frame_rows(data['cols'], data['data'],
+                                           rewrite_method == 'make_num_dict_rewrite', rewrite)
+    method = recorder._methods['data']
+    if method is not data2ws:  # 需要处理样式时交给对应方法
+        return method(recorder, ws, {'type': 'data', 'data': rows, 'coord': data['coord']},
+                      (coord[0], 1), header, rewrite, rewrite_method, new_row)
+
+    for r, line in enumerate(rows, coord[0]):  # 数据已按列清洗过，直接写入
+        for c, val in enumerate(line, 1):
+            ws.cell(r, c, value=val)
+    return rewrite
+
+
 def data2ws_follow(recorder, ws, data, coord, header, rewrite, rewrite_method, new_row):
     row, col = coord
     if row > 1:
@@ -320,12 +341,57 @@ def is_single_data(data):
 
 
 def is_1D_data(data):
-    if isinstance(data, dict):
+    if isinstance(data, Mapping):
         return True
     for i in data:
         return is_single_data(i)
 
 
+def is_frame(data):
+    pd = modules.get('pandas')  # 未导入pandas时数据不可能是DataFrame，无需导入
+    return pd is not None and isinstance(data, pd.DataFrame)
+
+
+def is_array(data):
+    np = modules.get('numpy')
+    return np is not None and isinstance(data, np.ndarray)
+
+
+def frame2rows(frame, file_type):
+    from pandas.api.types import infer_dtype
+    process = {'xlsx': process_content_xlsx, 'db': process_content_db}.get(file_type, process_content_json)
+    columns = {}
+    for num in range(frame.shape[1]):  # 按列处理，不逐个单元格循环
+        s = frame.iloc[:, num]
+        kind = s.dtype.kind
+        if kind in 'mM':
+            s = s.astype(str).where(s.notna(), None)
+        elif kind == 'f' and s.hasnans:  # 有空值的整数列被pandas转成了float，还原为int，与非DataFrame数据写入结果一致
+            nums = s.dropna()
+            if len(nums) and (nums == nums.round()).all() and nums.abs().max() < 2 ** 53:
+                s = s.astype('Int64')
+        elif kind not in 'biuf':
+            inferred = infer_dtype(s, skipna=True)
+            if inferred == 'string':
+                if file_type == 'xlsx':
+                    s = s.str.replace(_XLSX_ILLEGAL, '', regex=True)
+            elif inferred not in ('empty', 'integer', 'floating', 'mixed-integer-float', 'boolean'):
+                s = s.map(process, na_action='ignore')
+        columns[num] = s
+
+    values = frame._constructor(columns).astype(object)
+    values = values.where(values.notna(), None)
+    return [str(i) for i in frame.columns], values.values.tolist()
+
+
+def index_key(value):
+    if value is None:
+        return ''
+    elif isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
 def remove_end_Nones(in_list):
     h = []
     flag = True
@@ -359,7 +425,7 @@ def process_content_xlsx(content):
         data = str(content)
 
     if isinstance(data, str):
-        data = sub(r'[\000-\010]|[\013-\014]|[\016-\037]', '', data)
+        data = sub(_XLSX_ILLEGAL, '', data)
 
     return data
 
@@ -373,6 +439,29 @@ def process_content_json(content):
         return str(content)
 
 
+def process_content_db(content):
+    if isinstance(content, (str, int, float, bytes, type(None))):
+        return content
+    elif isinstance(content, (bytearray, memoryview)):  # 以BLOB保存
+        return bytes(content)
+    elif isinstance(content, (datetime, date)):  # 以sqlite日期函数能识别的格式保存
+        return content.isoformat(' ') if isinstance(content, datetime) else content.isoformat()
+    elif isinstance(content, (Cell, ReadOnlyCell)):
+        return process_content_db(content.value)
+    else:
+        return str(content)
+
+
+def db_type(value):
+    if isinstance(value, int):  # 包括bool
+        return 'INTEGER'
+    elif isinstance(value, float):
+        return 'REAL'
+    elif isinstance(value, (bytes, bytearray, memoryview)):
+        return 'BLOB'
+    return 'TEXT'
+
+
 def process_content_str(content):
     if isinstance(content, str):
         return content
@@ -432,8 +521,12 @@ class Header(BaseHeader):
         else:
             self._NUM_KEY = {}
             self._KEY_NUM = {}
+            self._indexes = {}
+            self._keys_indexes = {}
             return
         self._KEY_NUM = {c: h for h, c in self._NUM_KEY.items()} if self._NUM_KEY else {}
+        self._indexes = {}  # RowData共用的{列号: 位置}索引
+        self._keys_indexes = {}  # dict格式行数据共用的{键: 位置}索引，与列号索引分开缓存
 
     @property
     def key_num(self):
@@ -450,8 +543,24 @@ class Header(BaseHeader):
         return self.num_key.items()
 
     def make_row_data(self, row, row_values, None_val=None):
-        data = {self.get_key(col): val for col, val in row_values.items()}
-        return RowData(row, self, None_val, data)
+        return RowData(row, self, None_val, self.get_index(tuple(row_values)), tuple(row_values.values()))
+
+    def get_index(self, cols):
+        index = self._indexes.get(cols, None)
+        if index is None:
+            if len(self._indexes) >= _INDEX_CACHE:  # 避免列数各不相同时无限增长
+                self._indexes.clear()
+            nums = range(1, cols + 1) if isinstance(cols, int) else cols  # int表示整行的列数
+            index = self._indexes[cols] = {self.get_key(c): i for i, c in enumerate(nums)}
+        return index
+
+    def get_keys_index(self, keys):
+        index = self._keys_indexes.get(keys, None)
+        if index is None:
+            if len(self._keys_indexes) >= _INDEX_CACHE:  # jsonl中可选字段组合很多时避免无限增长
+                self._keys_indexes.clear()
+            index = self._keys_indexes[keys] = {k: i for i, k in enumerate(keys)}
+        return index
 
     def make_insert_list(self, data, file_type, rewrite):  # 修改时记得ZeroHeader对应方法
         if isinstance(data, dict):
@@ -493,6 +602,31 @@ class Header(BaseHeader):
                 line_data[col + k - 1] = self._CONTENT_FUNCS[file_type](j)
         return line_data, rewrite
 
+    def make_frame_rows(self, cols, rows, new_header, rewrite):  # 修改时记得ZeroHeader对应方法
+        nums = []
+        for c in cols:
+            num = self.key_num.get(c, None)
+            if num is None and new_header:
+                num = len(self.num_key) + 1
+                self.key_num[c] = num
+                self.num_key[num] = c
+                self._indexes.clear()
+                rewrite = True
+            nums.append(num)
+
+        if nums == list(range(1, len(nums) + 1)):  # 列顺序与表头一致，无需重排
+            return rows, rewrite
+
+        pairs = [(i, n - 1) for i, n in enumerate(nums) if n]
+        width = max([n for n in nums if n], default=0)
+        res = []
+        for r in rows:
+            line = [None] * width
+            for i, n in pairs:
+                line[n] = r[i]
+            res.append(line)
+        return res, rewrite
+
     def make_num_dict(self, *keys):
         data = keys[0]
         file_type = keys[1]
@@ -512,6 +646,7 @@ class Header(BaseHeader):
                 header_len += 1
                 self.key_num[k] = header_len
                 self.num_key[header_len] = k
+                self._indexes.clear()
                 rewrite = True
             num = self.get_num(k)
             if num:
@@ -566,6 +701,8 @@ class Header(BaseHeader):
 
 class ZeroHeader(Header):
     _OBJ = None
+    _indexes = {}
+    _keys_indexes = {}
 
     def __new__(cls):
         super().__new__(cls)
@@ -595,6 +732,9 @@ class ZeroHeader(Header):
     def make_insert_list_rewrite(self, data, file_type, rewrite):
         return self.make_insert_list(data, file_type, rewrite)
 
+    def make_frame_rows(self, cols, rows, new_header, rewrite):
+        return rows, False
+
     def make_num_dict_rewrite(self, *keys):
         data, file_type, rewrite = keys
         return self.make_num_dict(data, file_type)
@@ -620,18 +760,52 @@ class ZeroHeader(Header):
         return 0
 
 
-class RowData(dict):
-    def __init__(self, row, header, None_val, seq):
+class RowData(Mapping):
+    __slots__ = ('header', 'row', '_None_val', '_index', '_values')
+
+    def __init__(self, row, header, None_val, index, values):
         self.header = header
         self.row = row
         self._None_val = None_val
-        super().__init__(seq)
+        self._index = index  # 同一次读取的行共用的{键: 位置}
+        self._values = values
+
+    @staticmethod
+    def from_dict(row, header, None_val, data):
+        return RowData(row, header, None_val, header.get_keys_index(tuple(data)), tuple(data.values()))
 
     def __getitem__(self, item):
-        ite = self.header[item] if isinstance(item, int) else item
+        if isinstance(item, int):
+            i = self._index.get(item, None)  # 表头中没有名称的列
+            if i is not None:
+                return self._values[i]
+            ite = self.header[item]
+        else:
+            ite = item
         if ite is None:
             raise RuntimeError(f'header中无{item}项。\nheader：{self.header.values()}')
-        return self.get(ite, self._None_val)
+        i = self._index.get(ite, None)
+        return self._None_val if i is None else self._values[i]
+
+    def get(self, key, default=None):
+        i = self._index.get(key, None)
+        return default if i is None else self._values[i]
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __len__(self):
+        return len(self._index)
+
+    def __repr__(self):
+        return repr(self.to_dict())
+
+    def to_dict(self):
+        values = self._values
+        return {k: values[i] for k, i in self._index.items()}
 
     def col(self, key_or_num, as_num=True):
         return self.header.get_num(key_or_num) if as_num else self.header.get_col(key_or_num)
@@ -640,6 +814,193 @@ class RowData(dict):
         return self.row, self.col(key_or_num, col_num)
 
 
+class ColumnBuffer(MutableSequence):
+    """按列存储结构相同的行数据，int和float列使用array保存，dict的键只保存一份"""
+    __slots__ = ('_keys', '_cols', '_len', '_rows')
+
+    def __init__(self, first):
+        if isinstance(first, dict):
+            self._keys = tuple(intern(k) if isinstance(k, str) else k for k in first)
+            first = first.values()
+        else:
+            self._keys = None
+        self._cols = [_new_column(v) for v in first]
+        self._len = 1
+        self._rows = None
+
+    @staticmethod
+    def from_rows(rows):
+        if not rows:
+            return None
+        first = rows[0]
+        if not isinstance(first, (dict, list, tuple)) or not first:
+            return None
+        buffer = ColumnBuffer(first)
+        return buffer if len(rows) == 1 or buffer.extend(rows[1:]) else None
+
+    def fits(self, row):
+        if self._rows is not None:
+            return True
+        if self._keys is None:
+            return isinstance(row, (list, tuple)) and len(row) == len(self._cols)
+        return isinstance(row, dict) and len(row) == len(self._keys) and tuple(row) == self._keys
+
+    def extend(self, rows):
+        if self._rows is not None:
+            with _BUFFER_LOCK:
+                self._rows.extend(rows)
+            return True
+        fits = self.fits
+        for r in rows:
+            if not fits(r):
+                return False
+        with _BUFFER_LOCK:  # 多线程同时添加时保证各列长度一致
+            for r in rows:
+                self._append(r.values() if self._keys else r)
+        return True
+
+    def append(self, row):
+        if not self.extend((row,)):  # 结构不一致时退回到按行存储
+            with _BUFFER_LOCK:
+                self._to_rows()
+                self._rows.append(row)
+
+    def insert(self, index, row):
+        with _BUFFER_LOCK:
+            if not self.fits(row):
+                self._to_rows()
+            if self._rows is not None:
+                self._rows.insert(index, row)
+                return
+            values = row.values() if self._keys else row
+            for i, v in enumerate(values):
+                self._column(i, v).insert(index, v)
+            self._len += 1
+
+    def _append(self, values):
+        cols = self._cols
+        for i, v in enumerate(values):
+            col = cols[i]
+            if col.__class__ is list:
+                col.append(v)
+            elif v.__class__ is _COLUMN_TYPE[col.typecode] and (col.typecode == 'd' or _INT_MIN <= v <= _INT_MAX):
+                col.append(v)
+            else:  # 类型不一致，退回到list
+                col = list(col)
+                col.append(v)
+                cols[i] = col
+        self._len += 1
+
+    def _column(self, i, value):
+        col = self._cols[i]
+        if col.__class__ is not list and not (value.__class__ is _COLUMN_TYPE[col.typecode]
+                                              and (col.typecode == 'd' or _INT_MIN <= value <= _INT_MAX)):
+            col = self._cols[i] = list(col)  # 类型不一致，退回到list
+        return col
+
+    def _to_rows(self):
+        if self._rows is None:
+            self._rows = list(self)
+            self._cols = []
+
+    def _index(self, item):
+        if item < 0:
+            item += self._len
+        if not 0 <= item < self._len:
+            raise IndexError('ColumnBuffer下标超出范围。')
+        return item
+
+    def __len__(self):
+        return self._len if self._rows is None else len(self._rows)
+
+    def __iter__(self):
+        if self._rows is not None:
+            yield from self._rows
+            return
+        keys = self._keys
+        if keys is None:
+            for values in zip(*self._cols):
+                yield list(values)
+        else:
+            for values in zip(*self._cols):
+                yield dict(zip(keys, values))
+
+    def __getitem__(self, item):
+        if self._rows is not None:
+            return self._rows[item]
+        if isinstance(item, slice):  # 切片与list一样返回新的list
+            return [self[i] for i in range(*item.indices(self._len))]
+        item = self._index(item)
+        values = [c[item] for c in self._cols]
+        return values if self._keys is None else dict(zip(self._keys, values))
+
+    def __setitem__(self, item, value):
+        with _BUFFER_LOCK:
+            if isinstance(item, slice) or not self.fits(value):
+                self._to_rows()
+            if self._rows is not None:
+                self._rows[item] = value
+                return
+            item = self._index(item)
+            values = value.values() if self._keys else value
+            for i, v in enumerate(values):
+                self._column(i, v)[item] = v
+
+    def __delitem__(self, item):
+        with _BUFFER_LOCK:
+            if self._rows is not None:
+                del self._rows[item]
+                return
+            if not isinstance(item, slice):
+                item = self._index(item)
+            for c in self._cols:
+                del c[item]
+            self._len = len(self._cols[0])
+
+    def __eq__(self, other):
+        if isinstance(other, (list, tuple, ColumnBuffer)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+_BUFFER_LOCK = Lock()
+_PACK_MIN = 64  # 结构不一致时，按列存储的行数达到此值才另起数据块
+_INT_MIN = -2 ** 63
+_INT_MAX = 2 ** 63 - 1
+_COLUMN_TYPE = {'q': int, 'd': float}
+
+
+def _new_column(value):
+    if value.__class__ is float:
+        return array('d', (value,))
+    elif value.__class__ is int and _INT_MIN <= value <= _INT_MAX:
+        return array('q', (value,))
+    return [value]
+
+
+def pack_rows(data):
+    if data['type'] == 'data':
+        buffer = ColumnBuffer.from_rows(data['data'])
+        if buffer is not None:
+            data['data'] = buffer
+    return data
+
+
+def extend_rows(rows, new_rows):
+    if isinstance(rows, ColumnBuffer):
+        if rows.extend(new_rows):
+            return True
+        if len(rows) >= _PACK_MIN:  # 已按列存储较多行时另起数据块
+            return False
+        with _BUFFER_LOCK:  # 行数少时退回按行存储，避免结构交替时产生大量数据块
+            rows._to_rows()
+    rows.extend(new_rows)
+    return True
+
+
 class RowText(str):
     def __init__(self, value):
         super().__init__()
@@ -789,7 +1150,7 @@ def ok_list_str(data_list):
 def ok_list_db(data_list):
     if isinstance(data_list, (dict, Header)):
         data_list = data_list.values()
-    return [process_content_json(i) for i in data_list]
+    return [process_content_db(i) for i in data_list]
 
 
 def get_real_row(row, max_row):
@@ -811,11 +1172,15 @@ def get_ws_real_coord(coord, ws, header):
 
 
 def make_final_data_simplify(recorder, data):
-    return data if isinstance(data, (dict, list, tuple)) else list(data)
+    if isinstance(data, (dict, list, tuple)):
+        return data
+    return dict(data) if isinstance(data, Mapping) else list(data)
 
 
 def make_final_data(recorder, data):
-    if isinstance(data, dict):
+    if isinstance(data, Mapping):
+        if not isinstance(data, dict):  # RowData等只读映射转为dict后再写入
+            data = dict(data)
         if isinstance(recorder.before, dict):
             data = {**recorder.before, **data}
         if isinstance(recorder.after, dict):
@@ -1,7 +1,8 @@
 # -*- coding:utf-8 -*-
+from array import array
 from io import TextIOWrapper
 from pathlib import Path
-from typing import Union, Tuple, Any, Optional, List, Dict, Iterable, Literal
+from typing import Union, Tuple, Any, Optional, List, Dict, Iterable, Literal, Mapping, MutableSequence
 
 from openpyxl.workbook import Workbook
 from openpyxl.worksheet.worksheet import Worksheet
@@ -62,6 +63,22 @@ def data2ws(recorder: Recorder, ws: Worksheet, data: dict, coord: Tuple[int, int
     ...
 
 
+def frame2ws(recorder: Recorder, ws: Worksheet, data: dict, coord: Tuple[int, int],
+             header: Header, rewrite: bool, rewrite_method: REWRITE_METHOD, new_row: bool) -> bool:
+    """DataFrame数据块写入数据表，数据已按列清洗，无样式设置时不再逐个单元格处理
+    :param recorder: Recorder对象
+    :param ws: Worksheet对象
+    :param data: 数据块 {'type': 'frame', 'data': [[1, 2]], 'cols': ['a', 'b'], 'coord': (0, 1)}
+    :param coord: 要写入的坐标
+    :param header: Header对象
+    :param rewrite: 是否重写表头
+    :param rewrite_method: 'make_num_dict_rewrite'或'make_num_dict'
+    :param new_row: 是否新行
+    :return: 是否重写表头
+    """
+    ...
+
+
 def data2ws_follow(recorder: Recorder, ws: Worksheet, data: dict, coord: Tuple[int, int],
                    header: Header, rewrite: bool, rewrite_method: REWRITE_METHOD) -> None:
     """数据写入数据表，跟随上一行样式
@@ -128,6 +145,14 @@ def height2ws(**kwargs) -> None:
     ...
 
 
+def index_key(value: Any) -> str:
+    """把值转为索引中使用的str，None为''，整数值的float去掉小数部分
+    :param value: 值
+    :return: 索引键
+    """
+    ...
+
+
 def remove_end_Nones(in_list: list) -> list:
     """去除列表后面所有None
     :param in_list: 要处理的list
@@ -155,6 +180,8 @@ class BaseHeader(object):
 
 
 class Header(BaseHeader):
+    _indexes: dict = ...
+    _keys_indexes: dict = ...
 
     def __init__(self, header: Iterable = None): ...
 
@@ -179,6 +206,31 @@ class Header(BaseHeader):
         """
         ...
 
+    def make_frame_rows(self, cols: List[str], rows: List[list], new_header: bool,
+                        rewrite: bool) -> Tuple[List[list], bool]:
+        """把DataFrame数据块的行按表头位置重排，列顺序与表头一致时直接返回
+        :param cols: 数据块的表头
+        :param rows: 行数据列表
+        :param new_header: 是否把表头中没有的列加到表头
+        :param rewrite: 是否重写表头
+        :return: (按表头排列的行数据列表, 是否重写表头)
+        """
+        ...
+
+    def get_index(self, cols: Union[int, Tuple[int, ...]]) -> Dict[Union[str, int], int]:
+        """获取RowData共用的{键: 位置}索引，结果会被缓存，缓存数量有上限
+        :param cols: int表示整行的列数，tuple表示列序号
+        :return: 索引dict
+        """
+        ...
+
+    def get_keys_index(self, keys: tuple) -> Dict[Union[str, int], int]:
+        """获取dict格式行数据共用的{键: 位置}索引，结果会被缓存，缓存数量有上限
+        :param keys: dict的所有键
+        :return: 索引dict
+        """
+        ...
+
     def make_insert_list(self, data, file_type: Optional[str], rewrite: bool) -> Tuple[list, bool]:
         """生成写入文件list格式的新行数据
         :param data: 待处理行数据
@@ -279,12 +331,46 @@ class ZeroHeader(Header):
         ...
 
 
-class RowData(dict):
+class RowData(Mapping):
+    """一行数据的只读视图，值保存在list或tuple中，同一次读取的行共用键索引。
+    不是dict的子类，isinstance(row, dict)为False，json.dumps()等需要dict的地方用to_dict()或dict(row)转换"""
     header: Header = ...
     row: int = ...
     _None_val: Optional[''] = ...
+    _index: Dict[Union[str, int], int] = ...
+    _values: Union[list, tuple] = ...
+
+    def __init__(self, row: int, header: Header, None_val: Optional[''],
+                 index: Dict[Union[str, int], int], values: Union[list, tuple]):
+        """
+        :param row: 行号
+        :param header: Header对象
+        :param None_val: 空值是None还是''
+        :param index: {键: 值在values中的位置}
+        :param values: 行中各个值
+        """
+        ...
+
+    @staticmethod
+    def from_dict(row: int, header: Header, None_val: Optional[''], data: dict) -> RowData:
+        """用dict数据生成RowData对象，键相同的行共用索引
+        :param row: 行号
+        :param header: Header对象
+        :param None_val: 空值是None还是''
+        :param data: 行数据
+        :return: RowData对象
+        """
+        ...
 
-    def __init__(self, row: int, header: Header, None_val: Optional[''], seq: dict): ...
+    def __getitem__(self, item: Union[int, str]) -> Any: ...
+
+    def get(self, key: Union[int, str], default: Any = None) -> Any: ...
+
+    def to_dict(self) -> dict:
+        """返回由这行数据生成的dict
+        :return: {键: 值}
+        """
+        ...
 
     def col(self, key_or_num: Union[int, str], as_num: bool = True) -> Union[int, str]:
         """返回数据中指定列的列号或列序号
@@ -303,6 +389,118 @@ class RowData(dict):
         ...
 
 
+class ColumnBuffer(MutableSequence):
+    """按列存储结构相同的行数据，用于降低缓存占用的内存，Recorder.data中数据块的'data'可能是此对象，
+    可像list一样读取、切片、添加、插入、修改和删除行，行结构与已存储的不一致时自动退回到按行存储"""
+    _keys: Optional[Tuple[Any, ...]] = ...
+    _cols: List[Union[list, array]] = ...
+    _len: int = ...
+    _rows: Optional[list] = ...
+
+    def __init__(self, first: Union[dict, list, tuple]) -> None:
+        """
+        :param first: 第一行数据，dict时记录键，list或tuple时记录列数
+        """
+        ...
+
+    @staticmethod
+    def from_rows(rows: list) -> Optional[ColumnBuffer]:
+        """用多行数据创建对象，数据结构不一致时返回None
+        :param rows: 行数据列表
+        :return: ColumnBuffer对象或None
+        """
+        ...
+
+    def fits(self, row: Any) -> bool:
+        """判断一行数据结构是否与已存储的一致，已按行存储时总是返回True
+        :param row: 行数据
+        :return: 是否一致
+        """
+        ...
+
+    def extend(self, rows: Iterable) -> bool:
+        """添加多行数据，只要有一行结构不一致就全部不添加
+        :param rows: 行数据
+        :return: 是否已添加
+        """
+        ...
+
+    def append(self, row: Any) -> None:
+        """添加一行数据，结构不一致时先退回到按行存储
+        :param row: 行数据
+        :return: None
+        """
+        ...
+
+    def insert(self, index: int, row: Any) -> None:
+        """在指定位置插入一行数据，结构不一致时先退回到按行存储
+        :param index: 插入位置
+        :param row: 行数据
+        :return: None
+        """
+        ...
+
+    def _append(self, values: Iterable) -> None:
+        """按列添加一行数据，类型与列不一致时把该列转为list
+        :param values: 行中各个值
+        :return: None
+        """
+        ...
+
+    def _column(self, i: int, value: Any) -> Union[list, array]:
+        """返回用于保存值的列，类型与列不一致时把该列转为list
+        :param i: 列序号
+        :param value: 要保存的值
+        :return: 列容器
+        """
+        ...
+
+    def _to_rows(self) -> None:
+        """把已存储的数据转为按行存储"""
+        ...
+
+    def _index(self, item: int) -> int:
+        """把下标转为非负数，超出范围时抛出IndexError
+        :param item: 下标
+        :return: 非负下标
+        """
+        ...
+
+    def __len__(self) -> int: ...
+
+    def __iter__(self) -> Iterable[Union[dict, list]]: ...
+
+    def __getitem__(self, item: Union[int, slice]) -> Union[dict, list]: ...
+
+    def __setitem__(self, item: Union[int, slice], value: Any) -> None: ...
+
+    def __delitem__(self, item: Union[int, slice]) -> None: ...
+
+    def __eq__(self, other: Any) -> bool: ...
+
+
+def _new_column(value: Any) -> Union[list, array]:
+    """根据第一个值的类型创建列容器"""
+    ...
+
+
+def pack_rows(data: dict) -> dict:
+    """把数据块中结构相同的行转为ColumnBuffer存储
+    :param data: 数据块
+    :return: 数据块
+    """
+    ...
+
+
+def extend_rows(rows: Union[list, ColumnBuffer], new_rows: list) -> bool:
+    """向数据块添加行，ColumnBuffer结构不一致时，已存储的行数较多则返回False另起数据块，否则退回按行存储后添加
+    :param rows: 数据块中的行数据
+    :param new_rows: 要添加的行
+    :return: 是否已添加
+    """
+    ...
+
+
 class RowText(str):
     row: Optional[int] = ...
 
@@ -378,6 +576,22 @@ def process_content_json(content: Any) -> Union[None, int, str, float]:
     ...
 
 
+def process_content_db(content: Any) -> Union[None, int, str, float, bytes]:
+    """处理要写入数据库的单个数据，bytes类数据保留为BLOB，日期时间转为ISO格式文本
+    :param content: 未处理的数据内容
+    :return: 处理后的数据
+    """
+    ...
+
+
+def db_type(value: Any) -> str:
+    """返回数据对应的sqlite列类型
+    :param value: 不为None的数据
+    :return: 'INTEGER'、'REAL'、'BLOB'或'TEXT'
+    """
+    ...
+
+
 def process_content_str(content: Any) -> str:
     """处理单个单元格要写入的数据，以str格式输出
     :param content: 未处理的数据内容
@@ -447,7 +661,7 @@ def get_ws_real_coord(coord: tuple, ws: Worksheet, header: Header) -> Tuple[int,
 
 def make_final_data_simplify(recorder: BaseRecorder,
                              data: Union[list, tuple, dict, None]) -> Union[list, dict]:
-    """将传入的数据转换为列表或字典形式，不添加前后列数据
+    """将传入的数据转换为列表或字典形式，不添加前后列数据，RowData等映射转为dict
     :param recorder: BaseRecorder对象
     :param data: 要处理的数据
     :return: 转变成列表或字典形式的数据
@@ -456,7 +670,7 @@ def make_final_data_simplify(recorder: BaseRecorder,
 
 
 def make_final_data(recorder: BaseRecorder, data: Iterable) -> Union[list, dict]:
-    """将传入的一维数据转换为列表或字典形式，添加前后列数据
+    """将传入的一维数据转换为列表或字典形式，添加前后列数据，RowData等映射转为dict
     :param recorder: BaseRecorder对象
     :param data: 要处理的数据
     :return: 转变成列表或字典形式的数据
@@ -521,3 +735,22 @@ def is_single_data(data: Any) -> bool:
 def is_1D_data(data: Any) -> bool:
     """判断传入数据是否一维数据"""
     ...
+
+
+def is_frame(data: Any) -> bool:
+    """判断数据是否pandas的DataFrame，未导入pandas时直接返回False"""
+    ...
+
+
+def is_array(data: Any) -> bool:
+    """判断数据是否numpy的ndarray，未导入numpy时直接返回False"""
+    ...
+
+
+def frame2rows(frame: Any, file_type: Optional[str]) -> Tuple[List[str], List[list]]:
+    """按列批量清洗DataFrame数据，转换为行列表，因有空值被转为float的整数列还原为int
+    :param frame: DataFrame对象
+    :param file_type: 文件类型，用于选择处理方法，xlsx会去除非法字符，db保留bytes等数据库能直接保存的值
+    :return: (表头列表, 行数据列表)
+    """
+    ...
@@ -20,6 +20,10 @@ setup(
         "openpyxl",
     ],
     extras_require={
+        "pandas": [
+            "pandas",
+            "numpy",
+        ],
         "test": [
             "pytest>=6.0",
             "pytest-cov>=2.10",
@@ -131,6 +131,29 @@ class TestBackup:
         assert result == ('Alice', 30)
         conn.close()
 
+    def test_backup_db_incremental_and_vacuum(self, temp_db, backup_dir):
+        """Test DBRecorder online backup in page steps and the VACUUM INTO mode."""
+        import sqlite3
+
+        d = DBRecorder(temp_db, table='users')
+        d.set.keep_connection()
+        d.add_data([{'id': i, 'name': 'x' * 200} for i in range(500)])
+        d.record()
+        d.run_sql('DELETE FROM users WHERE id >= 100', commit=True)
+
+        steps = []
+        path = d.backup(folder=backup_dir, name='step', pages=5,
+                        progress=lambda status, remaining, total: steps.append(remaining))
+        assert len(steps) > 1 and steps[-1] == 0
+        compact = d.backup(folder=backup_dir, name='compact', vacuum=True)
+        d.close()
+
+        for p in (path, compact):
+            conn = sqlite3.connect(p)
+            assert conn.execute('SELECT count(*) FROM users').fetchone()[0] == 100
+            conn.close()
+        assert Path(compact).stat().st_size < Path(path).stat().st_size
+
     def test_backup_xlsx(self, temp_xlsx, backup_dir):
         """Test backup for XLSX files."""
         import openpyxl
@@ -1,11 +1,13 @@
 # -*- coding:utf-8 -*-
 """Tests for DBRecorder class."""
+import gc
 from pathlib import Path
 import sqlite3
+from threading import Thread
 
 import pytest
 
-from DrissionRecord import DBRecorder
+from DrissionRecord import DBRecorder, Filter, Recorder
 
 
 class TestDBRecorder:
@@ -186,6 +188,265 @@ class TestDBRecorder:
         # May or may not have tables depending on implementation
         assert isinstance(tables, list)
 
+    def test_dedupe(self, temp_db):
+        """Test set.dedupe() skips rows already in the table."""
+        d = DBRecorder(temp_db, table='users')
+        d.add_data({'id': 1, 'name': 'Alice'})
+        d.record()
+
+        d2 = DBRecorder(temp_db, table='users')
+        d2.set.dedupe('id')
+        d2.add_data([{'id': 1, 'name': 'Alice'}, {'id': 2, 'name': 'Bob'}, (2, 'Bob')])
+        d2.record()
+
+        results = d2.run_sql("SELECT id FROM users", single=False)
+        assert sorted(i[0] for i in results) == [1, 2]
+
+    def test_keep_connection(self, temp_db):
+        """Test a kept connection uses WAL and the configured pragmas across flushes."""
+        d = DBRecorder(temp_db, table='users')
+        d.set.keep_connection().pragmas(cache_size=-4000, temp_store='memory')
+        d.add_data({'id': 1, 'name': 'Alice'})
+        d.record()
+        conn = d._conn
+        d.add_data({'id': 2, 'name': 'Bob'})
+        d.record()
+        assert d._conn is conn
+        assert d.run_sql('PRAGMA journal_mode')[0] == 'wal'
+        assert d.run_sql('PRAGMA cache_size')[0] == -4000
+
+        other = sqlite3.connect(temp_db)  # readers can query while the writer stays connected
+        assert other.execute('SELECT count(*) FROM users').fetchone()[0] == 2
+        other.close()
+
+        d.close()
+        assert d._conn is None
+        with pytest.raises(ValueError):
+            d.set.pragmas(synchronous='fast')
+
+    def test_shared_connection_locked(self, temp_db):
+        """Test run_sql() and tables wait for a write that holds the shared connection."""
+        d = DBRecorder(temp_db, table='t')
+        d.set.keep_connection()
+        d.add_data({'a': 1})
+        d.record()
+        got = []
+        with d._lock:  # as record() does while writing
+            t = Thread(target=lambda: got.extend([d.run_sql('SELECT count(*) FROM t'), d.tables]))
+            t.start()
+            t.join(.3)
+            assert not got
+        t.join()
+        assert got == [(1,), ['t']]
+        d.close()
+
+    def test_schema_cache(self, temp_db):
+        """Test table columns are cached between flushes and refreshed on demand."""
+        d = DBRecorder(temp_db, table='users')
+        d.add_data({'id': 1, 'name': 'Alice'})
+        d.record()
+        assert d._schema == {'users': ['id', 'name']}
+
+        conn = sqlite3.connect(temp_db)
+        conn.execute('ALTER TABLE users ADD COLUMN age')
+        conn.execute('CREATE TABLE logs (msg)')
+        conn.commit()
+        conn.close()
+        d.add_data({'msg': 'hi'}, table='logs')  # table created elsewhere is reused
+        d.record()
+        assert d._schema['users'] == ['id', 'name']
+
+        d.refresh_schema()
+        d.add_data((2, 'Bob', 30))
+        d.record()
+        assert d._schema['users'] == ['id', 'name', 'age']
+        assert d.run_sql('SELECT age FROM users WHERE id=2')[0] == 30
+
+    def test_stale_schema_retried(self, temp_db):
+        """Test a column added by another connection is picked up instead of failing the flush."""
+        d = DBRecorder(temp_db, table='users')
+        d.set.auto_new_header(True)
+        d.add_data({'id': 1, 'name': 'Alice'})
+        d.record()
+        other = DBRecorder(temp_db, table='users')
+        other.set.auto_new_header(True)
+        other.add_data({'id': 2, 'name': 'Bob', 'age': 20})
+        other.record()
+
+        d.add_data({'id': 3, 'name': 'Carl', 'age': 30})  # the cache still lacks age
+        d.record()
+        assert d._data_count == 0
+        assert d._schema['users'] == ['id', 'name', 'age']
+        assert d.run_sql('SELECT id, age FROM users ORDER BY id', single=False) == [(1, None), (2, 20), (3, 30)]
+
+    def test_mixed_key_sets(self, temp_db):
+        """Test interleaved dicts with different or reordered keys land in the right columns."""
+        d = DBRecorder(temp_db, table='users')
+        d.add_data({'id': 0, 'name': 'A', 'age': 1})
+        d.add_data([{'id': 1, 'name': 'B'}, {'age': 2, 'id': 2}, {'name': 'C', 'id': 3},
+                    {'id': 4, 'age': 4}, (5, 'D', 5)])
+        d.record()
+
+        results = d.run_sql('SELECT id, name, age FROM users ORDER BY id', single=False)
+        assert results == [(0, 'A', 1), (1, 'B', None), (2, None, 2), (3, 'C', None),
+                           (4, None, 4), (5, 'D', 5)]
+
+    def test_conflict(self, temp_db):
+        """Test set.conflict() upserts or ignores rows that hit the unique keys."""
+        d = DBRecorder(temp_db, table='users')
+        d.set.conflict('update', 'id')
+        d.add_data([{'id': 1, 'name': 'A', 'age': 1}, {'id': 2, 'name': 'B', 'age': 2}])
+        d.record()
+        d.add_data([{'id': 1, 'name': 'A2'}, {'id': 3, 'name': 'C', 'age': 3}])
+        d.add_data({'msg': 'x'}, table='logs')  # tables without the key column insert normally
+        d.record()
+        assert d.run_sql('SELECT id, name, age FROM users ORDER BY id', single=False) == [
+            (1, 'A2', 1), (2, 'B', 2), (3, 'C', 3)]
+
+        d.set.conflict('ignore')
+        d.add_data([(2, 'B2', 20), (4, 'D', 4)])
+        d.record()
+        assert d.run_sql('SELECT id, name FROM users ORDER BY id', single=False) == [
+            (1, 'A2'), (2, 'B'), (3, 'C'), (4, 'D')]
+        assert d.run_sql('SELECT count(*) FROM logs')[0] == 1
+
+        with pytest.raises(ValueError):
+            d.set.conflict('update')
+
+    def test_conflict_keeps_order(self, temp_db):
+        """Test the last write for a key wins even when rows have different columns."""
+        for mode in ('replace', 'update'):
+            d = DBRecorder(temp_db, table=mode)
+            d.add_data({'id': 1, 'x': 0, 'y': 0})
+            d.record()
+            d.set.conflict(mode, 'id')
+            d.add_data([{'id': 1, 'x': 1}, {'id': 1, 'x': 2, 'y': 3}, {'id': 1, 'x': 5}])
+            d.record()
+            assert d.run_sql(f'SELECT x FROM `{mode}`')[0] == 5
+
+    def test_conflict_with_duplicates(self, temp_db):
+        """Test set.conflict() fails up front when existing rows break the unique keys."""
+        d = DBRecorder(temp_db, table='users')
+        d.add_data([{'id': 1, 'name': 'A'}, {'id': 1, 'name': 'B'}, {'id': None, 'name': 'C'}])
+        d.record()
+        with pytest.raises(ValueError):
+            d.set.conflict('ignore', 'id')
+        assert d._conflict == (None, None)
+
+        d.run_sql("DELETE FROM users WHERE name='B'", commit=True)
+        d.set.conflict('ignore', 'id')
+        indexes = d.run_sql("SELECT name FROM sqlite_master WHERE type='index'", single=False)
+        assert indexes == [('users_id_unique',)]
+
+    def test_conflict_ignores_other_tables(self, temp_db):
+        """Test set.conflict() only checks the table being written, not unrelated ones."""
+        d = DBRecorder(temp_db, table='items')
+        d.add_data([{'id': 1, 'msg': 'a'}, {'id': 1, 'msg': 'b'}], table='log')
+        d.record()
+        d.set.conflict('ignore', 'id')
+        d.add_data([{'id': 1, 'name': 'A'}, {'id': 1, 'name': 'B'}])
+        d.record()
+        assert d.run_sql('SELECT name FROM items', single=False) == [('A',)]
+        assert d.run_sql('SELECT count(*) FROM log')[0] == 2
+
+    def test_deferred_indexes(self, temp_db):
+        """Test deferred indexes are dropped only for bulk loads and always rebuilt afterwards."""
+        sql = "SELECT name FROM sqlite_master WHERE type='index' ORDER BY name"
+        d = DBRecorder(temp_db, table='users')
+        d.set.indexes('users', 'id', deferred=False).indexes('users', [['name'], ['name', 'age']])
+        d.add_data({'id': 1, 'name': 'A', 'age': 1})
+        d.record()
+        assert d.run_sql(sql, single=False) == [('idx_users_id',)]
+        d.record(final=True)
+        assert len(d.run_sql(sql, single=False)) == 3
+
+        all_indexes = [('idx_users_id',), ('idx_users_name',), ('idx_users_name_age',)]
+        d2 = DBRecorder(temp_db, table='users')  # definitions are kept next to the database
+        assert d2._indexes == d._indexes
+        d2.add_data([{'id': i, 'name': 'B', 'age': 2} for i in range(2, 5)])  # a bulk load drops them
+        d2.record()
+        assert d2.run_sql(sql, single=False) == [('idx_users_id',)]
+        d2.close()
+        assert d2.run_sql(sql, single=False) == all_indexes
+
+        d3 = DBRecorder(temp_db, table='users')  # a small append keeps them
+        d3.add_data({'id': 5, 'name': 'C', 'age': 3})
+        d3.record()
+        assert d3.run_sql(sql, single=False) == all_indexes
+
+        d4 = DBRecorder(temp_db, table='users')  # a bulk load that never called close()
+        d4.add_data([{'id': i, 'name': 'D', 'age': 4} for i in range(6, 20)])
+        d4.record()
+        assert d4.run_sql(sql, single=False) == [('idx_users_id',)]
+        d5 = DBRecorder(temp_db, table='users')  # the next small append rebuilds what it left dropped
+        d5.add_data({'id': 20, 'name': 'E', 'age': 5})
+        d5.record()
+        assert d5.run_sql(sql, single=False) == all_indexes
+
+        d6 = DBRecorder(temp_db, table='users')  # rebuilt when the recorder is destroyed without close()
+        d6.add_data([{'id': i, 'name': 'F', 'age': 6} for i in range(21, 60)])
+        d6.record()
+        assert d6.run_sql(sql, single=False) == [('idx_users_id',)]
+        del d6
+        gc.collect()
+        assert DBRecorder(temp_db).run_sql(sql, single=False) == all_indexes
+
+        d7 = DBRecorder(temp_db, table='users')  # and before the connection mode changes
+        d7.add_data([{'id': i, 'name': 'G', 'age': 7} for i in range(60, 140)])
+        d7.record()
+        d7.set.keep_connection()
+        assert d7.run_sql(sql, single=False) == all_indexes
+        d7.close()
+
+    def test_col_types(self, temp_db):
+        """Test declared and inferred column types, BLOB and datetime values."""
+        from datetime import datetime
+        d = DBRecorder(temp_db, table='items')
+        d.set.infer_types().col_types('items', {'price': 'NUMERIC(10, 2)'}).auto_new_header()
+        d.add_data([{'id': None, 'name': 'a', 'price': 1.5, 'raw': b'\x00\x01'},
+                    {'id': 2, 'name': 'b', 'price': 3, 'raw': bytearray(b'\x02')}])
+        d.add_data({'id': 3, 'at': datetime(2024, 1, 2, 3, 4, 5)})
+        d.record()
+
+        types = {i[1]: i[2] for i in d.run_sql('PRAGMA table_info(items)', single=False)}
+        assert types == {'id': 'INTEGER', 'name': 'TEXT', 'price': 'NUMERIC(10, 2)', 'raw': 'BLOB', 'at': 'TEXT'}
+        assert d.run_sql('SELECT raw FROM items WHERE id=2')[0] == b'\x02'
+        assert d.run_sql('SELECT at FROM items WHERE id=3')[0] == '2024-01-02 03:04:05'
+        with pytest.raises(ValueError):
+            d.set.col_types('items', {'id': 'INTEGER); DROP TABLE items; --'})
+
+    def test_iter_rows(self, temp_db):
+        """Test iter_rows() filters in sqlite with the same semantics as Recorder.rows()."""
+        d = DBRecorder(temp_db, table='users')
+        d.add_data([{'id': 1, 'name': 'A', 'score': 5}, {'id': 2, 'name': None, 'score': '12'},
+                    {'id': 3, 'name': 'B1', 'score': 'x'}, {'id': 4, 'name': '', 'score': 8}])
+        d.record()
+
+        assert [r['id'] for r in d.iter_rows(batch=2)] == [1, 2, 3, 4]
+        # '' counts as unsigned too, as in csv
+        assert [r['id'] for r in d.rows(sign_col='name', signs=None, deny_sign=True)] == [1, 3]
+        assert [r['id'] for r in d.rows(where=Filter('score').between(6, 20))] == [2, 4]
+        assert [r['id'] for r in d.rows(where=~Filter('name').empty() & Filter('name').regex(r'\d'))] == [3]
+        rows = d.rows(cols=['name', 'id'], where=Filter('name').not_empty(), count=1)
+        assert [(r.row, dict(r)) for r in rows] == [(1, {'name': 'A', 'id': 1})]
+
+    def test_sign_filter_matches_csv(self, temp_db, temp_csv):
+        """Test sign_col/signs match the same rows as Recorder.rows() on csv."""
+        data = [{'id': 1, 'sign': None}, {'id': 2, 'sign': ''}, {'id': 3, 'sign': 1}, {'id': 4, 'sign': 'x'}]
+        d = DBRecorder(temp_db, table='t')
+        d.add_data(data)
+        d.record()
+        r = Recorder(temp_csv)
+        r.add_data(data)
+        r.record()
+
+        for signs, deny in ((None, False), (None, True), ('1', False), (1, False), (['1', None], True)):
+            db_ids = [i['id'] for i in d.rows(sign_col='sign', signs=signs, deny_sign=deny)]
+            csv_ids = [int(i['id']) for i in r.rows(sign_col='sign', signs=signs, deny_sign=deny)]
+            assert db_ids == csv_ids, (signs, deny)
+        assert [i['id'] for i in d.rows(sign_col='sign', signs=None)] == [1, 2]
+        assert [i['id'] for i in d.rows(sign_col='sign', signs='1')] == [3]
+
     def test_delete_method(self, temp_db):
         """Test the delete() method."""
         d = DBRecorder(temp_db)
@@ -301,3 +562,26 @@ class TestDBRecorder:
         d2.set.path(temp_db)
         # Should select the existing table
         assert d2.table is not None or len(d2.tables) > 0
+
+    def test_add_dataframe(self, temp_db):
+        """Test adding a DataFrame creates columns from its headers."""
+        pd = pytest.importorskip('pandas')
+        d = DBRecorder(temp_db)
+        d.add_data(pd.DataFrame({'name': ['Alice', 'Bob'], 'age': [30, None]}), table='users')
+        d.record()
+
+        conn = sqlite3.connect(temp_db)
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM users")
+        assert cursor.fetchall() == [('Alice', 30.0), ('Bob', None)]
+        conn.close()
+
+    def test_dataframe_bytes_stored_as_blob(self, temp_db):
+        """Test bytes from a DataFrame and from dict rows are both stored as BLOB."""
+        pd = pytest.importorskip('pandas')
+        d = DBRecorder(temp_db, table='files')
+        d.add_data(pd.DataFrame({'id': [1], 'raw': [b'\x00\x01']}))
+        d.add_data({'id': 2, 'raw': b'\x00\x01'})
+        d.record()
+        assert d.run_sql('SELECT id, typeof(raw), raw FROM files ORDER BY id', single=False) == [
+            (1, 'blob', b'\x00\x01'), (2, 'blob', b'\x00\x01')]
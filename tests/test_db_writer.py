@@ -0,0 +1,92 @@
+# -*- coding:utf-8 -*-
+"""Tests for DBWriter single-writer process."""
+from multiprocessing import Process
+from pathlib import Path
+from time import sleep
+
+import pytest
+
+from DrissionRecord import DBWriter, DBRecorder
+
+
+def add_rows(client, worker, num):
+    for i in range(num):
+        client.add_data({'worker': worker, 'i': i})
+    client.record()
+
+
+def set_unique(recorder):
+    recorder.set.conflict('ignore', ('worker', 'i'))
+
+
+def fail_setup(recorder):
+    raise ValueError('setup failed')
+
+
+def slow_setup(recorder):
+    sleep(30)
+
+
+class TestDBWriter:
+    """Test cases for DBWriter."""
+
+    def test_clients_in_processes(self, temp_db):
+        """Test rows from several client processes are all written by the writer process."""
+        with DBWriter(temp_db, table='t', setup=set_unique) as w:
+            ps = [Process(target=add_rows, args=(w.client(cache_size=7), k, 50)) for k in range(3)]
+            for p in ps:
+                p.start()
+            for p in ps:
+                p.join()
+            client = w.client()
+            add_rows(client, 0, 10)  # duplicates are ignored by the writer's settings
+        assert not w.is_alive
+
+        d = DBRecorder(temp_db)
+        assert d.run_sql('SELECT count(*), count(DISTINCT worker) FROM t') == (150, 3)
+
+    def test_bad_message_does_not_stop_writer(self, temp_db, temp_dir, monkeypatch):
+        """Test a message that fails is reported and later messages are still written."""
+        monkeypatch.chdir(temp_dir)
+        with DBWriter(temp_db, interval=.1) as w:
+            bad = w.client(cache_size=0)  # no table, so the writer's add_data() raises
+            bad.add_data({'a': 1})
+            bad.record()
+            good = w.client(cache_size=0, table='t')
+            good.add_data({'a': 2})
+            good.record()
+        assert DBRecorder(temp_db).run_sql('SELECT a FROM t', single=False) == [(2,)]
+        assert (Path(temp_dir) / 'failed_data.txt').exists()
+
+    def test_dead_writer_reported(self, temp_db):
+        """Test clients stop waiting on a dead writer and stop() reports its exit code."""
+        w = DBWriter(temp_db, table='t', setup=fail_setup, max_batches=1).start()
+        client = w.client(cache_size=0)
+        w._process.join()
+        client.add_data({'a': 1})
+        with pytest.raises(RuntimeError):
+            client.record()
+        assert client._data_count == 1  # unsent rows stay in the client
+        with pytest.raises(RuntimeError):
+            w.stop()
+
+    def test_failed_record_does_not_hang_writer(self, temp_db, temp_dir, monkeypatch):
+        """Test a batch that fails to record is dropped and later rows are still written."""
+        monkeypatch.chdir(temp_dir)
+        with DBWriter(temp_db, interval=.1) as w:
+            bad = w.client(cache_size=0, table='bad')
+            bad.add_data([1, 2])  # a list row for a table that does not exist cannot be recorded
+            bad.record()
+            w.record()
+            good = w.client(cache_size=0, table='t')
+            good.add_data({'a': 2})
+            good.record()
+        assert DBRecorder(temp_db).run_sql('SELECT a FROM t', single=False) == [(2,)]
+
+    def test_stop_timeout_terminates_writer(self, temp_db):
+        """Test stop() terminates a writer that does not end in time and reports it."""
+        w = DBWriter(temp_db, table='t', setup=slow_setup).start()
+        process = w._process
+        with pytest.raises(RuntimeError):
+            w.stop(timeout=.5)
+        assert not process.is_alive()
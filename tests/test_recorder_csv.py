@@ -1,11 +1,13 @@
 # -*- coding:utf-8 -*-
 """Tests for Recorder class with CSV format."""
 import csv
+import json
 from pathlib import Path
+import tracemalloc
 
 import pytest
 
-from DrissionRecord import Recorder
+from DrissionRecord import Recorder, DBRecorder, Filter
 
 
 class TestRecorderCSV:
@@ -218,3 +220,452 @@ class TestRecorderCSV:
 
         captured = capsys.readouterr()
         assert '开始写入文件' not in captured.out
+
+    def test_add_dataframe(self, temp_csv):
+        """Test adding a pandas DataFrame uses its columns as header."""
+        pd = pytest.importorskip('pandas')
+        r = Recorder(temp_csv)
+        r.add_data(pd.DataFrame({'name': ['Alice', 'Bob'], 'age': [30, None]}))
+        r.add_data(pd.DataFrame({'age': [25], 'name': ['Charlie']}))
+        r.record()
+
+        with open(temp_csv, 'r', encoding='utf-8', newline='') as f:
+            rows = list(csv.reader(f))
+            assert rows == [['name', 'age'], ['Alice', '30'], ['Bob', ''], ['Charlie', '25']]
+
+    def test_dataframe_nullable_ints_match_dicts(self, temp_dir):
+        """Test an int column with gaps is written like the same values given as dicts."""
+        pd = pytest.importorskip('pandas')
+        rows = [{'id': 30, 'score': 1.5}, {'id': None, 'score': None}, {'id': 2, 'score': 2.0}]
+        frame_r = Recorder(str(Path(temp_dir) / 'frame.csv'))
+        frame_r.add_data(pd.DataFrame(rows))
+        frame_r.record()
+        dict_r = Recorder(str(Path(temp_dir) / 'dict.csv'))
+        dict_r.add_data(rows)
+        dict_r.record()
+        assert Path(frame_r.path).read_text(encoding='utf-8') == Path(dict_r.path).read_text(encoding='utf-8')
+        assert [dict(i) for i in frame_r.rows()][0] == {'id': '30', 'score': '1.5'}
+
+    def test_add_ndarray(self, temp_csv):
+        """Test adding a NumPy array as two-dimensional data."""
+        np = pytest.importorskip('numpy')
+        r = Recorder(temp_csv)
+        r.add_data(np.array([[1, 2], [3, 4]]))
+        r.record()
+
+        with open(temp_csv, 'r', encoding='utf-8', newline='') as f:
+            rows = list(csv.reader(f))
+            assert rows == [['1', '2'], ['3', '4']]
+
+    def test_same_schema_rows_buffered_by_column(self, temp_csv):
+        """Test rows with one schema are cached column-wise and written in order."""
+        r = Recorder(temp_csv, cache_size=0)
+        for i in range(100):
+            r.add_data({'id': i, 'price': i * 1.5, 'name': f'n{i}'})
+        r.add_data({'id': 100, 'name': 'n100'})  # a long column run keeps its block
+        r.add_data({'id': True, 'price': 'x', 'name': None})  # a short one falls back to plain rows
+        blocks = r.data[None]
+        assert [type(b['data']).__name__ for b in blocks] == ['ColumnBuffer', 'ColumnBuffer']
+        assert [len(b['data']) for b in blocks] == [100, 2]
+        r.record()
+
+        with open(temp_csv, 'r', encoding='utf-8', newline='') as f:
+            rows = list(csv.reader(f))
+            assert len(rows) == 103
+            assert rows[:3] == [['id', 'price', 'name'], ['0', '0.0', 'n0'], ['1', '1.5', 'n1']]
+            assert rows[-2:] == [['100', '', 'n100'], ['True', 'x', '']]
+
+    def test_alternating_schemas_stay_compact(self, temp_csv):
+        """Test rows with alternating schemas share one block and use no more memory than a plain list."""
+        def make_rows():
+            return ({'id': i, 'price': i * 1.5} if i % 2 else {'name': f'n{i}', 'id': i} for i in range(20000))
+
+        tracemalloc.start()
+        r = Recorder(temp_csv, cache_size=0)
+        for d in make_rows():
+            r.add_data(d)
+        buffered = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        tracemalloc.start()
+        plain = list(make_rows())
+        listed = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        assert len(r.data[None]) == 1 and len(plain) == 20000
+        assert buffered < listed * 1.2
+        r.clear()
+
+    def test_buffered_rows_act_as_list(self, temp_csv):
+        """Test the cached column buffer supports the list operations exposed through data."""
+        r = Recorder(temp_csv, cache_size=0)
+        r.add_data([{'id': i, 'price': i * 1.5} for i in range(4)])
+        rows = r.data[None][0]['data']
+        assert type(rows).__name__ == 'ColumnBuffer'
+        assert rows[1:3] == [{'id': 1, 'price': 1.5}, {'id': 2, 'price': 3.0}]
+        assert rows[-1] == {'id': 3, 'price': 4.5}
+        rows[0] = {'id': 'a', 'price': 0.5}
+        del rows[1]
+        rows.insert(1, {'id': 9, 'price': 9.0})
+        rows.append({'id': 5, 'price': 7.5})
+        rows.append({'other': 1})  # a row with another schema is still accepted
+        assert rows == [{'id': 'a', 'price': 0.5}, {'id': 9, 'price': 9.0}, {'id': 2, 'price': 3.0},
+                        {'id': 3, 'price': 4.5}, {'id': 5, 'price': 7.5}, {'other': 1}]
+        assert rows.pop() == {'other': 1}
+        assert len(rows) == 5
+
+    def test_rows_with_sign(self, temp_csv):
+        """Test rows() filters by sign column and stops at count."""
+        r = Recorder(temp_csv)
+        r.set.header(['id', 'status'])
+        r.add_data([(1, 'done'), (2, ''), (3, 'done'), (4, '')])
+        r.record()
+
+        rows = r.rows(sign_col='status', signs=None)
+        assert [row['id'] for row in rows] == ['2', '4']
+        assert rows[0].row == 3
+        rows = r.rows(sign_col='status', signs='done', deny_sign=True, count=1)
+        assert [row['id'] for row in rows] == ['2']
+
+    def test_iter_rows(self, temp_csv):
+        """Test iter_rows() yields lazily and closes the file when closed early."""
+        r = Recorder(temp_csv)
+        r.set.header(['id', 'status'])
+        r.add_data([(i, '') for i in range(10)])
+        r.record()
+
+        rows = r.iter_rows(sign_col='status', signs=None, begin_row=4)
+        first = next(rows)
+        assert first.row == 4
+        assert first['id'] == '2'
+        rows.close()
+
+        assert [row['id'] for row in r.iter_rows(count=3)] == ['0', '1', '2']
+
+    def test_row_data_view(self, temp_csv):
+        """Test RowData behaves like a read-only mapping of one row."""
+        r = Recorder(temp_csv)
+        r.set.header(['id', 'name'])
+        r.add_data([(1, 'Alice', 'extra'), (2,)])
+        r.record()
+
+        first, second = r.rows()
+        assert first['name'] == first[2] == 'Alice'
+        assert first[3] == 'extra'
+        assert first.row == 2
+        assert first.col('name') == 2
+        assert first.coord('name') == (2, 'B')
+        assert dict(first) == {'id': '1', 'name': 'Alice', 3: 'extra'}
+        assert second == {'id': '2', 'name': ''}
+        assert 'id' in second and 'x' not in second
+        assert second.get('x', 'd') == 'd'
+        assert first.header is second.header
+
+    def test_row_data_to_json(self, temp_csv):
+        """Test RowData is a mapping, not a dict, and to_dict() serializes it to JSON."""
+        r = Recorder(temp_csv)
+        r.set.header(['id', 'name'])
+        r.add_data((1, 'a'))
+        r.record()
+        row = r.rows()[0]
+        assert not isinstance(row, dict)
+        with pytest.raises(TypeError):
+            json.dumps(row)
+        assert json.dumps(row.to_dict()) == '{"id": "1", "name": "a"}'
+        assert row.to_dict() == dict(row) == row
+
+    def test_row_data_round_trip(self, temp_dir):
+        """Test rows read back as RowData can be passed to add_data() again."""
+        src = Recorder(str(Path(temp_dir) / 'src.csv'))
+        src.set.header(['id', 'name'])
+        src.add_data([(1, 'a'), (2, 'b')])
+        src.record()
+        rows = src.rows()
+
+        csv_r = Recorder(str(Path(temp_dir) / 'out.csv'))
+        csv_r.set.header(['id', 'name'])
+        csv_r.add_data(rows[0])
+        csv_r.add_data(rows[1:])
+        csv_r.record()
+        assert [dict(i) for i in csv_r.rows()] == [{'id': '1', 'name': 'a'}, {'id': '2', 'name': 'b'}]
+
+        jsonl_r = Recorder(str(Path(temp_dir) / 'out.jsonl'))
+        jsonl_r.add_data(rows[0])
+        jsonl_r.record()
+        with open(jsonl_r.path, encoding='utf-8') as f:
+            assert f.read().strip() == '{"id": "1", "name": "a"}'
+
+        db = DBRecorder(str(Path(temp_dir) / 'out.db'), table='t')
+        db.add_data(rows)
+        db.record()
+        assert db.run_sql('SELECT id, name FROM t', single=False) == [('1', 'a'), ('2', 'b')]
+
+    def test_rows_with_filter(self, temp_csv):
+        """Test rows() with a combined Filter across several columns."""
+        r = Recorder(temp_csv)
+        r.set.header(['id', 'status', 'price', 'note'])
+        r.add_data([(1, 'done', 5, ''), (2, 'todo', 12, 'a'), (3, 'done', 15, 'b'),
+                    (4, 'done', 30, ''), (5, 'skip', 18, 'c')])
+        r.record()
+
+        where = Filter('status').in_(['done', 'todo']) & Filter('price').between(10, 20)
+        assert [row['id'] for row in r.rows(where=where)] == ['2', '3']
+        where = Filter('note').empty() | Filter('id').regex(r'^[45]$')
+        assert [row['id'] for row in r.rows(where=where, count=2)] == ['1', '4']
+        where = ~Filter('status').eq('done') & Filter('note').not_empty()
+        assert [row['id'] for row in r.rows(where=where)] == ['2', '5']
+        rows = r.rows(cols='id', sign_col='status', signs='done', where=Filter(3).ne(30))
+        assert [dict(row) for row in rows] == [{'id': '1'}, {'id': '3'}]
+
+    def test_filter_errors(self, temp_csv):
+        """Test invalid Filter usage raises errors."""
+        with pytest.raises(RuntimeError):
+            Filter('a').eq(1).eq(2)
+        with pytest.raises(RuntimeError):
+            Filter('a') & Filter('b').eq(1)
+        with pytest.raises(ValueError):
+            Filter('a').between()
+        r = Recorder(temp_csv)
+        r.add_data((1, 2))
+        r.record()
+        with pytest.raises(TypeError):
+            r.rows(where=lambda row: True)
+
+    def test_resume_cursor(self, temp_csv):
+        """Test resume_cursor() continues from the first unprocessed row across instances."""
+        r = Recorder(temp_csv)
+        r.set.header(['id', 'status'])
+        r.add_data([(i, '') for i in range(6)])
+        r.record()
+
+        cursor = r.resume_cursor('status', signs='')
+        batch = cursor.fetch(2)
+        assert [row['id'] for row in batch] == ['0', '1']
+        for row in batch:
+            r.add_data('ok', coord=(row.row, 'status'))
+        r.record()
+
+        cursor = Recorder(temp_csv).resume_cursor('status', signs='')
+        assert (cursor.row, cursor.offset) == (2, len('id,status\r\n'))
+        assert [row['id'] for row in cursor.fetch(2)] == ['2', '3']
+        assert cursor.row == 4
+        assert Path(f'{temp_csv}.cursor').exists()
+
+        with open(temp_csv, 'w', encoding='utf-8', newline='') as f:  # 游标前的内容被改写
+            f.write('id,status\r\n9,\r\n')
+        assert [row['id'] for row in cursor.fetch(2)] == ['9']
+        cursor.reset()
+        assert cursor.row is None
+
+    def test_overlay(self, temp_csv):
+        """Test overlay updates leave the csv untouched until compact()."""
+        r = Recorder(temp_csv)
+        r.set.header(['id', 'status'])
+        r.add_data([(i, '') for i in range(4)])
+        r.record()
+        with open(temp_csv, 'rb') as f:
+            original = f.read()
+
+        r.set.overlay()
+        r.add_data('done', coord=(2, 'status'))
+        r.add_data({'status': 'skip'}, coord=(4, 1))
+        r.record()
+        with open(temp_csv, 'rb') as f:
+            assert f.read() == original
+        assert [row['status'] for row in r.rows()] == ['done', '', 'skip', '']
+        assert [row['id'] for row in r.rows(sign_col='status', signs='')] == ['1', '3']
+
+        r.add_data((9, 'new'), coord=(-1, 1))  # 改写文件时先并入覆盖层
+        r.record()
+        assert not Path(f'{temp_csv}.overlay').exists()
+        with open(temp_csv, 'r', encoding='utf-8', newline='') as f:
+            assert list(csv.reader(f))[1:] == [['0', 'done'], ['1', ''], ['2', 'skip'], ['9', 'new']]
+
+        r.add_data('done', coord=(3, 'status'))
+        r.compact()
+        assert not Path(f'{temp_csv}.overlay').exists()
+        assert [row['status'] for row in r.rows()] == ['done', 'done', 'skip', 'new']
+
+    def test_overlay_bound_to_file(self, temp_csv):
+        """Test an overlay follows appends but is dropped by delete() and ignored for a replaced file."""
+        r = Recorder(temp_csv)
+        r.set.header(['id', 's'])
+        r.add_data([(1, ''), (2, '')])
+        r.record()
+        r.set.overlay()
+        r.add_data('done', coord=(2, 's'))
+        r.record()
+        r.add_data((3, ''))  # appending keeps the overlay valid
+        r.record()
+        assert [row['s'] for row in r.rows()] == ['done', '', '']
+
+        with open(temp_csv, 'w', encoding='utf-8', newline='') as f:  # replaced by another program
+            f.write('id,s\n7,\n8,\n9,\n')
+        assert [row['s'] for row in Recorder(temp_csv).rows()] == ['', '', '']
+
+        r.add_data('done', coord=(3, 's'))
+        r.record()
+        r.delete()
+        assert not Path(f'{temp_csv}.overlay').exists()
+        r2 = Recorder(temp_csv)
+        r2.set.header(['id', 's'])
+        r2.add_data([(1, ''), (2, '')])
+        r2.record()
+        assert [row['s'] for row in r2.rows()] == ['', '']
+
+    def test_find_with_index(self, temp_csv):
+        """Test build_index() backs find()/contains() and follows appends and overlay updates."""
+        r = Recorder(temp_csv)
+        r.set.header(['url', 'status'])
+        r.add_data([('a', ''), ('b', ''), ('a', 'x')])
+        r.record()
+
+        index = r.build_index('url')
+        assert len(index) == 2
+        assert [(row.row, row['status']) for row in r.find('a')] == [(2, ''), (4, 'x')]
+        assert not r.contains('c')
+
+        r.add_data(('c', 'new'))
+        r.record()
+        assert [row.row for row in r.find('c')] == [5]
+        assert Recorder(temp_csv).contains('c', col='url')
+
+        r.set.overlay()
+        r.add_data('d', coord=(2, 'url'))
+        r.record()
+        assert [row.row for row in r.find('a')] == [4]
+        assert [row['status'] for row in r.find('d')] == ['']
+
+        r.compact()
+        assert [row.row for row in r.find('d', col='url')] == [2]
+
+    def test_dedupe(self, temp_csv):
+        """Test set.dedupe() drops rows whose key was already seen, across recorders."""
+        r = Recorder(temp_csv)
+        r.set.header(['url', 'status'])
+        r.add_data([('a', '1'), ('b', '2')])
+        r.record()
+
+        r.set.dedupe('url')
+        r.add_data([('a', '3'), ('c', '4'), ('c', '5')])
+        r.add_data({'url': 'b', 'status': '6'})
+        r.record()
+        assert [row['url'] for row in r.rows()] == ['a', 'b', 'c']
+        assert Path(f'{temp_csv}.seen').exists()
+
+        r2 = Recorder(temp_csv)
+        r2.set.dedupe('url')
+        r2.add_data([('c', '7'), ('d', '8')])
+        r2.record()
+        assert [row['url'] for row in r2.rows()] == ['a', 'b', 'c', 'd']
+
+        r2.set.dedupe(None)
+        r2.add_data(('a', '9'))
+        r2.record()
+        assert len(r2.rows()) == 5
+
+    def test_dedupe_sidecar_validated(self, temp_csv):
+        """Test a saved dedupe record is dropped by delete() and ignored once the file changes."""
+        r = Recorder(temp_csv)
+        r.set.header(['id'])
+        r.set.dedupe('id')
+        r.add_data([(1,), (2,)])
+        r.record()
+        r.delete()
+        assert not Path(f'{temp_csv}.seen').exists()
+
+        r2 = Recorder(temp_csv)
+        r2.set.header(['id'])
+        r2.set.dedupe('id')
+        r2.add_data([(1,), (2,), (3,)])
+        r2.record()
+        assert [row['id'] for row in r2.rows()] == ['1', '2', '3']
+
+        with open(temp_csv, 'w', encoding='utf-8', newline='') as f:  # replaced by another program
+            f.write('id\n5\n')
+        r3 = Recorder(temp_csv)
+        r3.set.dedupe('id')
+        r3.add_data([(1,), (5,)])
+        r3.record()
+        assert [row['id'] for row in r3.rows()] == ['5', '1']
+
+    def test_tail(self, temp_csv):
+        """Test tail() reads the last rows backwards, keeping quoted line breaks inside fields."""
+        r = Recorder(temp_csv, cache_size=0)
+        r.set.header(['id', 'text'])
+        r.add_data([(i, f'a\n"{i}",b' if i % 2 else 'x' * 200) for i in range(2000)])
+        r.record()
+
+        rows = r.tail(3)
+        assert [row['id'] for row in rows] == ['1997', '1998', '1999']
+        assert rows[-1]['text'] == 'a\n"1999",b'
+        assert [row.row for row in rows] == [None, None, None]  # no count yet, the file is not scanned
+        r.row_count
+        assert [row.row for row in r.tail(3)] == [1999, 2000, 2001]
+        assert [dict(row) for row in r.tail(1, cols='id')] == [{'id': '1999'}]
+
+        r2 = Recorder(temp_csv.replace('.csv', '2.csv'))
+        r2.set.header(['id'])
+        r2.add_data([(1,), (2,)])
+        r2.record()
+        assert [(row.row, row['id']) for row in r2.tail(5)] == [(2, '1'), (3, '2')]
+
+        r3 = Recorder(temp_csv.replace('.csv', '3.csv'), cache_size=0)  # 只按换行符分行
+        r3.set.header(['id', 'text'])
+        r3.add_data([(i, 'p\u2028q\x0cr\x1cs') for i in range(2000)])
+        r3.record()
+        r3.row_count
+        rows = r3.tail(2)
+        assert [(row.row, row['id'], row['text']) for row in rows] == [
+            (2000, '1998', 'p\u2028q\x0cr\x1cs'), (2001, '1999', 'p\u2028q\x0cr\x1cs')]
+
+        with pytest.raises(ValueError):
+            r.tail(0)
+
+    def test_row_count(self, temp_csv):
+        """Test row_count uses a persisted counter that follows appends and rewrites."""
+        r = Recorder(temp_csv)
+        assert r.row_count == 0
+        r.set.header(['id', 'text'])
+        r.add_data([(1, 'a\nb'), (2, 'c'), (3, 'd')])
+        r.record()
+        assert r.row_count == 4
+        assert Path(f'{temp_csv}.count').exists()
+
+        r.add_data([(4, '"e"\nf'), (5, 'g')])
+        r.record()
+        assert r.row_count == 6
+        assert Recorder(temp_csv).row_count == 6
+
+        with open(temp_csv, 'w', newline='') as f:  # 被其它程序改写
+            f.write('id,text\n1,a\n')
+        assert r.row_count == 2
+
+    def test_rows_begin_row_after_multiline(self, temp_csv):
+        """Test begin_row skips whole records even when earlier fields contain line breaks."""
+        r = Recorder(temp_csv)
+        r.set.header(['id', 'text'])
+        r.add_data([(1, 'a\nb'), (2, 'c"\nd"'), (3, 'e')])
+        r.record()
+
+        rows = r.rows(begin_row=3)
+        assert [(row.row, row['id']) for row in rows] == [(3, '2'), (4, '3')]
+        assert r.row_count == 4
+        assert [row['id'] for row in r.rows(begin_row=4)] == ['3']
+        assert r.rows(begin_row=6) == []
+
+    def test_rows_parallel(self, temp_csv):
+        """Test reading chunks in worker processes returns the same rows as a sequential read."""
+        from DrissionRecord.recorder import iter_rows_parallel, split_ranges
+        r = Recorder(temp_csv)
+        r.set.header(['id', 'text', 'flag'])
+        r.add_data([(i, f'a\n{i}' if i % 7 == 0 else f'"b",{i}', i % 3) for i in range(600)])
+        r.record()
+
+        assert len(split_ranges(r.path, 0, Path(r.path).stat().st_size, 8, b'"', 256)) > 2
+        expected = [(row.row, list(row.values())) for row in r.rows(sign_col='flag', signs=1)]
+        rows = iter_rows_parallel(r, True, 'flag', (1,), False, None, None, 0, None, 2, chunk_size=256)
+        assert [(row.row, list(row.values())) for row in rows] == expected
+
+        rows = iter_rows_parallel(r, ['text'], True, (None,), False, 3, 50, 400,
+                                  Filter('flag').eq(2), 2, chunk_size=256)
+        assert [(row.row, row['text']) for row in rows] == [(52, '"b",50'), (55, '"b",53'), (58, 'a\n56')]
+        assert r.rows(count=2, workers=2)[1]['id'] == '1'
@@ -5,7 +5,7 @@ from pathlib import Path
 
 import pytest
 
-from DrissionRecord import Recorder
+from DrissionRecord import Recorder, Filter
 
 
 class TestRecorderJSON:
@@ -107,6 +107,25 @@ class TestRecorderJSON:
         assert rows[0]['name'] == 'Alice'
 
 
+    def test_rows_streaming_json(self, temp_json):
+        """Test json rows() parse the array element by element and stop early."""
+        data = [{'id': i, 'name': f'n{i}', 'v': i * 1.5} for i in range(2000)]
+        with open(temp_json, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=1)
+
+        r = Recorder(temp_json)
+        assert [row['id'] for row in r.rows(count=3)] == [0, 1, 2]
+        rows = r.rows(begin_row=1999)
+        assert [(row.row, row['v']) for row in rows] == [(1999, 2997.0), (2000, 2998.5)]
+        assert r.rows(begin_row=2001) == []
+        assert r.row_count == 2000
+
+        with open(temp_json, 'w', encoding='utf-8') as f:
+            f.write('[{"id": 1}, {"id": 2')
+        with pytest.raises(ValueError):
+            r.rows()
+
+
 class TestRecorderJSONL:
     """Test cases for Recorder with JSONL format."""
 
@@ -205,3 +224,55 @@ class TestRecorderJSONL:
         rows = r.rows(sign_col='status', signs='active')
         assert len(rows) == 2
         assert all(r['status'] == 'active' for r in rows)
+
+    def test_rows_with_filter_jsonl(self, temp_jsonl):
+        """Test rows() with a Filter keeps the original JSON value types."""
+        r = Recorder(temp_jsonl)
+        r.add_data([
+            {'id': 1, 'status': 'active', 'value': 100},
+            {'id': 2, 'status': 'inactive', 'value': 200},
+            {'id': 3, 'status': 'active', 'value': None},
+        ])
+        r.record()
+
+        rows = r.rows(where=Filter('status').eq('active') & Filter('value').between(low=50))
+        assert [row['id'] for row in rows] == [1]
+        rows = r.rows(where=Filter('value').empty() | Filter('id').eq(2))
+        assert [row['id'] for row in rows] == [2, 3]
+
+    def test_rows_sign_prefilter_jsonl(self, temp_jsonl):
+        """Test sign scans only match the sign column, whatever else contains the value."""
+        r = Recorder(temp_jsonl)
+        r.add_data([
+            {'url': 'todo', 'status': 'done'},
+            {'url': 'a', 'status': 'todo'},
+            {'url': 'b', 'status': 1},
+        ])
+        r.record()
+        with open(temp_jsonl, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({'url': 'c', 'status': '待办'}) + '\n')
+            f.write(json.dumps({'url': 'd', 'status': '待办'}, ensure_ascii=False))
+
+        rows = r.rows(sign_col='status', signs='todo')
+        assert [(row.row, row['url']) for row in rows] == [(2, 'a')]
+        assert [row.row for row in r.rows(sign_col='status', signs=['待办', 1])] == [4, 5]
+        assert [row.row for row in r.rows(sign_col='status', signs='待办', begin_row=5)] == [5]
+        assert r.rows(sign_col='status', signs='none') == []
+
+        cursor = r.resume_cursor(sign_col='status', signs='待办')
+        assert [row['url'] for row in cursor.fetch(1)] == ['c']
+        assert cursor.row == 4
+
+
+    def test_tail_jsonl(self, temp_jsonl):
+        """Test tail() splits on line feeds only and numbers rows like a forward read."""
+        r = Recorder(temp_jsonl, cache_size=0)
+        r.add_data([{'id': i, 'text': 'p\u2028q\x1cr'} for i in range(5000)])
+        r.record()
+        assert [row.row for row in r.tail(2)] == [None, None]  # no count yet, the file is not scanned
+
+        r.row_count
+        rows = r.tail(2)
+        assert [(row.row, row['id'], row['text']) for row in rows] == [
+            (4999, 4998, 'p\u2028q\x1cr'), (5000, 4999, 'p\u2028q\x1cr')]
+        assert [row.row for row in r.tail(2)] == [row.row for row in r.rows()[-2:]]
@@ -4,7 +4,7 @@ from pathlib import Path
 
 import pytest
 
-from DrissionRecord import Recorder
+from DrissionRecord import Recorder, Filter
 
 
 class TestRecorderTXT:
@@ -106,6 +106,16 @@ class TestRecorderTXT:
         assert len(rows) == 2
         assert rows[0].value == 'line3'
 
+    def test_rows_filters_rejected_txt(self, temp_txt):
+        """Test where and sign_col raise on txt instead of being ignored."""
+        r = Recorder(temp_txt)
+        r.add_data(('line1',))
+        r.record()
+        with pytest.raises(TypeError):
+            r.rows(where=Filter(1).eq('zzz'))
+        with pytest.raises(TypeError):
+            r.iter_rows(sign_col=1, signs='x')
+
     def test_empty_data_txt(self, temp_txt):
         """Test handling empty data in TXT file."""
         r = Recorder(temp_txt)
@@ -148,3 +158,18 @@ class TestRecorderTXT:
             # None values are converted to empty strings
             assert 'a' in content
             assert 'b' in content
+
+    def test_tail_txt(self, temp_txt):
+        """Test tail() keeps U+2028 and form feeds inside a line and returns row numbers."""
+        r = Recorder(temp_txt, cache_size=0)
+        r.add_data([(f'{i} p\u2028q\x0cr',) for i in range(20000)])
+        r.record()
+
+        rows = r.tail(2)
+        assert rows == ['19998 p\u2028q\x0cr', '19999 p\u2028q\x0cr']
+        assert [row.row for row in rows] == [None, None]  # no count yet, the file is not scanned
+        r.row_count
+        assert [row.row for row in r.tail(2)] == [19999, 20000]
+        r.add_data(('tail',))  # appends keep the count cheap
+        r.record()
+        assert [(row.row, row) for row in r.tail(1)] == [(20001, 'tail')]
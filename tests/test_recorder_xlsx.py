@@ -187,6 +187,20 @@ class TestRecorderXLSX:
         assert found
         wb.close()
 
+    def test_add_dataframe(self, temp_xlsx):
+        """Test adding a DataFrame strips illegal characters column-wise."""
+        pd = pytest.importorskip('pandas')
+        r = Recorder(temp_xlsx)
+        r.add_data(pd.DataFrame({'name': ['Al\x01ice', None], 'age': [30, 25]}))
+        r.record()
+
+        wb = openpyxl.load_workbook(temp_xlsx)
+        ws = wb.active
+        assert [c.value for c in ws[1]] == ['name', 'age']
+        assert [c.value for c in ws[2]] == ['Alice', 30]
+        assert [c.value for c in ws[3]] == [None, 25]
+        wb.close()
+
     def test_header_with_table(self, temp_xlsx):
         """Test setting header for specific table."""
         r = Recorder(temp_xlsx)
@@ -244,6 +258,17 @@ class TestRecorderXLSX:
         assert len(rows) == 2
         assert all(r['Status'] == 'active' for r in rows)
 
+    def test_tail_xlsx(self, temp_xlsx):
+        """Test tail() returns the last rows of the sheet with their row numbers."""
+        r = Recorder(temp_xlsx)
+        r.set.header(['ID', 'Name'])
+        r.add_data([(1, 'Alice'), (2, 'Bob'), (3, 'Charlie')])
+        r.record()
+
+        rows = r.tail(2)
+        assert [(row.row, row['Name']) for row in rows] == [(3, 'Bob'), (4, 'Charlie')]
+        assert len(r.tail(10)) == 3
+
     def test_zero_header_row(self, temp_xlsx):
         """Test with header_row set to 0."""
         r = Recorder(temp_xlsx)
@@ -0,0 +1,100 @@
+# -*- coding:utf-8 -*-
+"""Tests for ShardedDBRecorder class."""
+import sqlite3
+from pathlib import Path
+
+from DrissionRecord import ShardedDBRecorder
+
+
+class TestShardedDBRecorder:
+    """Test cases for ShardedDBRecorder."""
+
+    def test_rows_routed_by_key(self, temp_db):
+        """Test rows with the same key always land in the same shard."""
+        r = ShardedDBRecorder(temp_db, shards=3, key_col='id', table='users')
+        r.set.conflict('replace', 'id')
+        r.add_data([{'id': i, 'name': f'n{i}'} for i in range(30)])
+        r.record()
+        r.add_data([(i, f'new{i}') for i in range(0, 30, 10)])  # list rows use the column position
+        r.close()
+
+        assert [Path(p).name for p in r.shard_paths] == ['test_0.db', 'test_1.db', 'test_2.db']
+        counts = []
+        for p in r.shard_paths:
+            conn = sqlite3.connect(p)
+            counts.append(conn.execute('SELECT count(*) FROM users').fetchone()[0])
+            conn.close()
+        assert sum(counts) == 30 and all(counts)
+
+        assert r.run_sql('SELECT count(*) FROM users')[0] == 30
+        assert r.run_sql('SELECT name FROM users WHERE id IN (0, 10, 20) ORDER BY id', single=False) == [
+            ('new0',), ('new10',), ('new20',)]
+
+    def test_connect_views_fill_missing_columns(self, temp_db):
+        """Test the attached view covers columns that only some shards have."""
+        r = ShardedDBRecorder(temp_db, shards=2, key_col='id', table='t')
+        r.set.auto_new_header()
+        r.add_data([{'id': 1}, {'id': 2}])
+        r.record()
+        r.shards[0].add_data({'id': 3, 'extra': 'x'}, table='t')
+        r.shards[0].record()
+
+        conn = r.connect()
+        rows = conn.execute('SELECT id, extra FROM t ORDER BY id').fetchall()
+        conn.close()
+        r.close()
+        assert rows[-1] == (3, 'x') and len(rows) == 3
+
+    def test_dedupe(self, temp_db):
+        """Test dedupe drops repeated keys before rows are routed to shards."""
+        r = ShardedDBRecorder(temp_db, shards=2, key_col='id', table='t')
+        r.set.dedupe('id')
+        r.add_data([{'id': 1, 'v': 'a'}, {'id': 1, 'v': 'b'}, {'id': 2, 'v': 'c'}])
+        r.add_data({'id': 1, 'v': 'd'})
+        r.close()
+        assert r.run_sql('SELECT id, v FROM t ORDER BY id', single=False) == [(1, 'a'), (2, 'c')]
+
+        r2 = ShardedDBRecorder(temp_db, shards=2, key_col='id', table='t')
+        r2.set.dedupe('id', persist=False)  # warmed from the rows already in the shards
+        r2.add_data([{'id': 2, 'v': 'x'}, {'id': 3, 'v': 'y'}])
+        r2.close()
+        assert r2.run_sql('SELECT count(*) FROM t')[0] == 3
+
+    def test_settings_replayed_on_new_shards(self, temp_dir):
+        """Test settings made before set.path() or a re-path apply to the new shards."""
+        r = ShardedDBRecorder(shards=2, key_col='id', table='t')
+        r.set.conflict('replace', 'id').col_types('t', {'id': 'INTEGER'}).pragmas(synchronous='OFF')
+        r.set.path(str(Path(temp_dir) / 'a.db'))
+        for s in r.shards:
+            assert s._conflict == ('REPLACE', ('id',))
+            assert s._col_types == {'t': {'id': 'INTEGER'}}
+        r.set.path(str(Path(temp_dir) / 'b.db'), 3)
+        assert len(r.shards) == 3
+        assert all(s._conflict == ('REPLACE', ('id',)) for s in r.shards)
+        r.add_data([{'id': 1, 'v': 'a'}, {'id': 1, 'v': 'b'}])
+        r.close()
+        assert r.run_sql('SELECT id, v FROM t', single=False) == [(1, 'b')]
+
+    def test_list_rows_for_new_table(self, temp_db):
+        """Test list rows for a table created in the same flush use the incoming dict's columns."""
+        r = ShardedDBRecorder(temp_db, shards=3, key_col='id', table='t')
+        r.add_data([{'id': 0, 'v': 'a'}] + [[i, f'v{i}'] for i in range(1, 10)])
+        r.record()
+        assert r._data_count == 0
+        assert r.run_sql('SELECT count(*) FROM t')[0] == 10
+        assert r.run_sql('SELECT v FROM t WHERE id=7')[0] == 'v7'
+        r.close()
+
+    def test_failed_routing_keeps_shards_clean(self, temp_db, temp_dir, monkeypatch):
+        """Test a batch that cannot be routed moves no rows into the shards, even when retried."""
+        monkeypatch.chdir(temp_dir)
+        r = ShardedDBRecorder(temp_db, shards=3, key_col='id', table='t')
+        r.show_msg = False
+        r.add_data([{'id': i} for i in range(10)], table='ok')
+        r.add_data([[1], [2]])  # list rows for a new table without any dict to name its columns
+        r.record()
+        r._pause_add = False
+        r.record()
+        assert [s._data_count for s in r.shards] == [0, 0, 0]
+        r.clear()
+        r.close()